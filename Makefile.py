@@ -5,12 +5,64 @@
 import glob
 import sys
 import os
+import shutil
+import hashlib
+import json
 import string
+import itertools
 import subprocess
 import pdb
+import time
+import socket
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+try:
+  import queue
+except ImportError:
+  import Queue as queue
 
 LOG_NAME = 'compilation.log'
 
+# Each set of options (variant) is compiled in its own folder BUILD_FOLDER/variant, with its objects, modules and binaries.
+BUILD_FOLDER = 'build'
+VARIANTS = ["opt", "test", "debug", "gdb", "profile", "pgo"]
+
+# Options of each compiler for the profile-guided optimization (generation of the profile, then use of the profile).
+# '%(folder)s' is replaced by the build folder, where the profiles are written
+PGO_OPTIONS = {"gfortran": ("-fprofile-generate", "-fprofile-use -fprofile-correction"),
+               "ifort": ("-prof-gen -prof-dir=%(folder)s", "-prof-use -prof-dir=%(folder)s")}
+
+# Folder with the input files of the representative simulation used to get the profile, and as benchmark by the autotuner.
+# The message.in and data files (*.dat) of the source folder are also copied.
+PGO_WORKLOAD = 'pgo_workload'
+
+# Flags tried by 'Makefile.py autotune' : each combination of one optimization level and of any of the optional flags
+# is compiled (with the base flags) and benchmarked on PGO_WORKLOAD. The fastest one whose results are within
+# tolerance of the 'test' build becomes the speed options for this machine, stored in TUNED_NAME.
+# For gfortran, the user module needs its local variables to be kept between two calls, hence '-fno-automatic'.
+AUTOTUNE_FLAGS = {"gfortran": {"base": "-pipe -fno-automatic", "levels": ["-O2", "-O3"],
+                               "toggles": ["-march=native", "-flto", "-funroll-loops", "-ffast-math"]},
+                  "ifort": {"base": "-Bstatic", "levels": ["-O2", "-O3"],
+                            "toggles": ["-xHost", "-ipo", "-unroll-aggressive", "-fp-model fast=2"]}}
+TUNED_NAME = 'autotune.json'
+
+# Option of each compiler to compile with OpenMP (parallel force loops of forces.f90 and algo_hybrid.f90). The number of
+# threads is given by the OMP_NUM_THREADS environment variable when running mercury. With '-fno-automatic', local variables
+# are static, hence every variable of the parallel loops must be in their 'private' clause.
+OPENMP_OPTIONS = {"gfortran": "-fopenmp", "ifort": "-qopenmp"}
+
+# Option of each compiler to choose the folder where .mod files are written
+MODULE_OPTIONS = {"gfortran": "-J", "ifort": "-module ", "g95": "-fmod="}
+
+# Folder where objects, modules and binaries are stored, for each combination of source, compiler, options and used
+# modules interfaces. The file STATE_NAME of each build folder store, for each source file, the key of the objects currently in it.
+CACHE_FOLDER = '.build_cache'
+STATE_NAME = 'build.state'
+
+# File where the modules defined, used and included by each source file are stored, so that source files
+# are only parsed again when their content change.
+SCAN_NAME = os.path.join(CACHE_FOLDER, 'scan.json')
+
 #COMPILATOR = "gfortran"
 #
 #DEBUG_OPTIONS = "-pedantic-errors -Wall -Wconversion -Wextra -Wunreachable-code -fbacktrace" + \
@@ -45,12 +97,16 @@ class sourceFile(object):
   self.defined : a list of procedures defined in the fortran source code
   self.used : a list of modules that are used by the code
   self.included : a list of things included in the code
+  self.isResolved : a boolean to say if the dependencies of the source file have already been checked.
   self.isCompiled : a boolean to say if the source file has already been compiled.
+  self.key : the hash that identify the objects of the source file in the build cache
   self.dependencies : a list of object (*.o) filenames we need to compile
   self.isProgram : a boolean to say if we want to have a binary, or if it's just a module or a subprogram
   self.name : the name we want for the binary file if it is a program. This name is by default the filename without the extension
 
   Methods :
+  .resolve() : Check the dependencies of the current program
+  .get_key() : Return the hash that identify the objects of the source file in the build cache
   .compile() : Compile the current program and all the required dependencies
 
   """
@@ -61,9 +117,15 @@ class sourceFile(object):
 
   # We define a dictionary to make the correspondance between a source filename and the object associated
   findSource = {}
+
+  # For each source filename, the result of the last parsing of the file (see loadScanCache())
+  scanCache = {}
   COMPILATOR = "ifort"
   OPTIONS = "-vec-report0 -i-dynamic -mcmodel=medium -shared-intel -L/usr/lib64/atlas -llapack"
 
+  # Folder where objects, modules and binaries are written
+  BUILD_FOLDER = "."
+
   #COMPILATOR = "g95"
   #OPTIONS = "-O3 -march=native"
 
@@ -81,7 +143,7 @@ class sourceFile(object):
     # Adding manually the modules that fuck everything up, namely ODEPACK !
     if (extra_files != None):
       # If the source file is newer than the object file, we need to compile it
-      object_files = ["%s.o" % os.path.splitext(filename)[0] for filename in extra_files]
+      object_files = [os.path.join(sourceFile.BUILD_FOLDER, "%s.o" % os.path.splitext(filename)[0]) for filename in extra_files]
       self.extra = " ".join(object_files)
 
       for (source_file, object_file) in zip(extra_files, object_files):
@@ -100,9 +162,9 @@ class sourceFile(object):
           options = sourceFile.OPTIONS
 
           if (ext == '.f90'):
-            commande = sourceFile.COMPILATOR+" "+sourceFile.OPTIONS+" -c "+source_file
+            commande = sourceFile.COMPILATOR+" "+sourceFile.OPTIONS+" "+sourceFile.getModuleOptions()+" -c "+source_file+" -o "+object_file
           elif (ext == '.c'):
-            commande = "gcc -c "+source_file
+            commande = "gcc -c "+source_file+" -o "+object_file
           else:
             raise ValueError('Unkown extension for source file: %s' % ext)
 
@@ -138,20 +200,11 @@ class sourceFile(object):
     self.isProgram = isProgram
 
 
+    self.isResolved = False
     self.isCompiled = False
+    self.key = None
 
-    if (not(self.isProgram)):
-      # If the source file is newer than the object file, we need to compile it
-      object_file = "%s.o" % self.name
-      if (os.path.isfile(object_file) and os.path.isfile("%s.mod" % self.name)):
-        self.toBeCompiled = os.path.getmtime(self.filename) > os.path.getmtime(object_file)
-      else:
-        # If the object file do not exist
-        self.toBeCompiled = True
-    else:
-      self.toBeCompiled = True # We always compile the programs
-
-    (self.defined, self.used, self.included) = self.__getModules()
+    (self.defined, self.used, self.included) = self.__getCachedModules()
 
     for module in self.defined:
       sourceFile.findModule[module] = self
@@ -178,6 +231,81 @@ class sourceFile(object):
 
     cls.COMPILATOR = compilator
 
+  @classmethod
+  def setBuildFolder(cls, folder):
+    """method that set the 'BUILD_FOLDER' value.
+
+    Parameter:
+    folder : the folder where objects, modules and binaries are written. It is created if needed
+    """
+
+    if not(os.path.isdir(folder)):
+      os.makedirs(folder)
+
+    cls.BUILD_FOLDER = folder
+
+  @classmethod
+  def getModuleOptions(cls):
+    """return the options needed by the compiler to write and read .mod files in the build folder"""
+
+    if (cls.BUILD_FOLDER == "."):
+      return ""
+
+    return "%s%s -I%s" % (MODULE_OPTIONS.get(cls.COMPILATOR, "-J"), cls.BUILD_FOLDER, cls.BUILD_FOLDER)
+
+  @classmethod
+  def loadScanCache(cls):
+    """method that read the modules defined, used and included by each source file, as stored by saveScanCache()"""
+
+    if os.path.isfile(SCAN_NAME):
+      f = open(SCAN_NAME, 'r')
+      try:
+        cls.scanCache = json.load(f)
+      except ValueError:
+        # A corrupted file only means that every source file will be parsed again
+        cls.scanCache = {}
+      f.close()
+
+  @classmethod
+  def saveScanCache(cls):
+    """method that store the modules defined, used and included by each source file"""
+
+    if not(os.path.isdir(CACHE_FOLDER)):
+      os.makedirs(CACHE_FOLDER)
+
+    # Several variants can be compiled at the same time, so we never write directly in the file
+    tmp_name = "%s.%d.tmp" % (SCAN_NAME, os.getpid())
+    f = open(tmp_name, 'w')
+    json.dump(cls.scanCache, f, sort_keys=True)
+    f.close()
+    os.rename(tmp_name, SCAN_NAME)
+
+  def __getCachedModules(self):
+    """returns the same tuple as __getModules(), but only parse the source file if its content changed since the last time.
+
+    If the size and modification time did not change, the file is not even read. Else, the file is parsed only if its hash changed.
+    """
+
+    stat = os.stat(self.filename)
+    entry = sourceFile.scanCache.get(self.filename)
+
+    if (entry != None and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size):
+      return (entry["defined"], entry["used"], entry["included"])
+
+    f = open(self.filename, 'rb')
+    file_hash = hashlib.sha1(f.read()).hexdigest()
+    f.close()
+
+    if (entry == None or entry["hash"] != file_hash):
+      (defined, used, included) = self.__getModules()
+      entry = {"hash": file_hash, "defined": defined, "used": used, "included": included}
+      sourceFile.scanCache[self.filename] = entry
+
+    entry["mtime"] = stat.st_mtime
+    entry["size"] = stat.st_size
+
+    return (entry["defined"], entry["used"], entry["included"])
+
   def __getModules(self):
     """returns a tuple containing the list of defined modules and
     the list of used modules of a fortran source file
@@ -213,7 +341,7 @@ class sourceFile(object):
           included.append(newstring)
 
 # We delete all dependencies that are present several number of times.
-    used = list(set(used))
+    used = sorted(set(used))
 
     return defined,used,included
 
@@ -228,6 +356,7 @@ class sourceFile(object):
         source = sourceFile.findModule[mod]
       except:
         print("Error: Unable to locate the module '"+mod+"'")
+      # The build folder is only added in get_command(), it can change between two builds (see autotune())
       obj = source.filename.replace('.f90','.o')
       dependances.append(obj)
 
@@ -239,8 +368,8 @@ class sourceFile(object):
 
     self.isProgram = boolean
 
-  def compile(self, parent_dependencies=[]):
-    """method that check dependencies and try to compile
+  def resolve(self, parent_dependencies=[]):
+    """method that check dependencies recursively. Nothing is compiled here (see build())
 
     Parameter :
     parent_dependencies=[] : list that store all the parent dependencies of the current file, namely, all the module
@@ -251,14 +380,14 @@ class sourceFile(object):
 
     parent_dependencies.append(self.name)
 
-    if not(self.isCompiled):
+    if not(self.isResolved):
       # We only store, for the moment, the first order dependencies.
       self.dependencies = self.__getFirstOrderDependence()
 
       # We store links towards all the object sourceFile that defined the modules we are interested in.
-      module_sources = []
+      self.module_sources = []
       for module in self.used:
-        module_sources.append(sourceFile.findModule[module])
+        self.module_sources.append(sourceFile.findModule[module])
 
       # For each object, we check if there is loop call of modules. If that's the case, return an error
       for name in self.used:
@@ -267,65 +396,138 @@ class sourceFile(object):
                           "use the module '"+self.name+"'. So there is an infinite loop that is not correct."
           raise NameError(error_message)
 
-      # For each object, we compile it if it's not already the case.
-      for source in module_sources:
-        # We must launch source.compile() even if the file will not be compilated, just to get the right dependencies.
-        if not(source.isCompiled):
+      for source in self.module_sources:
+        if not(source.isResolved):
           # the list() is here to ensure not to have a pointer and share the list. If not, the list of parent_dependencies will
           # not be correct and contains all the previous parent dependencies.
-          source.compile(list(parent_dependencies))
-
-          # We compile the current file if any of the dependencies has been effectively compiled
-          if source.toBeCompiled:
-            self.toBeCompiled = True
+          source.resolve(list(parent_dependencies))
 
       # We complete the dependencies list now that all used modules
-      # have been compiled, they must have a complete list of
+      # have been resolved, they must have a complete list of
       # their own dependencies.
-      for source in module_sources:
+      for source in self.module_sources:
         self.dependencies.extend(source.dependencies)
 
       # We delete all dependencies that are present several number of times.
-      self.dependencies = list(set(self.dependencies))
+      self.dependencies = sorted(set(self.dependencies))
 
-      if self.toBeCompiled:
-        # Now that all the dependencies have been compiled, we compile
-        # the current source file.
+      self.isResolved = True
 
-        if not(self.isProgram):
-          commande = sourceFile.COMPILATOR+" "+sourceFile.OPTIONS+" -c "+self.filename
-        else:
-          commande = sourceFile.COMPILATOR+" "+sourceFile.OPTIONS+" -o "+self.name+" "+self.filename+" "+self.extra+" "+" ".join(self.dependencies)
-          print(commande)
+  def get_outputs(self):
+    """return the list of files created by the compilation of the current source file (the object and module files, or the binary for a program)"""
 
-        process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+    if self.isProgram:
+      filenames = [self.name]
+    else:
+      filenames = [self.filename.replace('.f90','.o')] + ["%s.mod" % module.lower() for module in self.defined]
 
-        (process_stdout, process_stderr) = process.communicate()
+    return [os.path.join(sourceFile.BUILD_FOLDER, filename) for filename in filenames]
 
-        print("Compiling "+self.filename+"...")
-        returnCode = process.poll()
+  def get_key(self):
+    """return the hash that identify the objects of the current source file in the build cache. All the modules used must be compiled.
 
+    The key depends on the content of the source file and of the files it includes, the compiler and its options,
+    and the module interfaces (.mod) of the used modules. As a consequence, if a modification of a module does not
+    change its interface (comments, or the body of a routine), the modules that use it do not need to be compiled again.
+    For a program, the key also depends on all the objects that are linked.
+    """
 
-        # if returnCode is not 0, then there was a problem
-        if (returnCode != 0):
-          pdb.set_trace()
-          # We write compilation errors in the following file.
-          f = open(LOG_NAME,'w')
-          f.write(str(process_stderr))
-          f.close()
+    key = hashlib.sha1()
+    # Only the basenames are used, so that the build folders of the variants with the same options share the same objects
+    outputs = [os.path.basename(filename) for filename in self.get_outputs()]
+    key.update(("%s\n%s\n%s\n" % (sourceFile.COMPILATOR, sourceFile.OPTIONS, outputs)).encode("utf-8"))
 
-          print("Compilation error, see '%s'" % LOG_NAME)
-          LogPostProcessing()
-          sys.exit(1)
-        else:
-          if (len(process_stderr) != 0):
-            # We write compilation errors in the following file.
-            f = open(LOG_NAME,'a')
-            f.write(str(process_stderr))
-            f.close()
+    # The modules are sorted so that the key does not depend on the order of the 'use' statements
+    module_files = []
+    for source in self.module_sources:
+      module_files.extend(source.get_outputs()[1:])
 
+    filenames = [self.filename] + self.included + sorted(set(module_files))
+    if self.isProgram:
+      filenames.extend([os.path.join(sourceFile.BUILD_FOLDER, obj) for obj in sorted(self.dependencies)])
+      filenames.extend(self.extra.split())
 
-      self.isCompiled = True
+    for filename in filenames:
+      key.update(os.path.basename(filename).encode("utf-8"))
+      if os.path.isfile(filename):
+        f = open(filename, 'rb')
+        key.update(f.read())
+        f.close()
+
+    return key.hexdigest()
+
+  def restore(self):
+    """copy the files of the current source file from the build cache, if they exist
+
+    Return : True if the files were found in the cache, False otherwise
+    """
+
+    folder = os.path.join(CACHE_FOLDER, self.key)
+
+    if not(os.path.isdir(folder)):
+      return False
+
+    for filename in self.get_outputs():
+      shutil.copy2(os.path.join(folder, os.path.basename(filename)), filename)
+
+    return True
+
+  def store(self):
+    """copy the files created by the compilation of the current source file in the build cache"""
+
+    folder = os.path.join(CACHE_FOLDER, self.key)
+
+    if os.path.isdir(folder):
+      return
+
+    # We copy in a temporary folder first, so that an incomplete entry never exists in the cache
+    tmp_folder = "%s.%d.tmp" % (folder, os.getpid())
+    if os.path.isdir(tmp_folder):
+      shutil.rmtree(tmp_folder)
+    os.makedirs(tmp_folder)
+    for filename in self.get_outputs():
+      shutil.copy2(filename, os.path.join(tmp_folder, os.path.basename(filename)))
+
+    try:
+      os.rename(tmp_folder, folder)
+    except OSError:
+      # Another variant, compiled at the same time, stored the same objects first
+      shutil.rmtree(tmp_folder)
+
+  def get_command(self):
+    """return the command that compile the current source file (or compile and link it, for a program)"""
+
+    options = sourceFile.COMPILATOR+" "+sourceFile.OPTIONS+" "+sourceFile.getModuleOptions()
+
+    if not(self.isProgram):
+      commande = options+" -c "+self.filename+" -o "+self.get_outputs()[0]
+    else:
+      commande = options+" -o "+self.get_outputs()[0]+" "+self.filename+" "+self.extra+" "+" ".join([os.path.join(sourceFile.BUILD_FOLDER, obj) for obj in self.dependencies])
+
+    return commande
+
+  def run(self):
+    """method that compile the current source file. All the modules it uses must be compiled already.
+    This method can be called in a separate thread (see build())
+
+    Return : a tuple (source, returnCode, stderr), with stderr decoded as a string
+    """
+
+    process = subprocess.Popen(self.get_command(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+
+    (process_stdout, process_stderr) = process.communicate()
+    returnCode = process.poll()
+
+    return (self, returnCode, process_stderr.decode("utf-8", "replace"))
+
+  def compile(self, nb_jobs=1):
+    """method that check dependencies and compile the current source file, and all the modules it needs
+
+    Parameter :
+    nb_jobs=1 : number of source files that can be compiled at the same time
+    """
+
+    build([self], nb_jobs=nb_jobs)
 
   def __str__(self):
     """overload the str method. As a consequence, you can print the object via print name_instance
@@ -349,6 +551,13 @@ def prepare_compilation():
 
   sources_filename = glob.glob("*.f90")
 
+  sourceFile.loadScanCache()
+
+  # Source files that do not exist anymore are removed from the cache
+  for filename in list(sourceFile.scanCache.keys()):
+    if not(filename in sources_filename):
+      del(sourceFile.scanCache[filename])
+
   # We define the objects for each source file.
   sources = []
   for filename in sources_filename:
@@ -356,12 +565,312 @@ def prepare_compilation():
     sources.append(source)
 
 
-def compile_source(filename, name=None, extra=None):
+def read_state():
+  """return the dictionnary {source filename: key} of the objects currently in the build folder"""
+
+  state = {}
+  state_name = os.path.join(sourceFile.BUILD_FOLDER, STATE_NAME)
+  if not(os.path.isfile(state_name)):
+    return state
+
+  f = open(state_name, 'r')
+  for line in f:
+    words = line.split()
+    if (len(words) == 2):
+      state[words[0]] = words[1]
+  f.close()
+
+  return state
+
+def write_state(state):
+  """write the dictionnary {source filename: key} of the objects currently in the build folder"""
+
+  f = open(os.path.join(sourceFile.BUILD_FOLDER, STATE_NAME), 'w')
+  for (filename, key) in sorted(state.items()):
+    f.write("%s %s\n" % (filename, key))
+  f.close()
+
+def build(programs, nb_jobs=1, force=False, isExit=True):
+  """function that compile a list of programs and all the modules they need. The dependency graph is
+  built first, then each source file is compiled as soon as all the modules it uses are compiled, with
+  at most nb_jobs compilations at the same time. Programs are linked at the end.
+
+  A source file is not compiled if the objects in the source folder correspond to its key (see sourceFile.get_key()),
+  and objects are copied from the build cache if they were compiled before with the same key (with other options for instance).
+
+  Parameters :
+  programs : list of sourceFile objects
+  nb_jobs=1 : number of source files that can be compiled at the same time
+  force=False : if True, every source file is compiled, without using the build cache
+  isExit=True : if True, the script stops when there is a compilation error
+
+  Return : True if all the programs were compiled, False otherwise
+  """
+
+  for program in programs:
+    program.resolve()
+
+  # We list all the nodes of the dependency graph
+  sources = []
+  to_visit = list(programs)
+  while (to_visit != []):
+    source = to_visit.pop()
+    if not(source in sources):
+      sources.append(source)
+      to_visit.extend(source.module_sources)
+
+  if force:
+    state = {}
+  else:
+    state = read_state()
+
+  # The same objects can be built several times with different options (see the 'pgo' option)
+  for source in sources:
+    source.isCompiled = False
+
+  remaining = list(sources)
+  nb_running = 0
+  errors = []
+
+  # Each worker put its result in the queue, so that the main thread can wait for the first one that finish
+  results = queue.Queue()
+  pool = ThreadPool(max(nb_jobs, 1))
+
+  while (remaining != [] or nb_running > 0):
+    # We do not launch new compilations once there was an error
+    isNew = (errors == [])
+    while isNew:
+      isNew = False
+      ready = [source for source in remaining if all([module.isCompiled for module in source.module_sources])]
+
+      for source in ready:
+        remaining.remove(source)
+        source.key = source.get_key()
+
+        # Files that are up to date, or in the cache, can unlock other source files right away
+        if (state.get(source.filename) == source.key and all([os.path.isfile(filename) for filename in source.get_outputs()])):
+          source.isCompiled = True
+          isNew = True
+        elif (not(force) and source.restore()):
+          print("Restoring "+source.filename+" from the build cache...")
+          state[source.filename] = source.key
+          source.isCompiled = True
+          isNew = True
+        else:
+          if source.isProgram:
+            print(source.get_command())
+          print("Compiling "+source.filename+"...")
+          pool.apply_async(source.run, callback=results.put)
+          nb_running += 1
+
+    if (nb_running == 0):
+      break
+
+    (source, returnCode, process_stderr) = results.get()
+    nb_running -= 1
+
+    # if returnCode is not 0, then there was a problem
+    if (returnCode != 0):
+      errors.append((source, process_stderr))
+    else:
+      source.isCompiled = True
+      source.store()
+      state[source.filename] = source.key
+      if (len(process_stderr) != 0):
+        # We write compilation warnings in the following file, one source file after the other
+        f = open(LOG_NAME,'a')
+        f.write("===== %s =====\n%s" % (source.filename, process_stderr))
+        f.close()
+
+  pool.close()
+  pool.join()
+
+  write_state(state)
+
+  if (errors != []):
+    # We write compilation errors in the following file.
+    f = open(LOG_NAME,'w')
+    for (source, process_stderr) in errors:
+      f.write("===== %s =====\n%s" % (source.filename, process_stderr))
+    f.close()
+
+    if not(isExit):
+      return False
+
+    print("Compilation error in %s, see '%s'" % (", ".join([source.filename for (source, process_stderr) in errors]), LOG_NAME))
+    LogPostProcessing()
+    sys.exit(1)
+
+  return True
+
+def run_workload(program):
+  """function that run the representative simulation of PGO_WORKLOAD, to get the profile used by the profile-guided
+  optimization, or as a benchmark. The simulation is run in the 'workload' sub-folder of the build folder.
+
+  Parameter :
+  program : the sourceFile object of the mercury program
+
+  Return : a tuple (return code of the simulation, duration in seconds)
+  """
+
+  workload = os.path.join(sourceFile.BUILD_FOLDER, "workload")
+  if os.path.isdir(workload):
+    shutil.rmtree(workload)
+  shutil.copytree(PGO_WORKLOAD, workload)
+
+  for filename in ["message.in"] + glob.glob("*.dat"):
+    shutil.copy(filename, workload)
+
+  print("Running the representative simulation in %s..." % workload)
+  start = time.time()
+  process = subprocess.Popen(os.path.abspath(program.get_outputs()[0]), stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=workload)
+  (process_stdout, process_stderr) = process.communicate()
+  returnCode = process.poll()
+  duration = time.time() - start
+
+  return (returnCode, duration)
+
+def read_dump(folder):
+  """return the list of all the numbers (positions, velocities, spins) of the big bodies in the big.dmp file of a folder"""
+
+  values = []
+  f = open(os.path.join(folder, "big.dmp"), 'r')
+  for line in f:
+    if (line.startswith(")") or "=" in line):
+      continue
+    values.extend([float(word.replace("D", "E").replace("d", "e")) for word in line.split()])
+  f.close()
+
+  return values
+
+def is_within_tolerance(values, reference, tolerance):
+  """return True if all the values are close to the reference values (relative tolerance, with an absolute floor for values close to 0)"""
+
+  if (len(values) != len(reference)):
+    return False
+
+  for (value, ref) in zip(values, reference):
+    # The test is written that way so that NaN values fail
+    if not(abs(value - ref) <= tolerance * max(abs(value), abs(ref)) + 1e-14):
+      return False
+
+  return True
+
+def get_machine():
+  """return the name that identify the current machine and compiler in the file TUNED_NAME"""
+  return "%s %s" % (socket.gethostname(), COMPILATOR)
+
+def read_tuned_options():
+  """return the speed options found by the autotuner for the current machine and compiler, or None"""
+
+  if not(os.path.isfile(TUNED_NAME)):
+    return None
+
+  f = open(TUNED_NAME, 'r')
+  tuned = json.load(f)
+  f.close()
+
+  if get_machine() in tuned:
+    return tuned[get_machine()]["options"]
+
+  return None
+
+def autotune(program, reference_options, nb_jobs=1, repeat=2, tolerance=1e-6):
+  """function that compile mercury with each combination of AUTOTUNE_FLAGS, benchmark it on PGO_WORKLOAD, and
+  store the fastest combination whose results are within tolerance of the reference build in TUNED_NAME
+
+  Parameters :
+  program : the sourceFile object of the mercury program
+  reference_options : the options of the reference build (the 'test' options)
+  nb_jobs=1 : number of source files that can be compiled at the same time
+  repeat=2 : number of runs of the benchmark for each combination (the shortest is kept)
+  tolerance=1e-6 : relative difference allowed between the final positions and velocities of a combination and of the reference
+
+  Return : the fastest options, or None if no combination is accurate enough
+  """
+  global LOG_NAME
+  log_name = os.path.basename(LOG_NAME)
+
+  flags = AUTOTUNE_FLAGS[COMPILATOR]
+  candidates = []
+  for level in flags["levels"]:
+    for nb_toggles in range(len(flags["toggles"]) + 1):
+      for toggles in itertools.combinations(flags["toggles"], nb_toggles):
+        candidates.append(" ".join([flags["base"], level] + list(toggles)).strip())
+
+  # The reference is compiled and run first, the candidates are then compared to it.
+  results = []
+  for (index, options) in enumerate([reference_options] + candidates):
+    if (index == 0):
+      name = "reference"
+    else:
+      name = "%03d" % index
+    sourceFile.setBuildFolder(os.path.join(BUILD_FOLDER, "autotune", name))
+    LOG_NAME = os.path.join(sourceFile.BUILD_FOLDER, log_name)
+    sourceFile.setCompilingOptions(options)
+
+    print("[%d/%d] %s" % (index, len(candidates), options))
+    if not(build([program], nb_jobs=nb_jobs, isExit=False)):
+      print("  compilation error, see '%s'" % LOG_NAME)
+      if (index == 0):
+        return None
+      continue
+
+    durations = []
+    for run in range(repeat):
+      (returnCode, duration) = run_workload(program)
+      if (returnCode != 0):
+        break
+      durations.append(duration)
+
+    if (len(durations) != repeat):
+      print("  the simulation failed")
+      if (index == 0):
+        return None
+      continue
+
+    values = read_dump(os.path.join(sourceFile.BUILD_FOLDER, "workload"))
+
+    if (index == 0):
+      reference = values
+      reference_duration = min(durations)
+      print("  %.2f s" % reference_duration)
+      continue
+
+    isAccurate = is_within_tolerance(values, reference, tolerance)
+    if isAccurate:
+      print("  %.2f s" % min(durations))
+      results.append((min(durations), options))
+    else:
+      print("  %.2f s, results out of tolerance" % min(durations))
+
+  if (results == []):
+    return None
+
+  results.sort()
+  (duration, options) = results[0]
+
+  tuned = {}
+  if os.path.isfile(TUNED_NAME):
+    f = open(TUNED_NAME, 'r')
+    tuned = json.load(f)
+    f.close()
+
+  tuned[get_machine()] = {"options": options, "duration": duration, "reference_options": reference_options,
+                          "reference_duration": reference_duration, "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+  f = open(TUNED_NAME, 'w')
+  json.dump(tuned, f, indent=2, sort_keys=True)
+  f.close()
+
+  return options
+
+def compile_source(filename, name=None, extra=None, nb_jobs=1):
   """
   """
 
   source = sourceFile(filename, name=name, isProgram=True, extra_files=extra)
-  source.compile()
+  source.compile(nb_jobs=nb_jobs)
 
 def run_command(commande):
   """lance une commande qui sera typiquement soit une liste, soit une
@@ -417,12 +926,12 @@ def LogPostProcessing():
         objectFile.write(line)
       objectFile.close()
 
-def clean(exts):
+def clean(exts, folder="."):
   """supprime les fichiers correspondant à l'expression donnée. La fonction renvoit la sortie si ça c'est bien
   déroulée, sinon ne renvoit rien."""
   for ext in exts:
 
-    commande = "rm *."+ext
+    commande = "rm "+os.path.join(folder, "*."+ext)
 
     process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
 
@@ -451,7 +960,15 @@ isElement = True
 isClose = True
 gdb = False
 profiling = False
+isPGO = False # profile-guided optimization
+isAutotune = False # Search the fastest speed options for this machine
+repeat = 2 # Number of runs of the benchmark for each combination of the autotuner
+tolerance = 1e-6 # Relative difference allowed by the autotuner with the results of the 'test' options
 force = False # To force the compilation of every module
+variants = None # List of variants to compile at the same time, each one in a separate process
+isInstall = True # Copy the binaries from the build folder to the source folder
+isOpenMP = False # Parallel force loops, with OpenMP
+nb_jobs = multiprocessing.cpu_count() # Number of source files compiled at the same time
 ignoreOpkdWarnings = True
 
 isProblem = False
@@ -459,13 +976,17 @@ problem_message = """AIM: Compilation of mercury programs.
 By default, all of them, but one can specify one specific code to compile
 and avoid the others (mercury, element, close). The compilation of dependances is automatic.
 The compilation options are packed into 3 meta-options : test, debug and gdb.
-The modules that haven't changed since last compilation are not compiled again.
+Each set of options (variant) is compiled in its own folder (%s/opt, %s/test, %s/debug, %s/gdb, %s/profile)
+(with the suffix '_openmp' when compiled with OpenMP) and the binaries are then copied in the source folder.
+The modules that haven't changed since last compilation are not compiled again. Objects compiled
+with other options are kept in a build cache (%s), switching between options does not need a full compilation.
 If you want to force compilation of all modules, use the "force" option.
 
 The script can take various arguments:
 (no spaces between the key and the values, only separated by '=')
  * help : display a little help message on HOW to use various options
- * force : To force the compilation of every module even those not modified
+ * force : To force the compilation of every module even those not modified, without using the build cache
+ * jobs=%d : Number of source files compiled at the same time (-j%d also works)
  * name=source.f90 : To compile a specific code
  * mercury : To compile mercury only
  * element : To compile binary for outputs (element) only
@@ -475,17 +996,40 @@ The script can take various arguments:
   launching tests_mercury.py
  * debug : [%s] activate debug options
  * gdb : [%s] activate options for gdb
- * profiling : [%s] activate options for profiling
+ * profiling : [%s] activate options for profiling (profile_simulation.py run a simulation and summarize the profile)
+ * pgo : profile-guided optimization. mercury is compiled with instrumentation, a representative simulation
+  (%s) is run to get a profile, then everything is compiled again with speed options and the profile
+ * autotune : compile mercury with combinations of speed flags (%s), run the representative simulation
+  with each one, and keep the fastest whose results are close to those of the test options. They are stored in
+  %s and used afterwards instead of the default speed options on this machine
+ * repeat=%d : number of runs of the representative simulation for each combination (the shortest is kept)
+ * tolerance=%g : relative difference allowed between the final positions and velocities and those of the test options
+ * variants=opt,test : compile several variants at the same time. The binaries of the first
+  one are copied in the source folder
+ * noinstall : do not copy the binaries in the source folder (they are only in the build folder)
+ * openmp : [%s] compile with OpenMP, the force loops between big bodies are parallel when there are
+  enough of them. The number of threads is set with the environment variable OMP_NUM_THREADS. Results only
+  depend on the number of threads, not on the scheduling
 
  Example :
- Makefile.py gdb""" % (isTest, debug, gdb, profiling)
+ Makefile.py gdb
+ Makefile.py force jobs=4
+ Makefile.py variants=opt,test,debug
+ Makefile.py openmp
+ Makefile.py autotune tolerance=1e-8""" % (BUILD_FOLDER, BUILD_FOLDER, BUILD_FOLDER, BUILD_FOLDER, BUILD_FOLDER, CACHE_FOLDER, nb_jobs, nb_jobs, isTest, debug, gdb, profiling, PGO_WORKLOAD, os.path.join(BUILD_FOLDER, "autotune"), TUNED_NAME, repeat, tolerance, isOpenMP)
 
 value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
 
 # We get arguments from the script
 for arg in sys.argv[1:]:
+  # We also accept the '-j4' syntax of make
+  if (arg == "-j"):
+    continue
+  elif (arg.startswith("-j")):
+    arg = "jobs=" + arg[2:]
+  # Values can contain '=' (compilation flags for instance)
   try:
-    (key, value) = arg.split("=")
+    (key, value) = arg.split("=", 1)
   except:
     key = arg
     value = None
@@ -503,6 +1047,8 @@ for arg in sys.argv[1:]:
     force = True
     if (value != None):
       print(value_message % (key, key, value))
+  elif (key == 'jobs'):
+    nb_jobs = int(value)
   elif (key == 'test'):
     isTest = True
     if (value != None):
@@ -533,6 +1079,32 @@ for arg in sys.argv[1:]:
     profiling = True
     if (value != None):
       print(value_message % (key, key, value))
+  elif (key == 'pgo'):
+    isPGO = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'autotune'):
+    isAutotune = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'repeat'):
+    repeat = int(value)
+  elif (key == 'tolerance'):
+    tolerance = float(value)
+  elif (key == 'variants'):
+    variants = value.split(",")
+    for variant in variants:
+      if not(variant in VARIANTS):
+        print("The variant '%s' does not exist. Possible values are %s" % (variant, VARIANTS))
+        isProblem = True
+  elif (key == 'noinstall'):
+    isInstall = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'openmp'):
+    isOpenMP = True
+    if (value != None):
+      print(value_message % (key, key, value))
   elif (key == 'help'):
     isProblem = True
     if (value != None):
@@ -545,11 +1117,57 @@ if isProblem:
   print(problem_message)
   exit()
 
+if (variants != None):
+  # Each variant is compiled by another call of this script, in its own process. Other arguments are passed as is.
+  VARIANT_ARGUMENTS = {"opt": [], "test": ["test"], "debug": ["debug"], "gdb": ["gdb"], "profile": ["profiling"], "pgo": ["pgo"]}
+  arguments = [arg for arg in sys.argv[1:] if not(arg.split("=")[0] in ["variants", "jobs", "noinstall"] or arg.startswith("-j"))]
+  jobs_per_variant = max(nb_jobs // len(variants), 1)
+
+  processes = []
+  for (index, variant) in enumerate(variants):
+    command = [sys.executable, os.path.abspath(__file__), "jobs=%d" % jobs_per_variant] + VARIANT_ARGUMENTS[variant] + arguments
+    if (index != 0 or not(isInstall)):
+      command.append("noinstall")
+    processes.append(subprocess.Popen(command))
+
+  returnCodes = [process.wait() for process in processes]
+
+  for (variant, returnCode) in zip(variants, returnCodes):
+    if (returnCode == 0):
+      print("%s : compiled in %s" % (variant, os.path.join(BUILD_FOLDER, variant)))
+    else:
+      print("%s : compilation error, see '%s'" % (variant, os.path.join(BUILD_FOLDER, variant, LOG_NAME)))
+
+  sys.exit(max(returnCodes))
+
+# The variant is defined the same way as the options below
+if isAutotune:
+  variant = "autotune"
+elif isPGO:
+  variant = "pgo"
+elif profiling:
+  variant = "profile"
+elif gdb:
+  variant = "gdb"
+elif debug:
+  variant = "debug"
+elif isTest:
+  variant = "test"
+else:
+  variant = "opt"
+
+# Objects compiled with OpenMP are in the build cache too, but the binaries must not replace the serial ones
+if isOpenMP:
+  variant += "_openmp"
+
+sourceFile.setBuildFolder(os.path.join(BUILD_FOLDER, variant))
+LOG_NAME = os.path.join(sourceFile.BUILD_FOLDER, LOG_NAME)
+
 isModifs = is_non_committed_modifs()
 
 # We clean undesirable files. Indeed, we will compile everything everytime.
 if force:
-  clean(["o", "mod"])
+  clean(["o", "mod"], folder=sourceFile.BUILD_FOLDER)
 
 
 
@@ -565,6 +1183,11 @@ elif isTest:
   OPTIONS = TEST_OPTIONS
 else:
   OPTIONS = OPTIMIZATIONS
+  # The speed options found by 'Makefile.py autotune' on this machine, if any, replace the default ones
+  tuned_options = read_tuned_options()
+  if (tuned_options != None and not(isAutotune)):
+    print("Using the speed options of %s for '%s' : %s" % (TUNED_NAME, get_machine(), tuned_options))
+    OPTIONS = tuned_options
 
 if gdb:
   OPTIONS = GDB_OPTIONS
@@ -572,22 +1195,83 @@ if gdb:
 if profiling:
   OPTIONS = PROFILING_OPTIONS
 
+if isOpenMP:
+  if not(COMPILATOR in OPENMP_OPTIONS):
+    print("OpenMP is not available for '%s'" % COMPILATOR)
+    sys.exit(1)
+  OPTIONS += " " + OPENMP_OPTIONS[COMPILATOR]
+
 sourceFile.setCompilator(COMPILATOR)
 sourceFile.setCompilingOptions(OPTIONS)
 
 prepare_compilation()
 
+programs = []
 if (isManual):
-  compile_source(filename=source_name)
+  programs.append(sourceFile(source_name, isProgram=True))
 
 if (isMercury):
-  compile_source(filename="mercury.f90")
+  programs.append(sourceFile("mercury.f90", isProgram=True))
 
 if (isElement):
-  compile_source(filename="element.f90")
+  programs.append(sourceFile("element.f90", isProgram=True))
 
 if (isClose):
-  compile_source(filename="close.f90")
+  programs.append(sourceFile("close.f90", isProgram=True))
+
+sourceFile.saveScanCache()
+
+if isAutotune:
+  if not(COMPILATOR in AUTOTUNE_FLAGS):
+    print("No flags to try with '%s', see AUTOTUNE_FLAGS" % COMPILATOR)
+    sys.exit(1)
+
+  tuned_options = autotune(sourceFile("mercury.f90", isProgram=True), TEST_OPTIONS, nb_jobs=nb_jobs, repeat=repeat, tolerance=tolerance)
+
+  if (tuned_options == None):
+    print("No combination of flags gives results within tolerance of the test options")
+    sys.exit(1)
+
+  print("Fastest options : %s (stored in %s)" % (tuned_options, TUNED_NAME))
+  print("Run 'Makefile.py' again to compile with them")
+  sys.exit(0)
+elif isPGO:
+  if not(COMPILATOR in PGO_OPTIONS):
+    print("Profile-guided optimization is not available for '%s'" % COMPILATOR)
+    sys.exit(1)
+
+  (generate_options, use_options) = PGO_OPTIONS[COMPILATOR]
+  profile_folder = {"folder": os.path.abspath(sourceFile.BUILD_FOLDER)}
+
+  # The instrumented mercury is always needed to get the profile
+  if not("mercury.f90" in [program.filename for program in programs]):
+    programs.append(sourceFile("mercury.f90", isProgram=True))
+
+  # Profiles of a previous run must not be mixed with the new ones
+  clean(["gcda", "dyn", "dpi"], folder=sourceFile.BUILD_FOLDER)
+
+  sourceFile.setCompilingOptions(OPTIONS + " " + generate_options % profile_folder)
+  build(programs, nb_jobs=nb_jobs, force=force)
+
+  (returnCode, duration) = run_workload(sourceFile.findSource["mercury.f90"])
+  if (returnCode != 0):
+    print("The representative simulation failed (return code %d), see %s" % (returnCode, os.path.join(sourceFile.BUILD_FOLDER, "workload")))
+    sys.exit(1)
+
+  # The objects must be compiled again, even if the source did not change, because the profile is not in the key of the build cache
+  sourceFile.setCompilingOptions(OPTIONS + " " + use_options % profile_folder)
+  build(programs, nb_jobs=nb_jobs, force=True)
+else:
+  # All the programs are compiled at the same time, so that modules they all need are compiled only once
+  build(programs, nb_jobs=nb_jobs, force=force)
+
+# The binaries are copied in the source folder, where the scripts expect them. The copy is renamed afterwards
+# so that the binaries of running simulations are not modified.
+if isInstall:
+  for program in programs:
+    tmp_name = "%s.%d.tmp" % (program.name, os.getpid())
+    shutil.copy(program.get_outputs()[0], tmp_name)
+    os.rename(tmp_name, program.name)
 
 if (isModifs):
   print("Warning: There is non committed modifs!")
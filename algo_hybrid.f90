@@ -16,6 +16,7 @@ module algo_hybrid
   use user_module
   use forces, only : mfo_ngf
   use system_properties, only : mco_iden
+!$ use omp_lib
   
   implicit none
   
@@ -784,6 +785,7 @@ end subroutine mfo_hy
 subroutine mfo_drct (start_index,nbod,nbig,m,x,rcrit,a,stat)
   use physical_constant
   use mercury_constant
+  use forces, only : mfo_thread_init, mfo_thread_sum, thread_acc
 
   implicit none
 
@@ -802,7 +804,7 @@ subroutine mfo_drct (start_index,nbod,nbig,m,x,rcrit,a,stat)
 
   ! Local
   integer :: i0
-  integer :: i,j
+  integer :: i,j,thread,nthreads
   real(double_precision) :: dx,dy,dz,s,s_1,s2,s_3,rc,rc2,q,q2,q3,q4,q5,tmp2,faci,facj
   
   !------------------------------------------------------------------------------
@@ -813,7 +815,14 @@ subroutine mfo_drct (start_index,nbod,nbig,m,x,rcrit,a,stat)
     i0 = start_index
   endif
     
+  ! Each thread accumulates in its own array, so that the sum does not depend on the scheduling
+  call mfo_thread_init (nbod,nbig,nthreads)
+  
+  thread = 0
+  !$omp parallel do if(nthreads.gt.1) num_threads(nthreads) schedule(static,1) default(shared) &
+  !$omp private(i,j,thread,dx,dy,dz,s,s_1,s2,s_3,rc,rc2,q,q2,q3,q4,q5,tmp2,faci,facj)
   do i = i0, nbig
+!$   thread = omp_get_thread_num()
      do j = i + 1, nbod
         dx = x(1,j) - x(1,i)
         dy = x(2,j) - x(2,i)
@@ -841,14 +850,17 @@ subroutine mfo_drct (start_index,nbod,nbig,m,x,rcrit,a,stat)
         
         faci = tmp2 * m(i)
         facj = tmp2 * m(j)
-        a(1,j) = a(1,j)  -  faci * dx
-        a(2,j) = a(2,j)  -  faci * dy
-        a(3,j) = a(3,j)  -  faci * dz
-        a(1,i) = a(1,i)  +  facj * dx
-        a(2,i) = a(2,i)  +  facj * dy
-        a(3,i) = a(3,i)  +  facj * dz
+        thread_acc(1,j,thread) = thread_acc(1,j,thread)  -  faci * dx
+        thread_acc(2,j,thread) = thread_acc(2,j,thread)  -  faci * dy
+        thread_acc(3,j,thread) = thread_acc(3,j,thread)  -  faci * dz
+        thread_acc(1,i,thread) = thread_acc(1,i,thread)  +  facj * dx
+        thread_acc(2,i,thread) = thread_acc(2,i,thread)  +  facj * dy
+        thread_acc(3,i,thread) = thread_acc(3,i,thread)  +  facj * dz
      end do
   end do
+  !$omp end parallel do
+  
+  call mfo_thread_sum (nbod,nthreads,a)
   
   !------------------------------------------------------------------------------
   
@@ -10,6 +10,7 @@ import sys
 import subprocess
 import simulations_utilities
 import mercury_utilities
+import mercury_monitoring
 
 # Get current working directory
 rep_exec = os.getcwd()
@@ -39,6 +40,7 @@ isForcedStart = False # will erase output file if they exists and run all the si
 isForcedContinue = False # will continue the simulation no matter what
 isMeta = False # If we consider the current folder as a folder that list sub-meta-simulations where the simulations really are
 isContinue = False # Do we want to continue simulations that did not have time to finish?
+isChain = False # Do we want to split the remaining time of continued simulations in chained jobs?
 isVerbose = False # Force display of individual information when the 'meta' option is active
 showFinished = False # By default, We only show problems. 
 WALLTIME = None
@@ -53,6 +55,8 @@ problem_message = "The script can take various arguments :" + "\n" + \
 " * force-start : will erase output file if they exists and run all the simulations." + "\n" + \
 " * force-continue : will erase output file if they exists and continue all the simulations" + "\n" + \
 " * walltime : (in hours) the estimated time for the job. Only used for avakas" + "\n" + \
+" * chain : (with continue) the remaining time is predicted from the speed of the previous dumps, and split" + "\n" + \
+"           into chained jobs whose walltime is lower than the 'walltime' option (the queue limit)" + "\n" + \
 " * finished : Instead of show problems, will only show finished simulations" + "\n" + \
 " * verbose : Froce show of individual informations when the 'meta' option is active" + "\n" + \
 "" + "\n" + \
@@ -83,6 +87,8 @@ for arg in sys.argv[1:]:
     isContinue = False
   elif (key == 'continue'):
     isContinue = True
+  elif (key == 'chain'):
+    isChain = True
   elif (key == 'verbose'):
     isVerbose = True
   elif (key == 'meta'):
@@ -105,6 +111,10 @@ if (('avakas' in hostname) and WALLTIME == None and (isContinue or isRestart or
   print("Walltime option must be set. type 'help' for a description of the options")
   exit()
 
+if (isChain and WALLTIME == None):
+  print("Walltime option (the maximum walltime of the queue) must be set with the 'chain' option")
+  exit()
+
 # We go in each sub folder of the current working directory
 
 # If sub folders are meta simulation folders instead of folders, we list the meta simulation folder to run the test in each sub folder.
@@ -167,7 +177,8 @@ for meta in meta_list:
     is_finished = int(stdout.split("\n")[0]) # We get the number of times "Integration complete" is present in the end of the 'info.out' file
     
     # If there is Nan, we do not want to continue the simulation, but restart it, or check manually, so theses two kinds of problems are separated.
-    if simu not in NaN_folder:
+    # Simulations stopped by mercury-watchdog.py are treated as if they had NaN.
+    if ((simu not in NaN_folder) and not(mercury_monitoring.is_failed())):
       if (is_finished == 0):
         simulation_status = 1
         
@@ -185,7 +196,10 @@ for meta in meta_list:
       log_message = "%s/%s : The simulation is not finished" % (absolute_parent_path, simu)
     
     elif (simulation_status == 2 and not(showFinished)):
-      log_message = "%s/%s : NaN are present" % (absolute_parent_path, simu)
+      if mercury_monitoring.is_failed():
+        log_message = "%s/%s : Stopped by the watchdog" % (absolute_parent_path, simu)
+      else:
+        log_message = "%s/%s : NaN are present" % (absolute_parent_path, simu)
     else:
 		log_message = None
 		
@@ -195,7 +209,13 @@ for meta in meta_list:
       else:
         logs[meta].append(log_message)
     
-    if (((simulation_status != 0) and (isContinue or isRestart)) or (isForcedStart or isForcedContinue)):
+    # We store the current dump, to be able to measure the speed of the integration
+    mercury_monitoring.ProgressHistory(".").record()
+    
+    if (((simulation_status == 1) and isContinue and isChain) and not(isForcedStart or isForcedContinue)):
+      (nb_jobs, walltime) = mercury_utilities.prepareChainedSubmission(BinaryPath=binaryPath, max_walltime=WALLTIME)
+      print("\t%d chained job(s) of %.1f hours" % (nb_jobs, walltime))
+    elif (((simulation_status != 0) and (isContinue or isRestart)) or (isForcedStart or isForcedContinue)):
       mercury_utilities.prepareSubmission(BinaryPath=binaryPath, walltime=WALLTIME)
     
     # If the option 'start' is given, we force the run of the simulation, whatever there is an old simulation or not in the folder.
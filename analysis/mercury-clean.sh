@@ -4,6 +4,7 @@
 
 function clean {
     rm *.out
+    rm *.bin
     rm *.dmp
     rm *.tmp
     
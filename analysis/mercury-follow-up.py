@@ -8,10 +8,15 @@ import sys
 import autiwa
 import pdb
 import subprocess
+import time
+import mercury_monitoring
+from multiprocessing.pool import ThreadPool
 
 # Get the machine hostname
 #~ hostname = simulations_utilities.getHostname()
 
+NB_THREADS = 32 # maximum number of jobs polled at the same time
+
 class Temps(object):
   """Classe qui dÃ©finit un temps. 
   Ceci permet d'additionner deux objets temps, les afficher Ã  l'aide 
@@ -169,12 +174,14 @@ def getJobInfos(jobID):
 isAll = False # to have info on all the running simulations
 isProblem = False
 isVerbose = True
+isWatchdog = False # to stop the simulations that diverged (see mercury-watchdog.py)
 
 problem_message = " This script will show information about a running simulation" + "\n" + \
 "The script can take various arguments :" + "\n" + \
 "(no spaces between the key and the values, only separated by '=')" + "\n" + \
 " * all : to have info on all the running simulations"  + "\n" + \
 " * verbose : to display more infos about the simulations (must be defined after 'all' option)"  + "\n" + \
+" * watchdog : stop the simulations with NaN or a too big energy error (see mercury-watchdog.py)"  + "\n" + \
 " * help : display a little help message on HOW to use various options"   + "\n" + \
 "\nExample:"  + "\n" + \
 "> mercury-follow-up.py"  + "\n" + \
@@ -194,6 +201,8 @@ for arg in sys.argv[1:]:
     isVerbose = False
   elif (key == 'verbose'):
     isVerbose = True
+  elif (key == 'watchdog'):
+    isWatchdog = True
   else:
     print("the key '"+key+"' does not match")
     isProblem = True
@@ -217,19 +226,15 @@ if isAll:
   
   jobIDs = [int(line.split()[0]) for line in lines]
 else:
-  (process_stdout, process_stderr, return_code) = lancer_commande("ls *.o[0-9]*")
-  if (return_code != 0):
+  list_jobs = mercury_monitoring.get_job_outputs(".")
+  if (list_jobs == []):
     print("/!\ Error\nUnable to find running simulation information. \nIf you are in a meta folder, don't forget the 'all' option\n\n")
     print(problem_message)
     exit()
-    
-  list_jobs = process_stdout.split("\n")
-  list_jobs.remove('') # we remove an extra element that doesn't mean anything
-  list_jobs.sort()
 
   current_job = list_jobs[-1]
 
-  jobID = int(current_job.split(".o")[1])
+  jobID = int(current_job.split(".o")[-1])
   jobIDs = [jobID]
 
 
@@ -239,89 +244,110 @@ else:
 # We get the execution time, if any (must be a job, and not a manual execution)
 ####################
 
-infoAll = [] # The array where to store display infos as strings (in tuple to allow sorting)
-waiting_list = []
-running_list = []
-for jobID in jobIDs:
-  (ellapsed_time, cwd) = getJobInfos(jobID)
+def getSimulationInfos(jobID):
+  """Get all the informations about the simulation run by the job whose ID is given in parameter.
   
-  os.chdir(cwd)
+  Every path is absolute (no os.chdir) so that several simulations can be followed at the same time in different threads.
   
-  # In case it exists several old jobs for the same simulation :
-  (process_stdout, process_stderr, return_code) = lancer_commande("ls *.o[0-9]*")
-  if (return_code != 0):
-    waiting_list.append("%d" % jobID)
-    continue
-  else:
-    running_list.append("%d" % jobID)
-    
-  list_jobs = process_stdout.split("\n")
-  list_jobs.remove('') # we remove an extra element that doesn't mean anything
-  list_jobs.sort()
+  Return : (jobID, None) if the job is still waiting in the queue, (jobID, (remaining_time, infos)) else, 
+  with remaining_time in seconds (to sort the simulations) and infos the string to display.
+  """
   
-  if (len(list_jobs) > 1):
-    ellapsed_time = Temps(0)
-    for job in list_jobs:
-      current_ID = int(job.split(".o")[1])
-      (tmp_time, dummy) = getJobInfos(jobID)
-      ellapsed_time = ellapsed_time + tmp_time
+  (ellapsed_time, cwd) = getJobInfos(jobID)
   
-  # NORMAL CALCULATION
+  # If the job did not start yet, there is no output file of the job scheduler
+  if (mercury_monitoring.get_job_outputs(cwd) == []):
+    return (jobID, None)
   
   # We count the initial number of bodies
-  (stdout, stderr, returnCode) = lancer_commande('grep "m=" big.in|wc -l')
-  if (returnCode == 0):
-    init_nb_bodies = int(stdout)
-    #~ init_nb_bodies.remove('') # we remove an extra element that doesn't mean anything
-  else:
-    init_nb_bodies = 0
-
-  # We check which folders contain NaN
-  (stdout, stderr, returnCode) = lancer_commande('grep "m=" big.dmp|wc -l')
-  if (returnCode == 0):
-    current_nb_bodies = int(stdout)
-    #~ init_nb_bodies.remove('') # we remove an extra element that doesn't mean anything
+  init_nb_bodies = 0
+  if os.path.isfile(os.path.join(cwd, "big.in")):
+    object_file = open(os.path.join(cwd, "big.in"), 'r')
+    init_nb_bodies = object_file.read().count("m=")
+    object_file.close()
+  
+  # We store the current dump in the history of the simulation, then we use the whole history to get the speed.
+  history = mercury_monitoring.ProgressHistory(cwd)
+  sample = history.record()
+  if (sample != None):
+    (wall_clock, current_time, current_nb_bodies) = sample
   else:
-    current_nb_bodies = 0
-
+    (current_time, current_nb_bodies) = (0., 0)
+  
   # Integration Time
-  parameters = open("param.in", 'r')
-  lines = parameters.readlines()
-  parameters.close()
-
-  # in reversed order to be sure to test all the line (because once we delete a line, the index are shifted)
-  for line in reversed(lines):
-    if (line[0] == ')'):
-      lines.remove(line)
-  t_start = float(lines[1].split("=")[1])
-  t_stop = float(lines[2].split("=")[1])
-
+  paramin = mercury_monitoring.read_parameters(cwd)
+  t_start = paramin.get_start_time()
+  t_stop = paramin.get_stop_time()
+  
   integration_time = (t_stop - t_start) / 365.25
-
-  # Current time
-  big = open("big.dmp", 'r')
-  for i in range(5):
-    line = big.readline()
-  big.close()
-  current_time = float(line.split("=")[1]) / 365.25 # In years
-
+  current_time = (current_time - t_start) / 365.25 # In years
+  
   percentage = current_time / integration_time * 100.
   
-  remaining_time = Temps(ellapsed_time.temps * (100. / percentage - 1.))
-    
-    
+  remaining = history.get_remaining_walltime()
+  if (remaining != None):
+    remaining_time = Temps(remaining)
+    rate = history.get_rate() * Temps.AN / 365.25 # in years of simulation per wall year
+  elif (percentage > 0):
+    # Not enough dumps so far, we extrapolate from the CPU time of the job
+    remaining_time = Temps(ellapsed_time.temps * (100. / percentage - 1.))
+    rate = None
+  else:
+    remaining_time = Temps(0)
+    rate = None
+  
   # Print infos
   infos = "jobID %d\n" % jobID
   infos += "    %s\n" % cwd
+  
+  if isWatchdog:
+    watchdog = mercury_monitoring.Watchdog(cwd)
+    reason = watchdog.check()
+    if (reason != None):
+      watchdog.stop(reason)
+      infos += "    /!\ Stopped by the watchdog : %s\n" % reason
 
   if isVerbose:
     infos += "    Number of bodies : Initial=%d ; Current=%d\n" % (init_nb_bodies, current_nb_bodies)
     infos += "    Integration time : %g / %g years (%.1f%%)\n" % (current_time, integration_time, percentage)
     infos += "    Ellapsed time = %s / Remaining time < %s\n" % (ellapsed_time, remaining_time)
+    if (rate != None):
+      infos += "    Speed = %.3g years/year ; ETA : %s\n" % (rate, time.strftime("%d-%m-%Y at %H:%M", time.localtime(history.get_eta())))
   else:
     infos += "    [end] %s (%.1f%%)\n" % (remaining_time, percentage)
   
-  infoAll.append((remaining_time.temps, infos))
+  return (jobID, (remaining_time.temps, infos))
+
+def pollSimulation(jobID):
+  """Same as getSimulationInfos, but an error in one simulation (e.g. a param.in that can't be read) must not 
+  stop the polling of the others.
+  
+  Return : the output of getSimulationInfos, or (jobID, error) with error the error message (string) if it failed
+  """
+  
+  try:
+    return getSimulationInfos(jobID)
+  except Exception as error:
+    return (jobID, "%s: %s" % (type(error).__name__, error))
+
+# All the jobs are polled at the same time. Most of the time is spent waiting for qstat, so threads are enough.
+pool = ThreadPool(min(NB_THREADS, max(len(jobIDs), 1)))
+results = pool.map(pollSimulation, jobIDs)
+pool.close()
+pool.join()
+
+infoAll = [] # The array where to store display infos as strings (in tuple to allow sorting)
+waiting_list = []
+running_list = []
+error_list = []
+for (jobID, result) in results:
+  if (result == None):
+    waiting_list.append("%d" % jobID)
+  elif (type(result) == str):
+    error_list.append("jobID %d : %s" % (jobID, result))
+  else:
+    running_list.append("%d" % jobID)
+    infoAll.append(result)
 
 # To display infos in some order
 infoAll.sort(reverse=True)
@@ -331,4 +357,6 @@ for (ti, info) in infoAll:
 
 nb_wait = len(waiting_list)
 print("%d jobs on waiting list : %s" % (nb_wait, " ".join(waiting_list)))
-print("%d jobs running" % len(running_list))
\ No newline at end of file
+print("%d jobs running" % len(running_list))
+if (error_list != []):
+  print("%d jobs that could not be read :\n  %s" % (len(error_list), "\n  ".join(error_list)))
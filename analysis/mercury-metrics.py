@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# v1.0
+# To export the metrics of running simulations (progress, number of bodies, energy error, speed, status)
+# in a file that can be read by a dashboard (JSON) or by the textfile collector of Prometheus' node exporter.
+
+import os
+import sys
+import time
+import json
+import mercury_monitoring
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+isMeta = False # If we consider the current folder as a folder that list sub-meta-simulations where the simulations really are
+isFolder = False # If the current folder is a simulation folder, and not a folder containing simulations
+isOnce = False # Only export one time, instead of looping
+FORMATS = ["json", "prometheus"]
+format = "json"
+output = None # Name of the output file. By default, depends on the format
+threshold = mercury_monitoring.ENERGY_THRESHOLD
+interval = 60 # seconds between two exports
+
+# Prometheus gauges (name, key in the metrics, help)
+GAUGES = [("mercury_simulated_time_years", "time", "Simulated time since the start of the integration (years)"),
+          ("mercury_progress_ratio", "fraction", "Fraction of the integration already done"),
+          ("mercury_big_bodies", "nb_bodies", "Number of big bodies in the last dump"),
+          ("mercury_energy_error", "energy_error", "Last relative energy error dE/E"),
+          ("mercury_steps_per_second", "steps_per_second", "Integration speed (timesteps per wall second)")]
+
+isProblem = False
+problem_message = "Export the metrics of the simulations in a file, refreshed regularly." + "\n" + \
+"Output files are only read from where we stopped the previous time, so that refreshes are cheap." + "\n" + \
+"The script can take various arguments :" + "\n" + \
+"(no spaces between the key and the values, only separated by '=')" + "\n" + \
+" * help : display a little help message on HOW to use various options" + "\n" + \
+" * meta : option that will consider the current folder as a folder that list meta simulation instead of simple simulations" + "\n" + \
+" * folder : the current folder is the simulation folder itself" + "\n" + \
+" * format=%s : format of the export file, among %s" % (format, FORMATS) + "\n" + \
+" * output=mercury.json : name of the export file (mercury.json or mercury.prom by default)" + "\n" + \
+" * threshold=%g : relative energy error above which the simulation is considered as diverged" % threshold + "\n" + \
+" * interval=%d : time (in seconds) between two exports" % interval + "\n" + \
+" * once : only export one time and exit (to be used in a crontab)" + "\n" + \
+"" + "\n" + \
+"Example : \n" + \
+"> mercury-metrics.py meta format=prometheus output=/var/lib/node_exporter/mercury.prom\n" + \
+"> mercury-metrics.py once"
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+  if (key == 'meta'):
+    isMeta = True
+  elif (key == 'folder'):
+    isFolder = True
+  elif (key == 'format'):
+    format = value
+  elif (key == 'output'):
+    output = value
+  elif (key == 'threshold'):
+    threshold = float(value)
+  elif (key == 'interval'):
+    interval = float(value)
+  elif (key == 'once'):
+    isOnce = True
+  elif (key == 'help'):
+    isProblem = True
+  else:
+    print("the key '"+key+"' does not match")
+    isProblem = True
+
+if not(format in FORMATS):
+  print("The format '%s' does not exist. Possible values are %s" % (format, FORMATS))
+  isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+if (output == None):
+  if (format == "json"):
+    output = "mercury.json"
+  else:
+    output = "mercury.prom"
+
+def list_simulations():
+  """return the list of simulation folders to follow, relative to the current working directory"""
+  if isFolder:
+    return ["."]
+
+  if isMeta:
+    meta_list = [dir for dir in os.listdir(".") if (os.path.isdir(dir))]
+  else:
+    meta_list = ["."]
+
+  simulations = []
+  for meta in meta_list:
+    for simu in os.listdir(meta):
+      folder = os.path.normpath(os.path.join(meta, simu))
+      if (os.path.isfile(os.path.join(folder, "param.in"))):
+        simulations.append(folder)
+  simulations.sort()
+
+  return simulations
+
+def write_json(metrics):
+  """return the content of the export file in JSON"""
+  return json.dumps({"timestamp": time.time(), "simulations": metrics}, indent=2, sort_keys=True) + "\n"
+
+def write_prometheus(metrics):
+  """return the content of the export file in the text format of Prometheus. Values that are not known yet are
+  not written."""
+  lines = []
+  for (name, key, help) in GAUGES:
+    lines.append("# HELP %s %s" % (name, help))
+    lines.append("# TYPE %s gauge" % name)
+    for simulation in metrics:
+      value = simulation[key]
+      if (value != None):
+        lines.append('%s{simulation="%s"} %.10g' % (name, simulation["simulation"], value))
+
+  # The status is a label, the value being 1 for the current status of the simulation
+  name = "mercury_status"
+  lines.append("# HELP %s Status of the simulation (%s)" % (name, ", ".join(mercury_monitoring.SimulationMetrics.STATUS)))
+  lines.append("# TYPE %s gauge" % name)
+  for simulation in metrics:
+    for status in mercury_monitoring.SimulationMetrics.STATUS:
+      lines.append('%s{simulation="%s",status="%s"} %d' % (name, simulation["simulation"], status, int(simulation["status"] == status)))
+
+  return "\n".join(lines) + "\n"
+
+# The objects are kept between two exports, that way, each file is only read from where we stopped the previous time.
+simulations = {}
+
+while True:
+  metrics = []
+  for folder in list_simulations():
+    if folder not in simulations:
+      simulations[folder] = mercury_monitoring.SimulationMetrics(folder, threshold=threshold)
+    # A simulation that can't be read (e.g. an incomplete param.in) must not stop the export of the others
+    try:
+      metrics.append(simulations[folder].get())
+    except Exception as error:
+      metrics.append({"simulation": folder, "time": None, "fraction": None, "nb_bodies": None, "energy_error": None,
+                      "steps_per_second": None, "status": "error", "error": "%s: %s" % (type(error).__name__, error)})
+
+  if (format == "json"):
+    content = write_json(metrics)
+  else:
+    content = write_prometheus(metrics)
+
+  # We write in a temporary file first so that the export file is never read while half written
+  tmp_file = output + ".tmp"
+  object_file = open(tmp_file, 'w')
+  object_file.write(content)
+  object_file.close()
+  os.rename(tmp_file, output)
+
+  if isOnce:
+    break
+
+  time.sleep(interval)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# v1.0
+# To run a parameter sweep (grid, Latin hypercube or Sobol design) over the keys of meta_simulation.in.
+# Each point of the sweep is a meta simulation folder, created and launched with mercury-meta-simulation.py
+
+import os
+import sys
+import subprocess
+import mercury_sweep
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+toLaunch = True # Do we launch the simulations once the files are created?
+isDry = False # Only display the points, without creating anything
+sweep_file = mercury_sweep.SWEEP_FILENAME
+
+isProblem = False
+problem_message = "Expand the parameter sweep defined in '%s' into meta simulation folders and launch them." % sweep_file + "\n" + \
+"Each point is a copy of the base meta_simulation.in where the swept keys are replaced." + "\n" + \
+"Points already created (same parameter file, see '%s') are skipped, so that the script can be run again" % mercury_sweep.INDEX_FILENAME + "\n" + \
+"after adding points or keys to the sweep." + "\n" + \
+"The script can take various arguments :" + "\n" + \
+"(no spaces between the key and the values, only separated by '=')" + "\n" + \
+" * help : display a little help message on HOW to use various options" + "\n" + \
+" * demo : will create a '%s' file to show what can be defined" % sweep_file + "\n" + \
+" * file=%s : the name of the sweep file" % sweep_file + "\n" + \
+" * norun : will create the various folders and files, but will not run the simulations" + "\n" + \
+" * dry : only display the points of the sweep, without creating anything" + "\n" + \
+"" + "\n" + \
+"Example : \n" + \
+"> mercury-sweep.py demo\n" + \
+"> mercury-sweep.py norun"
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+  if (key == 'demo'):
+    print("A demo file '%s' is being generated..." % sweep_file)
+    demo_file = open(sweep_file, 'w')
+    demo_file.write(mercury_sweep.DEMO_FILE)
+    demo_file.close()
+    exit()
+  elif (key == 'file'):
+    sweep_file = value
+  elif (key == 'norun'):
+    toLaunch = False
+  elif (key == 'dry'):
+    isDry = True
+  elif (key == 'help'):
+    isProblem = True
+  else:
+    print("the key '"+key+"' does not match")
+    isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+scriptFolder = os.path.dirname(os.path.realpath(__file__)) # the folder in which the script is.
+meta_script = os.path.join(scriptFolder, "mercury-meta-simulation.py")
+
+sweep = mercury_sweep.read_sweep(sweep_file)
+points = mercury_sweep.generate_points(sweep)
+
+base_file = open(sweep["base"], 'r')
+base_lines = base_file.readlines()
+base_file.close()
+
+index = mercury_sweep.read_index()
+
+print("%s design : %d points over %s" % (sweep["design"], len(points), ", ".join([dimension.key for dimension in sweep["dimensions"]])))
+
+nb_created = 0
+for point in points:
+  content = mercury_sweep.write_meta_simulation(base_lines, point)
+  point_hash = mercury_sweep.get_hash(content)
+  values = " ; ".join(["%s = %s" % (key, mercury_sweep.format_value(value)) for (key, value) in point])
+
+  # Identical points (in this design, or already created by a previous run) are only integrated once
+  if (point_hash in index):
+    print("%s : %s (already exists)" % (index[point_hash], values))
+    continue
+
+  folder_name = mercury_sweep.FOLDER_PREFIX + point_hash[:10]
+  print("%s : %s" % (folder_name, values))
+  index[point_hash] = folder_name
+  nb_created += 1
+
+  if isDry:
+    continue
+
+  if not(os.path.exists(folder_name)):
+    os.mkdir(folder_name)
+
+  meta_file = open(os.path.join(folder_name, "meta_simulation.in"), 'w')
+  meta_file.write(content)
+  meta_file.close()
+
+  # The points are scheduled in the order of the design. For space-filling designs, the first points already cover the whole parameter space.
+  command = [meta_script]
+  if not(toLaunch):
+    command.append("norun")
+  job = subprocess.Popen(command, cwd=folder_name)
+  returncode = job.wait()
+
+  # A point is only indexed once its simulations were created, so that a failed point is tried again by the next run
+  if (returncode != 0):
+    print("Error while creating the simulations of %s, it will be retried by the next run" % folder_name)
+  else:
+    mercury_sweep.add_to_index(point_hash, folder_name, point)
+
+print("%d new points" % nb_created)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# v1.0
+# To stop running simulations as soon as NaN or Inf appear, or when the energy error is too big.
+# The folder is then marked as failed so that 'mercury-check-simulation.py restart' can restart it.
+
+import os
+import sys
+import time
+import mercury_monitoring
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+isMeta = False # If we consider the current folder as a folder that list sub-meta-simulations where the simulations really are
+isFolder = False # If the current folder is a simulation folder, and not a folder containing simulations
+isOnce = False # Only check one time, instead of looping
+isDry = False # Only display problems, without stopping simulations
+threshold = mercury_monitoring.ENERGY_THRESHOLD
+interval = 600 # seconds between two checks
+
+isProblem = False
+problem_message = "Watchdog that follow running simulations and stop those that diverged" + "\n" + \
+"(NaN or Inf in big.tmp, big.dmp or xv.out, or energy error above a threshold)." + "\n" + \
+"Stopped simulations are marked with the file '%s'." % mercury_monitoring.FAILED_FILENAME + "\n" + \
+"The script can take various arguments :" + "\n" + \
+"(no spaces between the key and the values, only separated by '=')" + "\n" + \
+" * help : display a little help message on HOW to use various options" + "\n" + \
+" * meta : option that will consider the current folder as a folder that list meta simulation instead of simple simulations" + "\n" + \
+" * folder : the current folder is the simulation folder itself" + "\n" + \
+" * threshold=%g : relative energy error above which the simulation is stopped" % threshold + "\n" + \
+" * interval=%d : time (in seconds) between two checks" % interval + "\n" + \
+" * once : only check one time and exit (to be used in a crontab or the local scheduler)" + "\n" + \
+" * dry : only display the problems, without stopping the simulations" + "\n" + \
+"" + "\n" + \
+"Example : \n" + \
+"> mercury-watchdog.py meta threshold=1e-3 interval=300\n" + \
+"> mercury-watchdog.py once"
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+  if (key == 'meta'):
+    isMeta = True
+  elif (key == 'folder'):
+    isFolder = True
+  elif (key == 'threshold'):
+    threshold = float(value)
+  elif (key == 'interval'):
+    interval = float(value)
+  elif (key == 'once'):
+    isOnce = True
+  elif (key == 'dry'):
+    isDry = True
+  elif (key == 'help'):
+    isProblem = True
+  else:
+    print("the key '"+key+"' does not match")
+    isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+def list_simulations():
+  """return the list of simulation folders to follow, relative to the current working directory"""
+  if isFolder:
+    return ["."]
+
+  if isMeta:
+    meta_list = [dir for dir in os.listdir(".") if (os.path.isdir(dir))]
+  else:
+    meta_list = ["."]
+
+  simulations = []
+  for meta in meta_list:
+    for simu in os.listdir(meta):
+      folder = os.path.normpath(os.path.join(meta, simu))
+      if (os.path.isfile(os.path.join(folder, "param.in"))):
+        simulations.append(folder)
+  simulations.sort()
+
+  return simulations
+
+# The watchdogs are kept between two checks, that way, each file is only read from where we stopped the previous time.
+watchdogs = {}
+
+while True:
+  for folder in list_simulations():
+    # Simulations already stopped are not followed anymore
+    if mercury_monitoring.is_failed(folder):
+      continue
+
+    if folder not in watchdogs:
+      watchdogs[folder] = mercury_monitoring.Watchdog(folder, threshold=threshold)
+
+    reason = watchdogs[folder].check()
+    
+    # Each new dump we see is stored to measure the speed of the integration (see mercury-check-simulation.py chain)
+    mercury_monitoring.ProgressHistory(folder).record()
+
+    if (reason != None):
+      if isDry:
+        print("%s : %s" % (folder, reason))
+      else:
+        stopped = watchdogs[folder].stop(reason)
+        print("%s : %s ; stopped %s" % (folder, reason, " ".join([str(ID) for ID in stopped])))
+        del(watchdogs[folder])
+
+  if isOnce:
+    break
+
+  time.sleep(interval)
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Script that generate synthetic outputs of mercury (see mercury_synthetic.py) of various sizes, and time each analysis
+# script on them, with the time spent in each phase (import, loading of the files, computation and plotting).
+
+import sys
+import os
+import time
+import json
+import pstats
+import cProfile
+import socket
+import subprocess
+import mercury_synthetic
+import mercury_outputs
+
+ANALYSIS_FOLDER = os.path.abspath("analysis")
+BENCHMARK_FOLDER = "benchmark" # Each dataset is generated in analysis_<bodies>x<samples>
+
+# (name, script of the analysis folder, arguments). The resonant pair PL000000/PL000001 is not always a resonance, but
+# mercury-single-resonance.py do the same computations anyway.
+TOOLS = [("plot-mass", "mercury-plot-mass.py", []),
+         ("plot-semi_major_axis", "mercury-plot-semi_major_axis.py", []),
+         ("plot-planets", "mercury-plot-planets.py", []),
+         ("plot-periods", "mercury-plot-periods.py", []),
+         ("growth", "mercury-growth.py", []),
+         ("most-massive-growth", "mercury-most-massive-growth.py", []),
+         ("system-resonance", "mercury-system-resonance.py", []),
+         ("timed-resonance", "mercury-timed-resonance.py", []),
+         ("single-resonance", "mercury-single-resonance.py", ["PL000000.aei", "PL000001.aei", "5", "4"]),
+         ("read-xv", None, []),
+         ("read-ce", None, [])]
+
+PHASES = ["import", "load", "compute", "plot"]
+
+# Functions (or the modules they belong to) that define the phase of their own time and of the time of the
+# functions they call. Everything that is not reached from one of them is computation.
+PLOT_MODULES = ["matplotlib", "pylab"]
+IMPORT_MODULES = ["importlib", "<frozen"]
+LOAD_MODULES = ["npyio", "_datasource", "_iotools", "mercury_outputs", "subprocess"]
+LOAD_FUNCTIONS = ["<built-in method io.open>", "<built-in method builtins.open>", "<open>",
+                  "<method 'read' of", "<method 'readline' of", "<method 'readlines' of"]
+
+# Parameters
+sizes = [(10, 1000), (100, 10000)]
+tools = [tool[0] for tool in TOOLS]
+repeat = 1 # Number of runs of each tool, the fastest one is kept
+history = "benchmark_analysis.json"
+isGenerate = True
+isSave = True
+
+isProblem = False
+problem_message = """Script that generate synthetic outputs of mercury (.aei, element.out, info.out,
+xv.out, ce.out, spins, horb and dEdt files) with mercury_synthetic.py, for several numbers
+of bodies and outputs, then run each analysis script of %s on them with
+cProfile. The time of each run is split into phases (import, load, compute, plot), and
+stored in a history file.
+
+Datasets are generated in %s/analysis_<bodies>x<samples>.
+
+Tools : %s
+
+The script can take various arguments :
+(no spaces between the key and the values, only separated by '=')
+ * help : display a little help message on HOW to use various options
+ * sizes=%s : comma separated list of <number of bodies>x<number of outputs>
+ * tools=%s : comma separated list of the tools to run
+ * repeat=%d : number of runs of each tool, the fastest one is kept
+ * history=%s : file where results are stored
+ * nogenerate : do not generate the datasets (the ones of the previous run are used)
+ * nosave : the results are not appended to the history
+
+ Example :
+> benchmark_analysis.py
+> benchmark_analysis.py sizes=50x100000 tools=timed-resonance,read-xv""" % (ANALYSIS_FOLDER, BENCHMARK_FOLDER,
+  ", ".join(tools), ",".join(["%dx%d" % size for size in sizes]), ",".join(tools), repeat, history)
+
+value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+    value = None
+  if (key == 'sizes'):
+    sizes = [tuple([int(number) for number in size.split("x")]) for size in value.split(",")]
+  elif (key == 'tools'):
+    tools = value.split(",")
+    for tool in tools:
+      if not(tool in [name for (name, script, arguments) in TOOLS]):
+        print("The tool '%s' does not exist" % tool)
+        isProblem = True
+  elif (key == 'repeat'):
+    repeat = int(value)
+  elif (key == 'history'):
+    history = value
+  elif (key == 'nogenerate'):
+    isGenerate = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'nosave'):
+    isSave = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'help'):
+    isProblem = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  else:
+    print("the key '%s' does not match" % key)
+    isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+def get_own_phase(function):
+  """return the phase of a function of pstats (a tuple (filename, line, name)), or None if it depends on its callers"""
+
+  (filename, line, name) = function
+
+  for module in PLOT_MODULES:
+    if (module in filename):
+      return "plot"
+  for module in IMPORT_MODULES:
+    if (module in filename):
+      return "import"
+  # Top level code of the imported modules. The one of the tool itself (in the analysis folder) is computation,
+  # whatever run it (runpy is an import)
+  if (name == "<module>"):
+    if filename.startswith(ANALYSIS_FOLDER):
+      return "compute"
+    else:
+      return "import"
+  for module in LOAD_MODULES:
+    if (module in filename):
+      return "load"
+  for function_name in LOAD_FUNCTIONS:
+    if name.startswith(function_name):
+      return "load"
+
+  return None
+
+def get_phases(profile_stats):
+  """Split the time of a profile into PHASES. The time spent in a function belong to its own phase (see get_own_phase),
+  or is shared between the phases of its callers, in proportion of the time spent for each caller.
+
+  Parameters :
+  profile_stats : a pstats.Stats object
+
+  Return : a dictionnary {phase: time (s)}
+  """
+
+  stats = profile_stats.stats
+  fractions = {}
+
+  def get_fractions(function, ancestors):
+    if (function in fractions):
+      return fractions[function]
+
+    phase = get_own_phase(function)
+    if (phase != None):
+      result = {phase: 1.}
+    else:
+      (cc, nc, tt, ct, callers) = stats[function]
+      result = {}
+      total = sum([edge[2] for (caller, edge) in callers.items() if not(caller in ancestors)])
+      for (caller, edge) in callers.items():
+        # Recursive calls are ignored, the phase of the first caller is used
+        if (caller in ancestors or not(caller in stats)):
+          continue
+        if (total > 0):
+          weight = edge[2] / total
+        else:
+          weight = 1. / len(callers)
+        for (caller_phase, fraction) in get_fractions(caller, ancestors | set([function])).items():
+          result[caller_phase] = result.get(caller_phase, 0.) + weight * fraction
+      if (result == {}):
+        result = {"compute": 1.}
+
+    fractions[function] = result
+    return result
+
+  times = dict([(phase, 0.) for phase in PHASES])
+  for (function, (cc, nc, tt, ct, callers)) in stats.items():
+    for (phase, fraction) in get_fractions(function, set()).items():
+      times[phase] += tt * fraction
+
+  return times
+
+def read_xv():
+  """decode all the outputs of xv.out"""
+  for output in mercury_outputs.iter_xv("xv.out"):
+    pass
+
+def read_ce():
+  """decode all the encounters of ce.out"""
+  mercury_outputs.read_ce("ce.out")
+
+READERS = {"read-xv": read_xv, "read-ce": read_ce}
+
+def run_tool(folder, name, script, arguments):
+  """run an analysis script in the folder with cProfile. If script is None, the reader of the tool (see READERS)
+  is profiled in this process instead.
+
+  Return : a tuple (status, wall time (s), phases) where phases is a dictionnary {phase: time (s)}, or None if the
+  script failed
+  """
+
+  profile_file = os.path.join(folder, "profile.prof")
+  if os.path.isfile(profile_file):
+    os.remove(profile_file)
+
+  start = time.time()
+  if (script == None):
+    os.chdir(folder)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+      READERS[name]()
+      status = "ok"
+    except Exception as error:
+      print(error)
+      status = "error"
+    profile.disable()
+    profile.dump_stats(os.path.join(ROOT_FOLDER, profile_file))
+    os.chdir(ROOT_FOLDER)
+  else:
+    environment = dict(os.environ)
+    environment["MPLBACKEND"] = "Agg" # pl.show() must not stop the script
+    environment["PYTHONPATH"] = os.pathsep.join([os.path.join(ROOT_FOLDER, "python_modules"), environment.get("PYTHONPATH", "")])
+    stdout = open(os.path.join(folder, "%s_stdout.txt" % os.path.splitext(script)[0]), 'w')
+    process = subprocess.Popen([sys.executable, "-m", "cProfile", "-o", "profile.prof", os.path.join(ANALYSIS_FOLDER, script)] + arguments,
+                               stdout=stdout, stderr=subprocess.STDOUT, cwd=folder, env=environment)
+    returnCode = process.wait()
+    stdout.close()
+    if (returnCode == 0):
+      status = "ok"
+    else:
+      status = "error"
+  duration = time.time() - start
+
+  if (status != "ok" or not(os.path.isfile(profile_file))):
+    return (status, duration, None)
+
+  return (status, duration, get_phases(pstats.Stats(profile_file)))
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+
+ROOT_FOLDER = os.getcwd()
+
+results = []
+print("%-12s %-21s %-6s %8s %8s %8s %8s %8s" % ("size", "tool", "status", "time (s)", "import", "load", "compute", "plot"))
+for (nb_bodies, nb_samples) in sizes:
+  size = "%dx%d" % (nb_bodies, nb_samples)
+  folder = os.path.join(BENCHMARK_FOLDER, "analysis_%s" % size)
+  if isGenerate:
+    sys.stdout.write("Generating %s...\r" % folder)
+    sys.stdout.flush()
+    start = time.time()
+    mercury_synthetic.generate(folder, nb_bodies, nb_samples)
+    print("Generating %s... %.1f s" % (folder, time.time() - start))
+  elif not(os.path.isdir(folder)):
+    print("'%s' does not exist, run the script without 'nogenerate'" % folder)
+    sys.exit(1)
+
+  for (name, script, arguments) in TOOLS:
+    if not(name in tools):
+      continue
+    best = None
+    for index in range(repeat):
+      (status, duration, phases) = run_tool(folder, name, script, arguments)
+      if (best == None or (status == "ok" and duration < best[1])):
+        best = (status, duration, phases)
+      if (status != "ok"):
+        break
+    (status, duration, phases) = best
+
+    if (phases == None):
+      print("%-12s %-21s %-6s %8.2f" % (size, name, status, duration))
+    else:
+      print("%-12s %-21s %-6s %8.2f %8.2f %8.2f %8.2f %8.2f" % ((size, name, status, duration) + tuple([phases[phase] for phase in PHASES])))
+
+    results.append({"size": size, "tool": name, "status": status, "wall_time": duration, "phases": phases})
+
+if isSave:
+  if os.path.isfile(history):
+    f = open(history, 'r')
+    runs = json.load(f)
+    f.close()
+  else:
+    runs = []
+
+  runs.append({"date": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": socket.gethostname(),
+               "python": sys.version.split()[0], "results": results})
+  f = open(history, 'w')
+  json.dump(runs, f, indent=2, sort_keys=True)
+  f.close()
+  print("Results appended to %s" % history)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Script that run the systems of mercury_systems.py with every integrator, for a fixed number of timesteps, and record the
+# performance (wall time, steps per second, peak memory and energy error) in a history file to see regressions at once.
+
+import sys
+import os
+import re
+import glob
+import json
+import time
+import shutil
+import socket
+import subprocess
+from mercury import Big, Small, Param, Element, Close, Files, Message
+import mercury_systems
+
+PROGRAM_NAME = "mercury"
+ALGORITHMS = ["BS", "BS2", "MVS", "RADAU", "HYBRID"]
+BENCHMARK_FOLDER = "benchmark" # Each host is compiled in build_<host>, each case is run in <case>_<algorithm>
+
+# Host bodies of tides_constant_GR.f90. Only one of them can be set to 1 at the same time.
+HOSTS = ["brown_dwarf", "M_dwarf", "Sun_like_star", "Jupiter_host", "Rscst"]
+
+# (name, function returning the PlanetarySystem, timestep (days), number of timesteps, radius of the central body (AU), host)
+# The host is None for the cases without user force (tides, flattening and GR)
+CASES = [("solar_system", mercury_systems.inner_solar_system, 4., 500000, 0.005, None),
+         ("embryo_disk", mercury_systems.embryo_disk, 6., 10000, 0.005, None),
+         ("tidal_close_in", mercury_systems.tidal_close_in, 0.05, 200000, 0.0005, "M_dwarf"),
+         ("brown_dwarf", mercury_systems.brown_dwarf_system, 0.1, 200000, 0.0005, "brown_dwarf")]
+
+# Parameters
+cases = [case[0] for case in CASES]
+algorithms = list(ALGORITHMS)
+scale = 1. # Factor applied to the number of timesteps of each case
+timeout = 600. # Time (in seconds) after which a simulation is stopped
+history = "benchmark_history.json"
+threshold = 10. # Relative decrease (in percents) of the number of steps per second to be considered as a regression
+isCompile = True
+isSave = True # The results are appended to the history
+
+isProblem = False
+problem_message = """Script that run canonical systems (see mercury_systems.py) with each integrator, for
+a fixed number of timesteps, and record the wall time, number of steps per second,
+peak memory (RSS) and final relative energy error of each case in a history file.
+The results are compared with the last ones of the history for the same machine,
+to see at once the slowdowns of user_module.f90 or the algo_* modules.
+
+mercury is compiled (speed options) for each host body of tides_constant_GR.f90 that is
+needed, in %s/build_<host>. Cases are run in %s/<case>_<algorithm>.
+
+Cases (timestep, number of timesteps) :
+%s
+
+The script can take various arguments :
+(no spaces between the key and the values, only separated by '=')
+ * help : display a little help message on HOW to use various options
+ * cases=%s : comma separated list of the cases to run
+ * algorithms=%s : comma separated list of the integrators
+ * scale=%g : factor applied to the number of timesteps of each case
+ * timeout=%g : time (in seconds) after which a simulation is stopped
+ * history=%s : file where results are stored
+ * threshold=%g : relative decrease (in percents) of the number of steps per second
+            to be considered as a regression
+ * nocompile : do not compile mercury beforehand (binaries of the previous run are used)
+ * nosave : the results are not appended to the history
+
+ Example :
+> benchmark_simulation.py
+> benchmark_simulation.py cases=brown_dwarf,tidal_close_in algorithms=HYBRID
+> benchmark_simulation.py scale=0.1 nosave # quick check""" % (BENCHMARK_FOLDER, BENCHMARK_FOLDER,
+  "\n".join([" * %s : %g days, %d steps" % (name, h, nb_steps) for (name, system, h, nb_steps, radius, host) in CASES]),
+  ",".join(cases), ",".join(algorithms), scale, timeout, history, threshold)
+
+value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+    value = None
+  if (key == 'cases'):
+    cases = value.split(",")
+    for case in cases:
+      if not(case in [name for (name, system, h, nb_steps, radius, host) in CASES]):
+        print("The case '%s' does not exist" % case)
+        isProblem = True
+  elif (key == 'algorithms'):
+    algorithms = value.split(",")
+    for algorithm in algorithms:
+      if not(algorithm in ALGORITHMS):
+        print("The integrator '%s' does not exist" % algorithm)
+        isProblem = True
+  elif (key == 'scale'):
+    scale = float(value)
+  elif (key == 'timeout'):
+    timeout = float(value)
+  elif (key == 'history'):
+    history = value
+  elif (key == 'threshold'):
+    threshold = float(value)
+  elif (key == 'nocompile'):
+    isCompile = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'nosave'):
+    isSave = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'help'):
+    isProblem = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  else:
+    print("the key '%s' does not match" % key)
+    isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+def run(commande, cwd=None):
+  """run a command (a string, or a list). Return a tuple with the output, the error and the return code"""
+  if (type(commande)==list):
+    process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+  elif (type(commande)==str):
+    process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, cwd=cwd)
+  else:
+    raise TypeError("The command is neither a string nor a list.")
+  (process_stdout, process_stderr) = process.communicate()
+  returncode = process.poll()
+
+  return (process_stdout.decode("utf-8", "replace"), process_stderr.decode("utf-8", "replace"), returncode)
+
+def prepare_build(host):
+  """Copy the sources in BENCHMARK_FOLDER/build_<host>, with the given host body in tides_constant_GR.f90.
+  Files are only written if they changed, so that Makefile.py only recompile what is needed.
+
+  Return : the build folder
+  """
+
+  build_folder = os.path.join(BENCHMARK_FOLDER, "build_%s" % host)
+  if not(os.path.isdir(build_folder)):
+    os.makedirs(build_folder)
+
+  for filename in glob.glob("*.f90") + ["Makefile.py"]:
+    f = open(filename, 'r')
+    source = f.read()
+    f.close()
+
+    if (filename == "tides_constant_GR.f90"):
+      for name in HOSTS:
+        source = re.sub(r"(integer, parameter :: %s\s*=\s*)\d+" % name, r"\g<1>%d" % int(name == host), source)
+
+    target = os.path.join(build_folder, filename)
+    if os.path.isfile(target):
+      f = open(target, 'r')
+      isSame = (f.read() == source)
+      f.close()
+      if isSame:
+        continue
+    f = open(target, 'w')
+    f.write(source)
+    f.close()
+
+  return build_folder
+
+def write_inputs(folder, system, h, nb_steps, radius, host):
+  """write the input files of a case in the folder, for the integrator given later (see set_algorithm).
+  The simulation start at the epoch of the system and last nb_steps timesteps of h days."""
+
+  os.chdir(folder)
+
+  Big(system).write()
+  Small(system).write()
+  Element().write()
+  Close().write()
+  Files().write()
+  Message().write()
+
+  if (host == None):
+    user_force = "no"
+  else:
+    user_force = "yes"
+
+  duration = nb_steps * h
+  paramin = Param(algorithme="HYBRID", start_time=system.epoch, stop_time=system.epoch + duration,
+  output_interval=duration / 10., h=h, accuracy=1.e-12, stop_integration="no", collisions="no", fragmentation="no",
+  time_format="days", relative_time="yes", output_precision="medium", relativity="no", user_force=user_force,
+  ejection_distance=100, radius_star=radius, central_mass=system.m_star, J2=0, J4=0, J6=0, changeover=3.,
+  data_dump=500, periodic_effect=100)
+  paramin.write()
+
+  os.chdir(ROOT_FOLDER)
+
+def set_algorithm(folder, algorithm):
+  """change the integrator of the param.in of the folder"""
+
+  filename = os.path.join(folder, "param.in")
+  f = open(filename, 'r')
+  text = f.read()
+  f.close()
+
+  text = re.sub(r"(algorithm \(MVS, BS, BS2, RADAU, HYBRID etc\) = ).*", r"\g<1>%s" % algorithm, text)
+
+  f = open(filename, 'w')
+  f.write(text)
+  f.close()
+
+def run_case(folder, binary, timeout):
+  """run the binary in the folder, and measure its wall time and peak memory.
+
+  Return : a tuple (status, wall time (s), peak RSS (MB)). status is 'ok', 'error' or 'timeout'
+  """
+
+  stdout = open(os.path.join(folder, "%s_stdout.txt" % PROGRAM_NAME), 'w')
+  stderr = open(os.path.join(folder, "%s_stderr.txt" % PROGRAM_NAME), 'w')
+
+  start = time.time()
+  process = subprocess.Popen([binary], stdout=stdout, stderr=stderr, cwd=folder)
+
+  # wait4 give the resources used by this process only (getrusage would give the maximum of all the children)
+  status = None
+  while (time.time() - start < timeout):
+    (pid, exit_status, usage) = os.wait4(process.pid, os.WNOHANG)
+    if (pid != 0):
+      if (exit_status == 0):
+        status = "ok"
+      else:
+        status = "error"
+      break
+    time.sleep(0.01)
+  duration = time.time() - start
+
+  if (status == None):
+    process.kill()
+    (pid, exit_status, usage) = os.wait4(process.pid, 0)
+    status = "timeout"
+
+  stdout.close()
+  stderr.close()
+
+  # ru_maxrss is in kilobytes on Linux, but in bytes on Mac OS
+  if (sys.platform == "darwin"):
+    peak_rss = usage.ru_maxrss / 1024.**2
+  else:
+    peak_rss = usage.ru_maxrss / 1024.
+
+  return (status, duration, peak_rss)
+
+def get_energy_error(folder):
+  """return the final relative energy error of the integrator, read in the info.out of the folder (None if not found)"""
+
+  filename = os.path.join(folder, "info.out")
+  if not(os.path.isfile(filename)):
+    return None
+
+  f = open(filename, 'r')
+  text = f.read()
+  f.close()
+
+  match = re.search(r"Fractional energy change due to integrator:\s*(\S+)", text)
+  if (match == None):
+    return None
+
+  return float(match.group(1).replace("D", "E"))
+
+def get_revision():
+  """return a tuple (commit ID, isModified) of the current code. isModified is True if fortran sources are not committed"""
+
+  (revision, stderr, returnCode) = run("git rev-parse HEAD")
+  if (returnCode != 0):
+    return (None, True)
+
+  (status, stderr, returnCode) = run("git status --porcelain -- '*.f90'")
+
+  return (revision.strip(), status.strip() != "")
+
+def compare_runs(current, reference):
+  """print the results of current, with the change of steps per second compared to reference (if any). Cases whose number
+  of steps per second decreased more than 'threshold' percents are marked as regressions.
+
+  Return : the list of (case, algorithm) that regressed
+  """
+
+  previous = {}
+  if (reference != None):
+    for result in reference["results"]:
+      previous[(result["case"], result["algorithm"])] = result
+
+  regressions = []
+  print("%-15s %-7s %8s %10s %9s %12s %9s" % ("case", "algo", "time (s)", "steps/s", "RSS (MB)", "dE/E", "change"))
+  for result in current["results"]:
+    if (result["status"] != "ok"):
+      print("%-15s %-7s %8.2f %s" % (result["case"], result["algorithm"], result["wall_time"], result["status"]))
+      continue
+
+    if (result["energy_error"] == None):
+      energy_error = "-"
+    else:
+      energy_error = "%.3e" % result["energy_error"]
+
+    line = "%-15s %-7s %8.2f %10.1f %9.1f %12s" % (result["case"], result["algorithm"], result["wall_time"],
+                                                   result["steps_per_second"], result["peak_rss"], energy_error)
+
+    old = previous.get((result["case"], result["algorithm"]))
+    if (old != None and old["status"] == "ok"):
+      relative = 100. * (result["steps_per_second"] - old["steps_per_second"]) / old["steps_per_second"]
+      line += " %+8.1f%%" % relative
+      if (relative < -threshold):
+        line += " <- regression"
+        regressions.append((result["case"], result["algorithm"]))
+    print(line)
+
+  return regressions
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+
+ROOT_FOLDER = os.getcwd()
+
+selected = [case for case in CASES if (case[0] in cases)]
+
+# Cases without user force use the binary of the first host needed (or the brown dwarf), the host does not matter for them
+hosts = []
+for (name, system, h, nb_steps, radius, host) in selected:
+  if (host != None and not(host in hosts)):
+    hosts.append(host)
+if (hosts == []):
+  hosts.append(HOSTS[0])
+
+binaries = {}
+for host in hosts:
+  build_folder = prepare_build(host)
+  if isCompile:
+    print("Compiling mercury for the host '%s' in %s..." % (host, build_folder))
+    (stdout, stderr, returnCode) = run([sys.executable, "Makefile.py", "mercury"], cwd=build_folder)
+    if (returnCode != 0):
+      print(stdout)
+      print(stderr)
+      sys.exit(1)
+  binaries[host] = os.path.abspath(os.path.join(build_folder, PROGRAM_NAME))
+  if not(os.path.isfile(binaries[host])):
+    print("'%s' does not exist, run the script without 'nocompile'" % binaries[host])
+    sys.exit(1)
+
+results = []
+for (name, system_function, h, nb_steps, radius, host) in selected:
+  nb_steps = int(nb_steps * scale)
+  system = system_function()
+  if (host == None):
+    binary = binaries[hosts[0]]
+  else:
+    binary = binaries[host]
+
+  for algorithm in algorithms:
+    # Each case is run from scratch, outputs and dumps of a previous run would make mercury continue it
+    folder = os.path.join(BENCHMARK_FOLDER, "%s_%s" % (name, algorithm))
+    if os.path.isdir(folder):
+      shutil.rmtree(folder)
+    os.makedirs(folder)
+
+    write_inputs(folder, system, h, nb_steps, radius, host)
+    set_algorithm(folder, algorithm)
+    # Data files of the host bodies (radius and radius of gyration as a function of time)
+    if (host != None):
+      for filename in glob.glob("*.dat"):
+        shutil.copy(filename, folder)
+
+    sys.stdout.write("Running %s with %s (%d steps)...\r" % (name, algorithm, nb_steps))
+    sys.stdout.flush()
+    (status, duration, peak_rss) = run_case(folder, binary, timeout)
+    print("Running %s with %s (%d steps)... %s" % (name, algorithm, nb_steps, status))
+
+    results.append({"case": name, "algorithm": algorithm, "steps": nb_steps, "status": status, "wall_time": duration,
+                    "steps_per_second": nb_steps / duration, "peak_rss": peak_rss, "energy_error": get_energy_error(folder)})
+
+(revision, isModified) = get_revision()
+current_run = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "machine": socket.gethostname(), "revision": revision,
+               "modified": isModified, "scale": scale, "results": results}
+
+if os.path.isfile(history):
+  f = open(history, 'r')
+  runs = json.load(f)
+  f.close()
+else:
+  runs = []
+
+# Results are only comparable on the same machine, with the same number of timesteps
+reference = None
+for old_run in reversed(runs):
+  if (old_run["machine"] == current_run["machine"] and old_run["scale"] == scale):
+    reference = old_run
+    break
+
+if (reference != None):
+  print("Comparison with the run of %s (revision %s)" % (reference["date"], reference["revision"]))
+regressions = compare_runs(current_run, reference)
+if (regressions != []):
+  print("Slower cases : %s" % ", ".join(["%s (%s)" % regression for regression in regressions]))
+
+if isSave:
+  runs.append(current_run)
+  f = open(history, 'w')
+  json.dump(runs, f, indent=2, sort_keys=True)
+  f.close()
+  print("Results appended to %s" % history)
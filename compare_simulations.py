@@ -9,11 +9,18 @@ __version__ = "$Revision: 3.0 $"
 
 import sys
 import os
-import difflib # To compare two strings
+import re
+import time
+import shutil
+import hashlib
+import multiprocessing
+import numpy as np
 import subprocess # To launch various process, get outputs et errors, returnCode and so on.
 import pdb # To debug
 import glob # to get list of file through a given pattern
 from mercury import * # In order to create a simulation via python
+import mercury_outputs # To decode xv.out and ce.out
+import mercury_systems # Planetary systems of the tests
 
 NEW_TEST = "example_simulation"
 PREVIOUS_TEST = "old_simulation"
@@ -22,11 +29,43 @@ PROGRAM_NAME = "mercury"
 
 OUTPUT_FILENAMES = ["xv.out"]
 CLOSE_FILENAMES = ["ce.out"]
+ALGORITHMS = ["BS", "BS2", "MVS", "RADAU", "HYBRID"]
+
+# In the 'matrix' mode, each case is run in its own sub-folder, and mercury is compiled with each set of effects
+# (parameters of tides_constant_GR.f90) for the simulations with user force, using the inputs of TIDAL_SYSTEM
+MATRIX_FOLDER = "matrix_simulation"
+MATRIX_EFFECTS = [("all", {"tides": 1, "GenRel": 1, "rot_flat": 1}),
+                  ("tides", {"tides": 1, "GenRel": 0, "rot_flat": 0}),
+                  ("GR", {"tides": 0, "GenRel": 1, "rot_flat": 0}),
+                  ("flattening", {"tides": 0, "GenRel": 0, "rot_flat": 1})]
+TIDAL_SYSTEM = os.path.abspath("pgo_workload")
+ROOT_FOLDER = os.getcwd()
+
+# Binaries and outputs of the reference revisions, one sub-folder per commit and build preset (see getReference)
+REFERENCE_CACHE = os.path.abspath("reference_cache")
+# Arguments of Makefile.py for each build preset of the reference binaries
+PRESETS = {"test": "test", "debug": "debug", "speed": ""}
+
+# Numbers (integers or floats, with the fortran 'D' exponent too) that are not part of a word
+NUMBER_PATTERN = re.compile(r"(?<![\w.])[-+]?(?:\d+\.?\d*|\.\d+)(?:[eEdD][-+]?\d+)?(?![\w.])")
+# Same, with the spaces before : fixed width columns are padded differently depending on the sign of the number
+SKELETON_PATTERN = re.compile(r"[ \t]*" + NUMBER_PATTERN.pattern)
+
 ASCII_FILES = ["info.out", "big.dmp", "small.dmp", "param.dmp", "restart.dmp", "big.tmp", "small.tmp", "param.tmp", "restart.tmp"]
+USER_FILES = ["spin*.out", "horb*.out", "dEdt*.out"] # Outputs of the user module (tides, flattening, GR), one per planet
 
 # Parameters
+RTOL = 1e-10 # Relative difference allowed between two numbers of the outputs
+ATOL = 0. # Absolute difference allowed between two numbers of the outputs (for numbers close to 0)
 force_source = False # To force the compilation of every module
+isRevision = False # True if the reference revision is given with 'rev='
 force_simulation = False # To force generation of simulation outputs for the "old" version of the code
+isMatrix = False # Run all the integrators with and without tides, GR and flattening, at the same time
+nb_jobs = multiprocessing.cpu_count() # Number of simulations run at the same time in the 'matrix' mode
+timeout = 300 # Time (in seconds) after which a simulation of the 'matrix' mode is stopped
+preset = "test" # Options used to compile the reference binaries (a key of PRESETS)
+cache_age = 30. # Reference builds unused for more than this number of days are deleted
+cache_size = 2000. # Maximum size (in MB) of the reference cache. The least recently used builds are deleted first
 
 isProblem = False
 problem_message = """Script that run a mercury simulation and test if the outputs and binaries have 
@@ -42,13 +81,27 @@ The script can take various arguments :
 (no spaces between the key and the values, only separated by '=')
  * help : display a little help message on HOW to use various options
  * force : To force generation of outputs for the 'old' program (after copying
-           simulation files from the example)
+           simulation files from the example), even if they are in the cache
  * actual : To force copying HEAD simulation, compyling it, then generating 
             simulation outputs
  * faq : Display possible problems that might occurs during comparison
+ * matrix : run the old and new code with every integrator (%s), without user force,
+            and with tides, general relativity and rotational flattening (alone and together),
+            each case in its own folder of %s, all at the same time. A summary is displayed at the end.
+            The old binaries and outputs are kept in the cache too
+ * jobs=%d : number of simulations run at the same time in the 'matrix' mode
+ * timeout=%d : time (in seconds) after which a simulation of the 'matrix' mode is stopped
+ * preset=%s : options used to compile the reference binaries (%s)
+ * cache_age=%g : reference builds (binaries and outputs) unused for this number
+                of days are deleted from %s
+ * cache_size=%g : maximum size (in MB) of the reference cache. The least
+                 recently used builds are deleted first
+ * rtol=%g : Relative difference allowed between two numbers of the outputs
+ * atol=%g : Absolute difference allowed between two numbers of the outputs
  * rev=%s : (previous, actual, current) are possible. Else, every 
             Git ID syntax is OK. The reference revision for the 
-            comparison with actual code
+            comparison with actual code. The reference binary and its outputs are kept
+            in the cache, each revision is compiled and run only once
 
  Example : 
 (examples are ordered. From the more common, to the more drastic.)
@@ -60,17 +113,22 @@ The script can take various arguments :
                                 then generate outputs for for both binaries
 > compare_simulations.py rev=cdabb998 # compile the given revision, copy input 
                                       in old folder then generate outputs 
-                                      for both binaries""" % REVISION
+                                      for both binaries
+> compare_simulations.py rtol=1e-6 # accept small differences
+> compare_simulations.py matrix rev=previous # all the integrators and effects""" % (", ".join(ALGORITHMS), MATRIX_FOLDER, nb_jobs, timeout, preset, ", ".join(sorted(PRESETS.keys())),
+   cache_age, os.path.basename(REFERENCE_CACHE), cache_size, RTOL, ATOL, REVISION)
 
 isFAQ = False
 faq_message = """* If you have differences, ensure that all 
 your modules have been compiled with 'test' options. 
 To make sure of that:
-> Makefile.py test force
+> Makefile.py test
 
 Once this is done, make:
-> Makefile.py force
-to recompile all module with speed options.
+> Makefile.py
+to get back the modules compiled with speed options.
+Objects compiled with each set of options are kept in 
+a build cache, so there is no need for 'force' anymore.
 """
 
 value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
@@ -100,10 +158,31 @@ for arg in sys.argv[1:]:
     isFAQ = True
     if (value != None):
       print(value_message % (key, key, value))
+  elif (key == 'matrix'):
+    isMatrix = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'jobs'):
+    nb_jobs = int(value)
+  elif (key == 'timeout'):
+    timeout = float(value)
+  elif (key == 'preset'):
+    if not(value in PRESETS):
+      print("The preset '%s' does not exist. Possible values: %s" % (value, ", ".join(sorted(PRESETS.keys()))))
+      exit()
+    preset = value
+  elif (key == 'cache_age'):
+    cache_age = float(value)
+  elif (key == 'cache_size'):
+    cache_size = float(value)
+  elif (key == 'rtol'):
+    RTOL = float(value)
+  elif (key == 'atol'):
+    ATOL = float(value)
   elif (key == 'rev'):
-    # If a revision is specified, we force the actualisation of source code, compilation and simulation.
-    force_source = True
-    force_simulation = True
+    # The sources of the revision are only extracted again if it is not the one of the previous comparison. The
+    # binary and outputs of the reference are taken from the cache when they exist (see getReference)
+    isRevision = True
     if (value in ['actual', 'current']):
       REVISION = "HEAD"
     elif (value in ['previous']):
@@ -144,60 +223,118 @@ def clean():
   run("rm *.dmp")
   run("rm *.out")
 
-def ASCIICompare(original, new):
-  """function that compare and print differences between to strings that are compared line by line."""
-  
-  modified = ["+ ", "- ", "? "]
-  
-  # We want lists, because difflib.Differ only accept list of lines.
+def getNumbers(text):
+  """return a tuple (skeleton, values, lines) for the string in parameter : skeleton is the text where each number
+  (and the spaces before it) has been replaced by ' #', values the array of the numbers and lines the array of the index
+  of the line of each number"""
+
+  matches = list(NUMBER_PATTERN.finditer(text))
+  skeleton = SKELETON_PATTERN.sub(" #", text)
+  values = np.array([match.group().replace("D", "E").replace("d", "e") for match in matches], dtype=str).astype(np.float64)
+
+  newlines = np.array([match.start() for match in re.finditer("\n", text)], dtype=int)
+  lines = np.searchsorted(newlines, np.array([match.start() for match in matches], dtype=int))
+
+  return (skeleton, values, lines)
+
+def getDifferences(original, new):
+  """return the boolean array (True where the values differ more than the tolerance RTOL, ATOL) of two arrays of same shape.
+  NaN values are considered equal if they are at the same place."""
+
+  isClose = np.abs(original - new) <= ATOL + RTOL * np.maximum(np.abs(original), np.abs(new))
+  isClose |= (original == new) # Infinite values
+  isClose |= (np.isnan(original) & np.isnan(new))
+
+  return ~isClose
+
+def getBody(lines, index):
+  """return the name of the body of the line 'index' in a dump file, that is, the first word of the previous line that
+  define a body (with 'm='). None if there is no such line"""
+
+  for line in reversed(lines[:index+1]):
+    if ("m=" in line and line.split() != []):
+      return line.split()[0]
+
+  return None
+
+def numericCompare(original, new):
+  """function that compare two strings line by line. Numbers are compared with the tolerance RTOL, ATOL (see getDifferences())
+  and the rest of the text must be identical. Only the first difference is displayed, with the total number of different values.
+
+  Return : None if there is no difference, or a string that describe them
+  """
+
+  (skeleton_ori, values_ori, lines_ori) = getNumbers(original)
+  (skeleton_new, values_new, lines_new) = getNumbers(new)
+
+  skeleton_ori = skeleton_ori.split("\n")
+  skeleton_new = skeleton_new.split("\n")
+
+  # The first line where the text (what is not a number) is different, if any
+  text_line = None
+  for (index, (line_ori, line_new)) in enumerate(zip(skeleton_ori, skeleton_new)):
+    if (line_ori != line_new):
+      text_line = index
+      break
+  if (text_line == None and len(skeleton_ori) != len(skeleton_new)):
+    text_line = min(len(skeleton_ori), len(skeleton_new))
+
+  # Before that line, numbers are at the same place in both strings and can be compared all at once
+  if (text_line == None):
+    nb_values = len(values_ori)
+  else:
+    nb_values = np.searchsorted(lines_ori, text_line)
+  differences = getDifferences(values_ori[:nb_values], values_new[:nb_values])
+
   original = original.split("\n")
   new = new.split("\n")
-  
-  d = difflib.Differ()
-
-  result = list(d.compare(original, new))
-  
-  differences = []
-  line_number_original = 0
-  line_number_new = 0
-  for line in result:
-    if (line[0:2] == "  "):
-      line_number_original += 1
-      line_number_new += 1
-    elif (line[0:2] == "- "):
-      line_number_original += 1
-      differences.append("[ori] l"+str(line_number_original)+" :"+line[2:])
-    elif (line[0:2] == "+ "):
-      line_number_new += 1
-      differences.append("[new] l"+str(line_number_new)+" :"+line[2:])
-    elif (line[0:2] == "? "):
-      differences.append("      l"+str(max(line_number_new, line_number_original))+" :"+line[2:])
-
-  # We print separately because it is more convenient if we want to store in a file instead.
-  if (differences != []):
-    return "\n".join(differences)
-  else:
-    return None
+
+  if differences.any():
+    first = np.argmax(differences)
+    line = lines_ori[first]
+    different_ori = values_ori[:nb_values][differences]
+    different_new = values_new[:nb_values][differences]
+    relative = np.abs(different_ori - different_new) / np.maximum(np.abs(different_ori), np.abs(different_new))
+    message = "%d numbers differ (max relative difference %.3g). First difference on line %d" % (differences.sum(), np.nanmax(relative), line + 1)
+    body = getBody(original, line)
+    if (body != None):
+      message += " (%s)" % body
+    message += " : %.16g instead of %.16g" % (values_new[first], values_ori[first])
+    message += "\n[ori] l%d :%s\n[new] l%d :%s" % (line + 1, original[line], line + 1, new[line])
+    return message
+
+  if (text_line != None):
+    message = "Text differ from line %d" % (text_line + 1)
+    if (text_line < len(original)):
+      message += "\n[ori] l%d :%s" % (text_line + 1, original[text_line])
+    if (text_line < len(new)):
+      message += "\n[new] l%d :%s" % (text_line + 1, new[text_line])
+    return message
+
+  return None
 
 def compare2files(ori_files,new_files):
-  """Function that will use compare to see differences between 'original' 
-  that is thought to be a variable and 'new_file' that is the name of a 
-  file to read then use as input
+  """Function that compare the ASCII files 'ori_files' and 'new_files' (two list of filenames), with a tolerance
+  on numbers (see numericCompare())
   """
   no_diff = []
   diff = []
   
   for (original, new) in zip(ori_files, new_files):
+    if not(os.path.isfile(original) and os.path.isfile(new)):
+      if (os.path.isfile(original) or os.path.isfile(new)):
+        diff.append([new, "Only one of %s and %s exists" % (original, new)])
+      continue
+
     f_old = open(original, 'r')
-    old_lines = f_old.readlines()
+    old_lines = f_old.read()
     f_old.close()
     
     f_new = open(new, 'r')
-    new_lines = f_new.readlines()
+    new_lines = f_new.read()
     f_new.close()
     
-    
-    difference = ASCIICompare(''.join(old_lines), ''.join(new_lines))
+    difference = numericCompare(old_lines, new_lines)
     if (difference == None):
       no_diff.append(new)
     else:
@@ -210,36 +347,98 @@ def compare2files(ori_files,new_files):
       print(comp)
       
     if (no_diff != []):
-      print "No differences seen on :",', '.join(no_diff)
+      print("No differences seen on :%s" % ', '.join(no_diff))
   else:
     print("Everything OK")  
   
   return 0
 
+def compareXV(original, new):
+  """function that compare the outputs of two xv.out files (decoded, see mercury_outputs.iter_xv()), one after the other.
+  We stop at the first output that differs.
+
+  Return : None if there is no difference, or a string that describe the first one
+  """
+
+  nb_outputs = 0
+  outputs_ori = mercury_outputs.iter_xv(original)
+  outputs_new = mercury_outputs.iter_xv(new)
+  while True:
+    output_ori = next(outputs_ori, None)
+    output_new = next(outputs_new, None)
+
+    if (output_ori == None or output_new == None):
+      if (output_ori != output_new):
+        return "Different number of outputs (the first %d are the same)" % nb_outputs
+      return None
+
+    (time_ori, names_ori, values_ori) = output_ori
+    (time_new, names_new, values_new) = output_new
+
+    if getDifferences(np.array([time_ori]), np.array([time_new])).any():
+      return "Output %d : time %.16g instead of %.16g" % (nb_outputs + 1, time_new, time_ori)
+
+    if (names_ori != names_new):
+      return "At t=%g days : bodies %s instead of %s" % (time_ori, names_new, names_ori)
+
+    differences = getDifferences(values_ori, values_new)
+    if differences.any():
+      (body, variable) = np.argwhere(differences)[0]
+      return "At t=%g days : %s of %s is %.16g instead of %.16g (%d values differ in this output)" % (time_ori,
+               mercury_outputs.XV_VARIABLES[variable], names_ori[body], values_new[body, variable], values_ori[body, variable], differences.sum())
+
+    nb_outputs += 1
+
+def compareCE(original, new):
+  """function that compare the close encounters of two ce.out files (decoded, see mercury_outputs.read_ce())
+
+  Return : None if there is no difference, or a string that describe the first one
+  """
+
+  (times_ori, names_ori, distances_ori, values_ori) = mercury_outputs.read_ce(original)
+  (times_new, names_new, distances_new, values_new) = mercury_outputs.read_ce(new)
+
+  nb_encounters = min(len(times_ori), len(times_new))
+
+  differences = getDifferences(times_ori[:nb_encounters], times_new[:nb_encounters])
+  differences |= getDifferences(distances_ori[:nb_encounters], distances_new[:nb_encounters])
+  differences |= getDifferences(values_ori[:nb_encounters], values_new[:nb_encounters]).any(axis=1)
+  differences |= np.array([(names_ori[i] != names_new[i]) for i in range(nb_encounters)], dtype=bool)
+
+  if differences.any():
+    first = np.argmax(differences)
+    return "Encounter %d : %s-%s at t=%.16g days (d=%.16g) instead of %s-%s at t=%.16g days (d=%.16g)" % (first + 1,
+             names_new[first][0], names_new[first][1], times_new[first], distances_new[first],
+             names_ori[first][0], names_ori[first][1], times_ori[first], distances_ori[first])
+
+  if (len(times_ori) != len(times_new)):
+    return "%d encounters instead of %d (the first %d are the same)" % (len(times_new), len(times_ori), nb_encounters)
+
+  return None
+
 def compare2Binaries(ori_files, new_files):
-  """Function that will use compare to see differences between 'original' 
-  that is thought to be a variable and 'new_file' that is the name of a 
-  file to read then use as input
+  """Function that compare the compressed outputs 'ori_files' and 'new_files' (two list of filenames) of mercury
+  (xv.out or ce.out), once decoded, with a tolerance (see getDifferences()).
   """
   no_diff = []
   diff = []
   
   for (original, new) in zip(ori_files, new_files):
-    (stdout, stderr, returnCode) = run("md5sum %s" % original)
-    md5_ori = stdout.split()[0]
-    
-    (stdout, stderr, returnCode) = run("md5sum %s" % new)
-    md5_new = stdout.split()[0]
+    if (os.path.basename(original) == "ce.out"):
+      difference = compareCE(original, new)
+    else:
+      difference = compareXV(original, new)
     
-    if (md5_new != md5_ori):
-      diff.append(original)
+    if (difference != None):
+      diff.append((original, difference))
     else:
       no_diff.append(original)
   
   # Now we output results
   if (diff != []):
-    for filename in diff:
+    for (filename, difference) in diff:
       print("\ndifferences with binary  %s" % filename)
+      print(difference)
       
     if (no_diff != []):
       print("No differences seen on :%s" % ', '.join(no_diff))
@@ -253,49 +452,7 @@ def initialising_input_objects(algorithm):
   Create the objects, then generate the corresponding input files
   in the current working directory.
   """
-  mercury = BodyCart("big",name="MERCURY", x=-3.83966017419175965E-01, y=-1.76865300855700736E-01, z=2.07959213998758705E-02,
-  vx=5.96286238644834141E-03, vy=-2.43281292146216750E-02, vz=-2.53463209848734695E-03, m=1.66013679527193009E-07,
-  r=20.0e0, d=5.43)
-  venus = BodyCart("big",name="VENUS", x=6.33469157915745540E-01, y=3.49855234102151691E-01, z=-3.17853172088953667E-02,
-  vx=-9.84258038001823571E-03, vy=1.76183746921837227E-02, vz=8.08822351013463794E-04, m=2.44783833966454430E-06,
-  r=20.0e0, d=5.24)
-  earthmoo = BodyCart("big", name="EARTHMOO", x=2.42093942183383037E-01, y=-9.87467766698604366E-01, z=-4.54276292555233496E-06,
-  vx=1.64294055023289365E-02, vy=4.03200725816140870E-03, vz=1.13609607260006795E-08, m=3.04043264264672381E-06,
-  r=20.0e0, d=5.52)
-  mars = BodyCart("big", name="MARS", x=2.51831018120174499E-01, y=1.52598983115984788E+00, z=2.57781137811807781E-02,
-  vx=-1.32744166042475433E-02, vy=3.46582959610421387E-03, vz=3.98930013246952611E-04, m=3.22715144505386530E-07,
-  r=20.0e0, d=3.94)
-  jupiter = BodyCart("big", name="JUPITER", x=4.84143144246472090E+00, y=-1.16032004402742839E+00, z=-1.03622044471123109E-01,
-  vx=1.66007664274403694E-03, vy=7.69901118419740425E-03, vz=-6.90460016972063023E-05, m=9.54791938424326609E-04,
-  r=3.0e0, d=1.33)
-  saturn = BodyCart("big", name="SATURN", x=8.34336671824457987E+00, y=4.12479856412430479E+00, z=-4.03523417114321381E-01,
-  vx=-2.76742510726862411E-03, vy=4.99852801234917238E-03, vz=2.30417297573763929E-05, m=2.85885980666130812E-04,
-  r=3.0e0, d=0.70)
-  uranus = BodyCart("big", name="URANUS", x=1.28943695621391310E+01, y=-1.51111514016986312E+01, z=-2.23307578892655734E-01,
-  vx=2.96460137564761618E-03, vy=2.37847173959480950E-03, vz=-2.96589568540237556E-05, m=4.36624404335156298E-05,
-  r=3.0e0, d=1.30)
-  neptune = BodyCart("big", name="NEPTUNE", x=1.53796971148509165E+01, y=-2.59193146099879641E+01, z=1.79258772950371181E-01,
-  vx=2.68067772490389322E-03, vy=1.62824170038242295E-03, vz=-9.51592254519715870E-05, m=5.15138902046611451E-05,
-  r=3.0e0, d=1.76)
-  pluto = BodyCart("big", name="PLUTO", x=-1.15095623952731607E+01, y=-2.70779438829451422E+01, z=6.22871533567077229E+00,
-  vx=2.97220056963797431E-03, vy=-1.69820233395912967E-03, vz=-6.76798264809371094E-04, m=7.39644970414201173E-09,
-  r=3.0e0, d=1.1)
-  
-  apollo = BodyAst("small", name="APOLLO", a=1.4710345, e=.5600245, I=6.35621, 
-  g=285.63908, n=35.92313, M=15.77656, ep=2450400.5)
-  jason = BodyAst("small", name="JASON", a=2.2157309, e=.7644575, I=4.84834, 
-  g=336.49610, n=169.94137, M=293.37226, ep=2450400.5)
-  khufu = BodyAst("small", name="KHUFU", a=0.9894948, e=.4685310, I=9.91298, 
-  g=54.85927, n=152.64772, M=66.69818, ep=2450600.5)
-  minos = BodyAst("small", name="MINOS", a=1.1513383, e=.4127106, I=3.93863, 
-  g=239.50170, n=344.85893, M=8.93445, ep=2450400.5)
-  orpheus = BodyAst("small", name="ORPHEUS", a=1.2091305, e=.3226805, I=2.68180, 
-  g=301.55128, n=189.79654, M=28.31467, ep=2450400.5)
-  toutatis = BodyAst("small", name="TOUTATIS", a=2.5119660, e=.6335854, I=0.46976, 
-  g=274.82273, n=128.20968, M=50.00728, ep=2450600.5)
-  
-  solarSystem = PlanetarySystem(bodies=[mercury, venus, earthmoo, mars, jupiter, saturn, uranus, 
-  neptune, pluto, apollo, jason, khufu, minos, orpheus, toutatis], m_star=1.0, epoch=2451000.5)
+  solarSystem = mercury_systems.solar_system()
   
   bigin = Big(solarSystem)
   bigin.write()
@@ -320,6 +477,462 @@ def initialising_input_objects(algorithm):
   Files().write()
   Message().write()
 
+def initialising_tidal_objects(algorithm):
+  """Generation of the simulation of the tides, general relativity and flattening cases of the 'matrix' mode, in the
+  current working directory : the two planets around a brown dwarf of TIDAL_SYSTEM.
+  """
+  
+  for filename in ["big.in", "small.in"]:
+    shutil.copy(os.path.join(TIDAL_SYSTEM, filename), filename)
+  
+  # The planets are very close to the host body : a tenth of a year is a dozen orbits, and already takes a while with BS
+  paramin = Param(algorithme=algorithm, start_time=0., stop_time=36.525, output_interval=3.6525, 
+  h=0.1, accuracy=1.e-12, stop_integration="no", collisions="no", fragmentation="no", 
+  time_format="years", relative_time="no", output_precision="high", relativity="no", 
+  user_force="yes", ejection_distance=100, radius_star=0.0005, central_mass=0.08, 
+  J2=0, J4=0, J6=0, changeover=3., data_dump=100000, periodic_effect=100)
+  paramin.write()
+  
+  Files().write()
+  Message().write()
+
+def prepareMatrixBuild(source_folder, build_folder, effects):
+  """Copy the source files of source_folder in build_folder, with the effects of tides_constant_GR.f90 set to the given values.
+
+  Parameters :
+  source_folder : folder with the source code (the current one, or PREVIOUS_TEST)
+  build_folder : folder where mercury will be compiled
+  effects : dictionnary {name of the parameter in tides_constant_GR.f90: value}
+
+  Return : the command to compile mercury in build_folder
+  """
+  
+  if not(os.path.isdir(build_folder)):
+    os.makedirs(build_folder)
+  
+  for filename in glob.glob(os.path.join(source_folder, "*.f90")):
+    f = open(filename, 'r')
+    source = f.read()
+    f.close()
+    
+    if (os.path.basename(filename) == "tides_constant_GR.f90"):
+      for (name, value) in effects.items():
+        source = re.sub(r"(integer, parameter :: %s\s*=\s*)\d+" % name, r"\g<1>%d" % value, source)
+    
+    # The file is only rewritten if it changed, so that the compilation is not done again for nothing
+    target = os.path.join(build_folder, os.path.basename(filename))
+    if os.path.isfile(target):
+      f = open(target, 'r')
+      isSame = (f.read() == source)
+      f.close()
+      if isSame:
+        continue
+    f = open(target, 'w')
+    f.write(source)
+    f.close()
+  
+  # The current Makefile.py is used for every revision. Old revisions may not have all its options.
+  shutil.copy("Makefile.py", build_folder)
+  
+  return [sys.executable, "Makefile.py", "test", "mercury", "jobs=1"]
+
+def runInFolder(arguments):
+  """Run a command in a folder, with outputs in the files 'name'_stdout.txt and 'name'_stderr.txt of the folder.
+  This function is called in the process pool of the 'matrix' mode.
+
+  Parameter :
+  arguments : a tuple (folder, command, name, timeout). The command is killed after timeout seconds.
+
+  Return : a tuple (folder, returnCode, duration in seconds). returnCode is None if the command was killed.
+  """
+  
+  (folder, command, name, timeout) = arguments
+  
+  stdout = open(os.path.join(folder, "%s_stdout.txt" % name), 'w')
+  stderr = open(os.path.join(folder, "%s_stderr.txt" % name), 'w')
+  
+  start = time.time()
+  process = subprocess.Popen(command, stdout=stdout, stderr=stderr, cwd=folder)
+  while ((process.poll() == None) and (time.time() - start < timeout)):
+    time.sleep(0.01)
+  
+  returnCode = process.poll()
+  if (returnCode == None):
+    process.kill()
+    process.wait()
+  
+  stdout.close()
+  stderr.close()
+  
+  return (folder, returnCode, time.time() - start)
+
+def compareFolders(original, new):
+  """Compare the outputs of the simulations of two folders (decoded binaries, then ASCII files and outputs of the user module)
+
+  Return : None if there is no difference, or a string that describe the first one (with the name of the file)
+  """
+  
+  user_files = set()
+  for pattern in USER_FILES:
+    for folder in [original, new]:
+      user_files.update([os.path.basename(filename) for filename in glob.glob(os.path.join(folder, pattern))])
+  
+  for filename in OUTPUT_FILENAMES + CLOSE_FILENAMES + ASCII_FILES + sorted(user_files):
+    file_ori = os.path.join(original, filename)
+    file_new = os.path.join(new, filename)
+    
+    if not(os.path.isfile(file_ori) and os.path.isfile(file_new)):
+      if (os.path.isfile(file_ori) or os.path.isfile(file_new)):
+        return "%s : only exists in one folder" % filename
+      continue
+    
+    if (filename in CLOSE_FILENAMES):
+      difference = compareCE(file_ori, file_new)
+    elif (filename in OUTPUT_FILENAMES):
+      difference = compareXV(file_ori, file_new)
+    else:
+      f = open(file_ori, 'r')
+      text_ori = f.read()
+      f.close()
+      f = open(file_new, 'r')
+      text_new = f.read()
+      f.close()
+      difference = numericCompare(text_ori, text_new)
+    
+    if (difference != None):
+      return "%s : %s" % (filename, difference.split("\n")[0])
+  
+  return None
+
+def runMatrix(nb_jobs, timeout, revision_id, force=False):
+  """Run the old and new binaries for every integrator of ALGORITHMS, without user force, and with each set of effects
+  of MATRIX_EFFECTS. Each case is run in its own folder, all of them at the same time in a pool of nb_jobs processes.
+  A summary of the comparisons is displayed at the end. Simulations that last more than timeout seconds are stopped.
+  
+  The old binaries and their outputs are kept in REFERENCE_CACHE, by commit, set of effects and input files 
+  (see getMatrixReference), so that the old version is only compiled and run once.
+  
+  Parameters :
+  nb_jobs : number of processes
+  timeout : time (in seconds) after which a simulation is stopped
+  revision_id : the full ID of the commit of the old version (in PREVIOUS_TEST)
+  force : if True, the old simulations are run even if their outputs are in the cache
+
+  Return : the number of cases where the old and new outputs differ
+  """
+  
+  sides = [("old", PREVIOUS_TEST), ("new", ".")]
+  pool = multiprocessing.Pool(nb_jobs)
+  
+  # mercury is compiled with each set of effects, for both versions of the code. The old binaries are taken from the cache if they exist
+  references = {}
+  builds = []
+  for (side, source_folder) in sides:
+    for (effect, effects) in MATRIX_EFFECTS:
+      build_folder = os.path.abspath(os.path.join(MATRIX_FOLDER, "build_%s_%s" % (side, effect)))
+      if (side == "old"):
+        references[effect] = getMatrixReference(revision_id, effects)
+        if os.path.isfile(os.path.join(references[effect], PROGRAM_NAME)):
+          touch(os.path.join(references[effect], "last_use"))
+          continue
+      builds.append((build_folder, prepareMatrixBuild(source_folder, build_folder, effects), "compilation", float("inf")))
+  
+  print("Compiling %d versions of mercury (%d old versions from the cache)..." % (len(builds), 2 * len(MATRIX_EFFECTS) - len(builds)))
+  isError = False
+  for (folder, returnCode, duration) in pool.map(runInFolder, builds):
+    if (returnCode != 0):
+      print("Compilation error in %s, see %s" % (folder, os.path.join(folder, "compilation_stdout.txt")))
+      isError = True
+  if isError:
+    pool.close()
+    return -1
+  
+  # The old binaries that were just compiled are stored in the cache, with the data files of their version of the code
+  for (effect, effects) in MATRIX_EFFECTS:
+    entry = references[effect]
+    if os.path.isfile(os.path.join(entry, PROGRAM_NAME)):
+      continue
+    if os.path.isdir(entry):
+      shutil.rmtree(entry)
+    os.makedirs(entry)
+    shutil.copy2(os.path.join(MATRIX_FOLDER, "build_old_%s" % effect, PROGRAM_NAME), entry)
+    for filename in glob.glob(os.path.join(PREVIOUS_TEST, "*.dat")):
+      shutil.copy(filename, entry)
+    revision_file = open(os.path.join(entry, "revision.in"), 'w')
+    revision_file.write("Revision ID: %s\n" % revision_id)
+    revision_file.write("Preset: test (Makefile.py test), matrix mode with %s\n" % ", ".join(["%s=%d" % item for item in sorted(effects.items())]))
+    revision_file.close()
+    touch(os.path.join(entry, "last_use"))
+  
+  # Without user force, the effects do not matter, the binaries of the first set of effects are used
+  cases = [(algo, "none") for algo in ALGORITHMS] + [(algo, effect) for (effect, effects) in MATRIX_EFFECTS for algo in ALGORITHMS]
+  
+  runs = []
+  old_folders = {} # Folder of the old outputs of each case, in the cache
+  results = {}
+  for (algo, effect) in cases:
+    case_folder = os.path.join(MATRIX_FOLDER, "%s_%s" % (algo, effect))
+    if os.path.isdir(case_folder):
+      shutil.rmtree(case_folder)
+    
+    # Inputs are created in the 'new' folder, then copied in the folder of the old outputs
+    new_folder = os.path.abspath(os.path.join(case_folder, "new"))
+    os.makedirs(new_folder)
+    os.chdir(new_folder)
+    if (effect == "none"):
+      initialising_input_objects(algorithm=algo)
+    else:
+      initialising_tidal_objects(algorithm=algo)
+    os.chdir(ROOT_FOLDER)
+    
+    if (effect == "none"):
+      binary_effect = MATRIX_EFFECTS[0][0]
+    else:
+      binary_effect = effect
+    
+    # Data files of the host body, from the corresponding version of the code
+    for filename in glob.glob("*.dat"):
+      shutil.copy(filename, new_folder)
+    binary = os.path.abspath(os.path.join(MATRIX_FOLDER, "build_new_%s" % binary_effect, PROGRAM_NAME))
+    runs.append((new_folder, [binary], PROGRAM_NAME, timeout))
+    
+    entry = references[binary_effect]
+    old_folder = os.path.join(entry, "outputs", getInputHash(new_folder))
+    old_folders[(algo, effect)] = old_folder
+    if (os.path.isfile(os.path.join(old_folder, "done")) and not(force)):
+      results[old_folder] = (0, None)
+      continue
+    
+    if os.path.isdir(old_folder):
+      shutil.rmtree(old_folder)
+    os.makedirs(old_folder)
+    for filename in glob.glob(os.path.join(new_folder, "*.in")) + glob.glob(os.path.join(entry, "*.dat")):
+      shutil.copy(filename, old_folder)
+    runs.append((old_folder, [os.path.join(entry, PROGRAM_NAME)], PROGRAM_NAME, timeout))
+  
+  print("Running %d simulations with %d processes (%d old ones from the cache)..." % (len(runs), nb_jobs, len(results)))
+  start = time.time()
+  for (folder, returnCode, duration) in pool.map(runInFolder, runs):
+    results[folder] = (returnCode, duration)
+  pool.close()
+  pool.join()
+  print("Done in %.1f s" % (time.time() - start))
+  
+  # Outputs of the old version are only kept in the cache if the simulation went to the end (the file 'done' is written last)
+  for old_folder in old_folders.values():
+    if (results[old_folder][0] != 0):
+      shutil.rmtree(old_folder)
+    else:
+      touch(os.path.join(old_folder, "done"))
+  
+  # Summary of all the cases
+  nb_differences = 0
+  nb_timeouts = 0
+  print("%-8s %-10s %8s %8s  %s" % ("algo", "effects", "old (s)", "new (s)", "result"))
+  for (algo, effect) in cases:
+    case_folder = os.path.abspath(os.path.join(MATRIX_FOLDER, "%s_%s" % (algo, effect)))
+    old_folder = old_folders[(algo, effect)]
+    new_folder = os.path.join(case_folder, "new")
+    (returnCode_old, duration_old) = results[old_folder]
+    (returnCode_new, duration_new) = results[new_folder]
+    
+    # If both versions are too slow, the case can't be compared, but this is not a difference between them
+    if (returnCode_old == None and returnCode_new == None):
+      result = "timeout (%d s) for both versions" % timeout
+      nb_timeouts += 1
+    elif (returnCode_old != 0 or returnCode_new != 0):
+      result = "return codes %s (old) and %s (new)" % (returnCode_old, returnCode_new)
+      nb_differences += 1
+    else:
+      result = compareFolders(old_folder, new_folder)
+      if (result == None):
+        result = "OK"
+      else:
+        nb_differences += 1
+    
+    if (duration_old == None):
+      duration_old = "cached"
+    else:
+      duration_old = "%.2f" % duration_old
+    print("%-8s %-10s %8s %8.2f  %s" % (algo, effect, duration_old, duration_new, result))
+  
+  print("%d/%d cases without differences (%d not compared because of the timeout)" % (len(cases) - nb_differences - nb_timeouts, len(cases), nb_timeouts))
+  
+  return nb_differences
+
+def getFolderSize(folder):
+  """return the size (in bytes) of all the files of a folder and its sub-folders"""
+  
+  size = 0
+  for (path, dirnames, filenames) in os.walk(folder):
+    for filename in filenames:
+      size += os.path.getsize(os.path.join(path, filename))
+  
+  return size
+
+def touch(filename):
+  """Create the file if needed and set its modification time to now"""
+  
+  f = open(filename, 'a')
+  f.close()
+  os.utime(filename, None)
+
+def getReference(revision_id, preset):
+  """Compile the given commit with the options of the preset, in a git worktree of REFERENCE_CACHE, so that the 
+  current tree is untouched. The binary and the data files are kept in the sub-folder '<commit>_<preset>' of the cache,
+  the worktree is deleted afterwards. If the binary already exists in the cache, nothing is compiled.
+
+  Parameters :
+  revision_id : the full ID of a commit
+  preset : a key of PRESETS
+
+  Return : the folder of the reference in the cache, or None if the compilation failed
+  """
+  
+  entry = os.path.join(REFERENCE_CACHE, "%s_%s" % (revision_id, preset))
+  binary = os.path.join(entry, PROGRAM_NAME)
+  
+  if os.path.isfile(binary):
+    print("Using the reference binary of the cache (%s)" % entry)
+    touch(os.path.join(entry, "last_use"))
+    return entry
+  
+  worktree = os.path.join(REFERENCE_CACHE, "worktree_%s" % revision_id)
+  if os.path.isdir(worktree):
+    shutil.rmtree(worktree)
+  run("git worktree prune")
+  
+  (stdout, stderr, returnCode) = run("git worktree add --detach %s %s" % (worktree, revision_id))
+  if (returnCode != 0):
+    print("Unable to create a worktree for %s" % revision_id)
+    print(stderr)
+    return None
+  
+  # The Makefile.py of the revision is used, to compile it as it was at the time
+  print("Compiling %s with the '%s' preset..." % (revision_id, preset))
+  os.chdir(worktree)
+  (stdout, stderr, returnCode) = run("%s Makefile.py %s" % (sys.executable, PRESETS[preset]))
+  os.chdir(ROOT_FOLDER)
+  
+  if not(os.path.isfile(os.path.join(worktree, PROGRAM_NAME))):
+    print(stdout)
+    print(stderr)
+    run("git worktree remove --force %s" % worktree)
+    return None
+  
+  if os.path.isdir(entry):
+    shutil.rmtree(entry)
+  os.makedirs(entry)
+  shutil.copy2(os.path.join(worktree, PROGRAM_NAME), entry)
+  for filename in glob.glob(os.path.join(worktree, "*.dat")):
+    shutil.copy(filename, entry)
+  
+  revision_file = open(os.path.join(entry, "revision.in"), 'w')
+  revision_file.write("Revision ID: %s\n" % revision_id)
+  revision_file.write("Preset: %s (Makefile.py %s)\n" % (preset, PRESETS[preset]))
+  revision_file.close()
+  touch(os.path.join(entry, "last_use"))
+  
+  run("git worktree remove --force %s" % worktree)
+  
+  return entry
+
+def getMatrixReference(revision_id, effects):
+  """return the folder of REFERENCE_CACHE for the binary of the given commit compiled with a set of effects of MATRIX_EFFECTS
+  (see runMatrix). The binary is compiled with the 'test' preset, like all the binaries of the 'matrix' mode.
+
+  Parameters :
+  revision_id : the full ID of a commit
+  effects : dictionnary {name of the parameter in tides_constant_GR.f90: value}
+  """
+  
+  name = "-".join(["%s%d" % item for item in sorted(effects.items())])
+  
+  return os.path.join(REFERENCE_CACHE, "%s_matrix-%s" % (revision_id, name))
+
+def getInputHash(input_folder):
+  """return the md5 hash (hexadecimal string) of the names and content of the input files (*.in) of a folder"""
+  
+  md5 = hashlib.md5()
+  for filename in sorted(glob.glob(os.path.join(input_folder, "*.in"))):
+    f = open(filename, 'rb')
+    md5.update(os.path.basename(filename).encode())
+    md5.update(f.read())
+    f.close()
+  
+  return md5.hexdigest()
+
+def getReferenceOutputs(entry, input_folder, force=False):
+  """Run the reference binary of the cache with the input files (*.in) of a folder. Outputs are stored in a sub-folder
+  of the reference, named after a hash of the input files, so that the simulation is only run once for a given set of inputs.
+
+  Parameters :
+  entry : the folder of the reference in the cache (see getReference)
+  input_folder : the folder containing the input files of the simulation
+  force : if True, the simulation is run even if its outputs are in the cache
+
+  Return : a tuple (folder, stdout) with the folder containing the outputs and the standard output of mercury
+  """
+  
+  input_files = sorted(glob.glob(os.path.join(input_folder, "*.in")))
+  folder = os.path.join(entry, "outputs", getInputHash(input_folder))
+  stdout_file = os.path.join(folder, "%s_stdout.txt" % PROGRAM_NAME)
+  
+  if (os.path.isfile(stdout_file) and not(force)):
+    print("Using the reference outputs of the cache (%s)" % folder)
+    f = open(stdout_file, 'rb')
+    stdout = f.read()
+    f.close()
+    return (folder, stdout)
+  
+  if os.path.isdir(folder):
+    shutil.rmtree(folder)
+  os.makedirs(folder)
+  for filename in input_files + glob.glob(os.path.join(entry, "*.dat")):
+    shutil.copy(filename, folder)
+  
+  os.chdir(folder)
+  (stdout, stderr, returnCode) = run(os.path.join(entry, PROGRAM_NAME))
+  os.chdir(ROOT_FOLDER)
+  
+  # The standard output is written last, outputs are only reused if the simulation went to the end
+  if (returnCode == 0):
+    f = open(stdout_file, 'wb')
+    f.write(stdout)
+    f.close()
+  
+  return (folder, stdout)
+
+def pruneCache(max_age, max_size, keep=None):
+  """Delete the references of the cache that were not used for max_age days, then the least recently used ones until
+  the size of the cache is less than max_size MB. The reference 'keep' (the one used by the current comparison) is never deleted"""
+  
+  if not(os.path.isdir(REFERENCE_CACHE)):
+    return
+  
+  entries = []
+  for entry in glob.glob(os.path.join(REFERENCE_CACHE, "*_*")):
+    if os.path.basename(entry).startswith("worktree_"):
+      continue
+    last_use = os.path.join(entry, "last_use")
+    if os.path.isfile(last_use):
+      entries.append((os.path.getmtime(last_use), entry))
+    else:
+      entries.append((os.path.getmtime(entry), entry))
+  entries.sort()
+  
+  sizes = dict([(entry, getFolderSize(entry)) for (last_use, entry) in entries])
+  total_size = sum(sizes.values())
+  
+  for (last_use, entry) in entries:
+    if (entry == keep):
+      continue
+    age = (time.time() - last_use) / 86400.
+    if (age > max_age or total_size > max_size * 1024.**2):
+      print("Deleting %s from the reference cache (unused for %.1f days, cache of %.1f MB)" % (os.path.basename(entry), age, total_size / 1024.**2))
+      shutil.rmtree(entry)
+      total_size -= sizes[entry]
+  
 ##################
 # Outputs of various binaries and tests to compare with the actual ones. 
 # Theses outputs are those of the original version of mercury, that is, mercury6_2.for
@@ -331,11 +944,24 @@ os.chdir(NEW_TEST)
 clean()
 os.chdir("..")
 
-# We create folder and force old simulation generation if this is the first time we run the script
+# We create folder and get the old sources if this is the first time we run the script
 if not(os.path.isdir(PREVIOUS_TEST)):
   os.mkdir(PREVIOUS_TEST)
   force_source = True
-  force_simulation = True
+
+# With 'rev=', the old sources are replaced only if they are not the ones of this revision
+if (isRevision and not(force_source)):
+  (REVISION_ID, dummy, returnCode) = run("git rev-parse %s" % REVISION)
+  REVISION_ID = REVISION_ID.decode().strip()
+  previous_id = None
+  if os.path.isfile(os.path.join(PREVIOUS_TEST, "revision.in")):
+    revision_file = open(os.path.join(PREVIOUS_TEST, "revision.in"), 'r')
+    for line in revision_file:
+      if line.startswith("Old revision ID:"):
+        previous_id = line.split(":")[1].strip()
+    revision_file.close()
+  if (previous_id != REVISION_ID):
+    force_source = True
 
 # We delete old files, get the desired revision of the code, and the corresponding simulation files, compile it and so on.
 if force_source:
@@ -355,6 +981,8 @@ if force_source:
   # We retrieve the commit ID from the possible alias stored in 'REVISION'
   (REVISION_ID, dummy, returnCode) = run("git rev-parse %s" % REVISION)
   (HEAD_ID, dummy, returnCode) = run("git rev-parse HEAD")
+  REVISION_ID = REVISION_ID.decode().strip()
+  HEAD_ID = HEAD_ID.decode().strip()
   
   os.chdir(PREVIOUS_TEST)
   
@@ -365,18 +993,26 @@ if force_source:
   revision_file.write("Current revision ID (HEAD): %s\n(but uncommitted changes might exists)\n" % HEAD_ID)
   revision_file.close()
   
-  # Compilation of previous code
-  previous_compilation = "Makefile.py test"
-  print(previous_compilation)
-  (stdout, stderr, returnCode) = run(previous_compilation)
-  
-  if (returnCode != 0):
-    print(stdout)
-    print(stderr)
-  
   os.chdir("..")
 
-for algo in ["BS", "BS2", "MVS", "RADAU", "HYBRID"]:
+revision_file = open(os.path.join(PREVIOUS_TEST, "revision.in"), 'r')
+for line in revision_file:
+  if line.startswith("Old revision ID:"):
+    REVISION_ID = line.split(":")[1].strip()
+revision_file.close()
+
+if isMatrix:
+  nb_differences = runMatrix(nb_jobs, timeout, REVISION_ID, force=force_simulation)
+  sys.exit(min(abs(nb_differences), 1))
+
+# The reference binary is compiled in a worktree, only if this revision and preset are not in the cache yet
+
+reference = getReference(REVISION_ID, preset)
+if (reference == None):
+  print("Unable to compile the reference revision %s" % REVISION_ID)
+  sys.exit(1)
+
+for algo in ALGORITHMS:
 		
 	print("##########################################")
 	sys.stdout.write("Running new binaries with %s ...\r" % algo)
@@ -396,39 +1032,29 @@ for algo in ["BS", "BS2", "MVS", "RADAU", "HYBRID"]:
 	os.chdir("..")
 	print("Running new binaries with %s ...ok" % algo)
 
-	# We run the old version simulation
+	# We run the old version simulation, unless the cache already has its outputs for these input files
 	print("##########################################")
-	os.chdir(PREVIOUS_TEST)
-	# Copy of simulation files
-	copy_files = "cp ../%s/* ." % NEW_TEST
-	print(copy_files)
-	run(copy_files)
-
-	clean() # Suppress previous temporary files
 	sys.stdout.write("Running old binaries with %s ...\r" % algo)
 	sys.stdout.flush()
-	(merc_or_stdout, merc_or_stderr, returnCode) = run("./%s" % PROGRAM_NAME)
+	(reference_folder, merc_or_stdout) = getReferenceOutputs(reference, NEW_TEST, force=force_simulation)
 	print("Running old binaries with %s ...ok" % algo)
 	print("##########################################")
 
-	# Go back in parent directory (containing the current code and test script)
-	os.chdir("..")
-
 	# We make the comparison
 
-	diff = ASCIICompare(merc_or_stdout, merc_new__stdout)
+	diff = numericCompare(merc_or_stdout.decode(), merc_new__stdout.decode())
 	if (diff != None):
 	  print("\nTest of mercury")
 	  print("\tFor the Output of mercury")
-	  print diff
+	  print(diff)
 
 	# We create names including the folder in which they are
 	CLOSE_FILENAMES_NEW = [os.path.join(NEW_TEST, filename) for filename in CLOSE_FILENAMES]
 	OUTPUT_FILENAMES_NEW = [os.path.join(NEW_TEST, filename) for filename in OUTPUT_FILENAMES]
 
 	# We create names including the folder in which they are
-	CLOSE_FILENAMES_OLD = [os.path.join(PREVIOUS_TEST, filename) for filename in CLOSE_FILENAMES]
-	OUTPUT_FILENAMES_OLD = [os.path.join(PREVIOUS_TEST, filename) for filename in OUTPUT_FILENAMES]
+	CLOSE_FILENAMES_OLD = [os.path.join(reference_folder, filename) for filename in CLOSE_FILENAMES]
+	OUTPUT_FILENAMES_OLD = [os.path.join(reference_folder, filename) for filename in OUTPUT_FILENAMES]
 
 	print("comparing outputs:")
 	compare2Binaries(OUTPUT_FILENAMES_OLD, OUTPUT_FILENAMES_NEW)
@@ -438,10 +1064,13 @@ for algo in ["BS", "BS2", "MVS", "RADAU", "HYBRID"]:
 
 
 	# We include the folder name because we are in the parent folder.
-	ASCII_OLD = [os.path.join(PREVIOUS_TEST, filename) for filename in ASCII_FILES]
+	ASCII_OLD = [os.path.join(reference_folder, filename) for filename in ASCII_FILES]
 	ASCII_NEW = [os.path.join(NEW_TEST, filename) for filename in ASCII_FILES]
 
 	#~ pdb.set_trace()
 	print("comparing ASCII files (info.out,...)")
 	compare2files(ASCII_OLD, ASCII_NEW)
 	print("##########################################")
+
+# Old references are deleted from the cache
+pruneCache(cache_age, cache_size, keep=reference)
@@ -529,6 +529,11 @@ end subroutine mxx_elim
 !! Also returns arrays ICE and JCE, containing the indices of each pair of
 !! objects estimated to have undergone an encounter.
 !!
+!! Pairs whose X-Y boxes overlap are found by sorting the boxes along X and sweeping
+!! (a box is only compared to the following ones that start before its end), instead
+!! of testing all pairs. Pairs are then examined in the same order as the
+!! original double loop, so that ICE and JCE are unchanged.
+!!
 !> @note All coordinates must be with respect to the central body!!!
 !
 !%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% 
@@ -559,10 +564,17 @@ subroutine mce_snif (h,start_index,nbod,nbig,x0,v0,x1,v1,rcrit,ce,nce,ice,jce)
   
   ! Local
   integer :: i0 !< starting index for checking close encounters, mainly equal to start_index
-  integer :: i,j
+  integer :: i,j,k,l,p,q,nsort,npair
+  integer :: order(nb_bodies_initial) !< bodies i0 to nbod, sorted by increasing xmin (relative to i0)
+  integer :: first(nb_bodies_initial+1) !< partners of body i are partner(first(i)+1:first(i+1))
+  integer :: filled(nb_bodies_initial)
   real(double_precision) :: d0,d1,d0t,d1t,d2min,temp,tmin,rc,rc2
   real(double_precision) :: dx0,dy0,dz0,du0,dv0,dw0,dx1,dy1,dz1,du1,dv1,dw1
   real(double_precision) :: xmin(nb_bodies_initial),xmax(nb_bodies_initial),ymin(nb_bodies_initial),ymax(nb_bodies_initial)
+  real(double_precision) :: xsort(nb_bodies_initial)
+  
+  ! Pairs (pair_i < pair_j) whose boxes overlap. Arrays are kept between two calls, and only allocated again if too small
+  integer, dimension(:), allocatable, save :: pair_i, pair_j, partner, tmp_pair
   
   !------------------------------------------------------------------------------
   
@@ -588,53 +600,125 @@ subroutine mce_snif (h,start_index,nbod,nbig,x0,v0,x1,v1,rcrit,ce,nce,ice,jce)
      ymax(j) = ymax(j) + rcrit(j)
   end do
   
-  ! Identify pairs whose X-Y boxes overlap, and calculate minimum separation
+  ! Identify pairs whose X-Y boxes overlap. Boxes are sorted by xmin, so each box only overlaps in X the
+  ! following ones until one starts after its end. Small bodies do not interact with one another.
+  nsort = nbod - i0 + 1
+  do k = 1, nsort
+     xsort(k) = xmin(i0 + k - 1)
+  end do
+  call mxx_sort (nsort,xsort,order)
+  
+  if (.not.allocated(pair_i)) then
+     allocate(pair_i(4 * nb_bodies_initial), pair_j(4 * nb_bodies_initial))
+  end if
+  
+  npair = 0
+  do p = 1, nsort
+     i = order(p) + i0 - 1
+     do q = p + 1, nsort
+        if (xsort(q).gt.xmax(i)) exit
+        j = order(q) + i0 - 1
+        if ((i.le.nbig.or.j.le.nbig).and.ymax(i).ge.ymin(j).and.ymax(j).ge.ymin(i)) then
+           if (npair.eq.size(pair_i)) then
+              allocate(tmp_pair(2 * npair))
+              tmp_pair(1:npair) = pair_i(1:npair)
+              call move_alloc(tmp_pair, pair_i)
+              allocate(tmp_pair(2 * npair))
+              tmp_pair(1:npair) = pair_j(1:npair)
+              call move_alloc(tmp_pair, pair_j)
+           end if
+           npair = npair + 1
+           pair_i(npair) = min(i, j)
+           pair_j(npair) = max(i, j)
+        end if
+     end do
+  end do
+  
+  ! Group the pairs by their first body (counting sort), then sort the partners of each body, so that
+  ! pairs are examined in the same order as in a double loop on i and j > i
+  if (.not.allocated(partner)) then
+     allocate(partner(size(pair_i)))
+  else if (size(partner).lt.npair) then
+     deallocate(partner)
+     allocate(partner(size(pair_i)))
+  end if
+  
+  do i = 1, nbod + 1
+     first(i) = 0
+  end do
+  do k = 1, npair
+     first(pair_i(k) + 1) = first(pair_i(k) + 1) + 1
+  end do
+  do i = 2, nbod + 1
+     first(i) = first(i) + first(i - 1)
+  end do
+  do i = 1, nbod
+     filled(i) = first(i)
+  end do
+  do k = 1, npair
+     i = pair_i(k)
+     filled(i) = filled(i) + 1
+     partner(filled(i)) = pair_j(k)
+  end do
+  
+  ! Calculate minimum separation of each pair
   do i = i0, nbig
-     do j = i + 1, nbod
-        if (xmax(i).ge.xmin(j).and.xmax(j).ge.xmin(i).and.ymax(i).ge.ymin(j).and.ymax(j).ge.ymin(i)) then
-           
-           ! Determine the maximum separation that would qualify as an encounter
-           rc = max(rcrit(i), rcrit(j))
-           rc2 = rc * rc
-           
-           ! Calculate initial and final separations
-           dx0 = x0(1,i) - x0(1,j)
-           dy0 = x0(2,i) - x0(2,j)
-           dz0 = x0(3,i) - x0(3,j)
-           dx1 = x1(1,i) - x1(1,j)
-           dy1 = x1(2,i) - x1(2,j)
-           dz1 = x1(3,i) - x1(3,j)
-           d0 = dx0*dx0 + dy0*dy0 + dz0*dz0
-           d1 = dx1*dx1 + dy1*dy1 + dz1*dz1
-           
-           ! Check for a possible minimum in between
-           du0 = v0(1,i) - v0(1,j)
-           dv0 = v0(2,i) - v0(2,j)
-           dw0 = v0(3,i) - v0(3,j)
-           du1 = v1(1,i) - v1(1,j)
-           dv1 = v1(2,i) - v1(2,j)
-           dw1 = v1(3,i) - v1(3,j)
-           d0t = (dx0*du0 + dy0*dv0 + dz0*dw0) * 2.d0
-           d1t = (dx1*du1 + dy1*dv1 + dz1*dw1) * 2.d0
-           
-           ! If separation derivative changes sign, find the minimum separation
-           d2min = HUGE
-           if (d0t*h.le.0.and.d1t*h.ge.0) call mce_min (d0,d1,d0t,d1t,h,d2min,tmin)
-           
-           ! If minimum separation is small enough, flag this as a possible encounter
-           temp = min (d0,d1,d2min)
-           if (temp.le.rc2) then
-              ce(i) = 2
-              ce(j) = 2
-              if (nce.lt.CMAX) then
-                nce = nce + 1
-                ice(nce) = i
-                jce(nce) = j
-              else
-                write(*,*) 'Error: The number of close encounters exceed the limit (CMAX=',CMAX,').'
-                write(*,*) '       All remaining close encounters are skipped'
-                return
-              end if
+     ! Insertion sort, each body has only a few partners
+     do k = first(i) + 2, first(i + 1)
+        j = partner(k)
+        l = k - 1
+        do while (l.gt.first(i))
+           if (partner(l).le.j) exit
+           partner(l + 1) = partner(l)
+           l = l - 1
+        end do
+        partner(l + 1) = j
+     end do
+     
+     do k = first(i) + 1, first(i + 1)
+        j = partner(k)
+        
+        ! Determine the maximum separation that would qualify as an encounter
+        rc = max(rcrit(i), rcrit(j))
+        rc2 = rc * rc
+        
+        ! Calculate initial and final separations
+        dx0 = x0(1,i) - x0(1,j)
+        dy0 = x0(2,i) - x0(2,j)
+        dz0 = x0(3,i) - x0(3,j)
+        dx1 = x1(1,i) - x1(1,j)
+        dy1 = x1(2,i) - x1(2,j)
+        dz1 = x1(3,i) - x1(3,j)
+        d0 = dx0*dx0 + dy0*dy0 + dz0*dz0
+        d1 = dx1*dx1 + dy1*dy1 + dz1*dz1
+        
+        ! Check for a possible minimum in between
+        du0 = v0(1,i) - v0(1,j)
+        dv0 = v0(2,i) - v0(2,j)
+        dw0 = v0(3,i) - v0(3,j)
+        du1 = v1(1,i) - v1(1,j)
+        dv1 = v1(2,i) - v1(2,j)
+        dw1 = v1(3,i) - v1(3,j)
+        d0t = (dx0*du0 + dy0*dv0 + dz0*dw0) * 2.d0
+        d1t = (dx1*du1 + dy1*dv1 + dz1*dw1) * 2.d0
+        
+        ! If separation derivative changes sign, find the minimum separation
+        d2min = HUGE
+        if (d0t*h.le.0.and.d1t*h.ge.0) call mce_min (d0,d1,d0t,d1t,h,d2min,tmin)
+        
+        ! If minimum separation is small enough, flag this as a possible encounter
+        temp = min (d0,d1,d2min)
+        if (temp.le.rc2) then
+           ce(i) = 2
+           ce(j) = 2
+           if (nce.lt.CMAX) then
+             nce = nce + 1
+             ice(nce) = i
+             jce(nce) = j
+           else
+             write(*,*) 'Error: The number of close encounters exceed the limit (CMAX=',CMAX,').'
+             write(*,*) '       All remaining close encounters are skipped'
+             return
            end if
         end if
      end do
@@ -11,14 +11,21 @@ module forces
 
   use types_numeriques
   use mercury_globals
+!$ use omp_lib
 
   implicit none
   
   private
   
+  ! Accelerations accumulated by each thread in the parallel force loops (3, body, thread), summed afterwards
+  ! in the order of the threads (see mfo_thread_init and mfo_thread_sum)
+  real(double_precision), dimension(:,:,:), allocatable, save :: thread_acc
+  
   public :: mfo_all
   public :: mfo_ngf ! Needed by HYBRID and MVS
   public :: mfo_obl ! Needed by HYBRID and MVS on respectively mfo_hy and mfo_mvs
+  public :: mfo_thread_init, mfo_thread_sum ! Needed by HYBRID on mfo_drct
+  public :: thread_acc
   
   contains
   
@@ -174,7 +181,7 @@ subroutine mfo_grav (nbod,nbig,m,x,v,a,stat)
   real(double_precision), intent(out) :: a(3,nbod)
   
   ! Local
-  integer :: i, j
+  integer :: i, j, thread, nthreads
   real(double_precision) :: sx, sy, sz, dx, dy, dz, tmp1, tmp2, s_1, s2, s_3, r3(nb_bodies_initial)
   
   !------------------------------------------------------------------------------
@@ -198,8 +205,14 @@ subroutine mfo_grav (nbod,nbig,m,x,v,a,stat)
      sz = sz  -  tmp1 * x(3,i)
   end do
   
-  ! Direct terms
+  ! Direct terms. Each thread accumulates in its own array, so that the sum does not depend on the scheduling
+  call mfo_thread_init (nbod,nbig,nthreads)
+  
+  thread = 0
+  !$omp parallel do if(nthreads.gt.1) num_threads(nthreads) schedule(static,1) default(shared) &
+  !$omp private(i,j,thread,dx,dy,dz,s2,s_1,s_3,tmp1,tmp2)
   do i = 2, nbig
+!$   thread = omp_get_thread_num()
      do j = i + 1, nbod
         dx = x(1,j) - x(1,i)
         dy = x(2,j) - x(2,i)
@@ -209,14 +222,17 @@ subroutine mfo_grav (nbod,nbig,m,x,v,a,stat)
         s_3 = s_1 * s_1 * s_1
         tmp1 = s_3 * m(i)
         tmp2 = s_3 * m(j)
-        a(1,j) = a(1,j)  -  tmp1 * dx
-        a(2,j) = a(2,j)  -  tmp1 * dy
-        a(3,j) = a(3,j)  -  tmp1 * dz
-        a(1,i) = a(1,i)  +  tmp2 * dx
-        a(2,i) = a(2,i)  +  tmp2 * dy
-        a(3,i) = a(3,i)  +  tmp2 * dz
+        thread_acc(1,j,thread) = thread_acc(1,j,thread)  -  tmp1 * dx
+        thread_acc(2,j,thread) = thread_acc(2,j,thread)  -  tmp1 * dy
+        thread_acc(3,j,thread) = thread_acc(3,j,thread)  -  tmp1 * dz
+        thread_acc(1,i,thread) = thread_acc(1,i,thread)  +  tmp2 * dx
+        thread_acc(2,i,thread) = thread_acc(2,i,thread)  +  tmp2 * dy
+        thread_acc(3,i,thread) = thread_acc(3,i,thread)  +  tmp2 * dz
      end do
   end do
+  !$omp end parallel do
+  
+  call mfo_thread_sum (nbod,nthreads,a)
   
   ! Indirect terms (add these on last to reduce roundoff error)
   do i = 2, nbod
@@ -498,4 +514,88 @@ subroutine mfo_obl (jcen,nbod,m,x,a,acen)
   return
 end subroutine mfo_obl
   
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+!
+! DESCRIPTION: 
+!> @brief Choose the number of threads of the parallel force loops (mfo_grav, mfo_drct), and set
+!! to zero the accelerations accumulated by each thread (thread_acc).
+!
+!> @note The force loops are only parallel when mercury is compiled with OpenMP ('Makefile.py openmp')
+!! and there are at least OMP_MIN_BIG big bodies. Otherwise, only one thread is used, and the results
+!! are the same as those of the serial loops.
+!
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% 
+subroutine mfo_thread_init (nbod,nbig,nthreads)
+  
+  use mercury_constant
+
+  implicit none
+
+  
+  ! Input
+  integer, intent(in) :: nbod !< [in] current number of bodies (1: star; 2-nbig: big bodies; nbig+1-nbod: small bodies)
+  integer, intent(in) :: nbig !< [in] current number of big bodies (ones that perturb everything else)
+  
+  ! Output
+  integer, intent(out) :: nthreads !< [out] number of threads of the force loops
+  
+  !------------------------------------------------------------------------------
+  
+  nthreads = 1
+!$ if (nbig.ge.OMP_MIN_BIG) nthreads = omp_get_max_threads()
+  
+  ! The array is kept between two calls, it is only allocated again if it is too small
+  if (allocated(thread_acc)) then
+     if ((size(thread_acc,2).lt.nbod).or.(size(thread_acc,3).lt.nthreads)) deallocate(thread_acc)
+  end if
+  if (.not.allocated(thread_acc)) then
+     allocate(thread_acc(3,max(nbod,nb_bodies_initial),0:nthreads-1))
+  end if
+  
+  thread_acc(:,1:nbod,0:nthreads-1) = 0.d0
+  
+  !------------------------------------------------------------------------------
+  
+  return
+end subroutine mfo_thread_init
+
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+!
+! DESCRIPTION: 
+!> @brief Add the accelerations accumulated by each thread (thread_acc) to A. Threads are
+!! always summed in the same order, so that results are reproducible for a given number of threads.
+!
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% 
+subroutine mfo_thread_sum (nbod,nthreads,a)
+  
+  implicit none
+
+  
+  ! Input
+  integer, intent(in) :: nbod !< [in] current number of bodies (1: star; 2-nbig: big bodies; nbig+1-nbod: small bodies)
+  integer, intent(in) :: nthreads !< [in] number of threads of the force loops (see mfo_thread_init)
+  
+  ! Input/Output
+  real(double_precision), intent(inout) :: a(3,nbod)
+  
+  ! Local
+  integer :: j, thread
+  
+  !------------------------------------------------------------------------------
+  
+  !$omp parallel do if(nthreads.gt.1) num_threads(nthreads) schedule(static) default(shared) private(j,thread)
+  do j = 1, nbod
+     do thread = 0, nthreads - 1
+        a(1,j) = a(1,j) + thread_acc(1,j,thread)
+        a(2,j) = a(2,j) + thread_acc(2,j,thread)
+        a(3,j) = a(3,j) + thread_acc(3,j,thread)
+     end do
+  end do
+  !$omp end parallel do
+  
+  !------------------------------------------------------------------------------
+  
+  return
+end subroutine mfo_thread_sum
+
 end module forces
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Script that write the tables of brown dwarfs of intermediate masses (see mercury_host_tables.py), interpolated
+# between the tables of the two masses around, and add them to the index (tablesBD.dat) read by the user module.
+
+import sys
+import mercury_host_tables
+
+# Parameters
+masses = [] # In solar mass
+folder = "."
+
+isProblem = False
+problem_message = """Script that write the tables of a brown dwarf of intermediate mass (mass_xx.xxxx.dat for
+the radius, rg2BD_xx.xxxx.dat for the radius of gyration), interpolated linearly in
+mass between the tables of the two masses around, and add them to %s.
+
+mercury (read_BD_tables in user_module.f90) does the same interpolation when there is
+no table for the mass of the brown dwarf. Writing the table in advance is only useful
+to look at it, or to replace it by a real evolution track later.
+
+The script can take various arguments :
+(no spaces between the key and the values, only separated by '=')
+ * help : display a little help message on HOW to use various options
+ * mass=0.065 : comma separated list of the masses (Msun) of the brown dwarfs
+ * folder=%s : folder of the tables and of the index
+
+ Example :
+> generate_host_table.py mass=0.065
+> generate_host_table.py mass=0.025,0.035 folder=data_host_star""" % (mercury_host_tables.INDEX_FILE, folder)
+
+value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+    value = None
+  if (key == 'mass'):
+    masses = [float(mass) for mass in value.split(",")]
+  elif (key == 'folder'):
+    folder = value
+  elif (key == 'help'):
+    isProblem = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  else:
+    print("the key '%s' does not match" % key)
+    isProblem = True
+
+if (masses == []):
+  print("At least one mass is needed")
+  isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+
+for mass in masses:
+  try:
+    entries = mercury_host_tables.read_index(folder)
+    (lower, upper) = mercury_host_tables.get_bounds(entries, mass)
+  except (IOError, ValueError) as error:
+    print(error)
+    sys.exit(1)
+
+  if (upper == None):
+    print("%g Msun : %s already exists" % (mass, lower.radius_file))
+    continue
+
+  entry = mercury_host_tables.generate_table(mass, folder)
+  print("%g Msun : %s (%d rows) and %s, interpolated between %g and %g Msun, k2=%.4g, Ps0=%.4g hours" % (mass,
+        entry.radius_file, entry.nb_rows, entry.rg2_file, lower.mass, upper.mass, entry.k2, entry.Ps0))
@@ -360,6 +360,7 @@ subroutine mio_in (time,h0,tol,rcen,jcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,v,
   
   ! Find out if this is an old integration (i.e. does the restart file exist)
   inquire (file=dumpfile(4), exist=oldflag)
+  is_continued = oldflag
   
   ! Check if information file exists, and append a continuation message
   if (oldflag) then
@@ -439,6 +440,7 @@ subroutine mio_in (time,h0,tol,rcen,jcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,v,
            goto 661
         end if
      end if
+     if ((j.eq.13).and.(c1.eq.'y'.or.c1.eq.'Y')) opt(5) = 1
      if ((j.eq.15).and.(c1.eq.'y'.or.c1.eq.'Y')) opt(8) = 1
      if (j.eq.16) read (c80,*,err=661) rmax
      if (j.eq.17) read (c80,*,err=661) rcen
@@ -731,6 +733,13 @@ subroutine mio_in (time,h0,tol,rcen,jcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,v,
         close (20+j)
      end do
      
+     ! Same for the binary snapshots, that start with their header
+     if (opt(5).eq.1) then
+        inquire (file=SNAPSHOT_FILE, exist=test)
+        if (test) call mio_err (23,mem(81),lmem(81),mem(87),lmem(87),' ',1,SNAPSHOT_FILE,len(SNAPSHOT_FILE))
+        call mio_snapshot_header ()
+     end if
+     
      ! Check that dump files don't exist, and then create them
      do j = 1, 4
         inquire (file=dumpfile(j), exist=test)
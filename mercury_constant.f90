@@ -18,6 +18,7 @@ integer, parameter :: NMESS = 200 !< NMESS = maximum number of messages in messa
 integer, parameter :: NFILES = 50 !< NFILES = maximum number of files that can be open at the same time
 real(double_precision), parameter :: HUGE = 9.9d29 !< HUGE  = an implausibly large number
 real(double_precision), parameter :: TINY = 4.D-15 !< A small number
+integer, parameter :: OMP_MIN_BIG = 50 !< minimum number of big bodies for the force loops to be parallel (OpenMP)
 
 !...   convergence criteria for danby
 real(double_precision), parameter :: DANBYAC= 1.0d-14
@@ -20,7 +20,7 @@ module mercury_globals
 !!\n  OPT(2) = collision option (0=no collisions, 1=merge, 2=merge+fragment)
 !!\n  OPT(3) = time style (0=days 1=Greg.date 2/3=days/years w/respect to start)
 !!\n  OPT(4) = o/p precision (1,2,3 = 4,9,15 significant figures)
-!!\n  OPT(5) = < Not used at present >
+!!\n  OPT(5) = binary snapshots in xv.bin, in addition to xv.out? (0=no, 1=yes)
 !!\n  OPT(6) = < Not used at present >
 !!\n  OPT(7) = apply post-Newtonian correction? (0=no, 1=yes)
 !!\n  OPT(8) = apply user-defined force routine mfo_user? (0=no, 1=yes)
@@ -39,6 +39,8 @@ module mercury_globals
 !!\n  DUMPFILE (3) = integration parameters
 !!\n  DUMPFILE (4) = restart file  
   
+  logical :: is_continued = .false. !< True if the integration continues from existing dump files (the restart file existed at start)
+  
   integer :: algor !< An index that represent the algorithm used. \n
 !!\n  ALGOR = 1  ->  Mixed-variable symplectic
 !!\n          2  ->  Bulirsch-Stoer integrator
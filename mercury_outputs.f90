@@ -15,6 +15,19 @@ module mercury_outputs
   implicit none
   
   character(len=1), dimension(5), parameter, private :: bad = (/'*', '/', '.', ':', '&'/)
+  
+  ! Binary snapshots (opt(5)=1), written by mio_out in addition to xv.out. The file starts with a header (magic string,
+  !! version, size of the header in bytes, number of values of each frame and of each body, then their names on 16
+  !! characters). Each frame is then a record of little-endian float64 : time (days), nbig, nbod, then for each body
+  !! but the central one its index, mass (solar masses), x (AU), v (AU/day), spin (solar masses AU^2/day) and density (g/cm^3)
+  character(len=*), parameter :: SNAPSHOT_FILE = 'xv.bin'
+  character(len=8), parameter, private :: SNAPSHOT_MAGIC = 'MERCSNAP'
+  integer, parameter, private :: SNAPSHOT_VERSION = 1
+  integer, parameter, private :: SNAPSHOT_UNIT = 24
+  integer, parameter, private :: int32 = selected_int_kind(9)
+  character(len=16), dimension(3), parameter, private :: SNAPSHOT_FRAME = (/ character(len=16) :: 'time','nbig','nbod' /)
+  character(len=16), dimension(12), parameter, private :: SNAPSHOT_BODY = (/ character(len=16) :: 'id','m','x','y','z', &
+       'vx','vy','vz','sx','sy','sz','rho' /)
 
   contains
 
@@ -183,6 +196,7 @@ subroutine mio_dump (time,h0,tol,jcen,rcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,
   
   use physical_constant
   use mercury_constant
+  use user_module, only : flush_tidal_outputs
 
   implicit none
 
@@ -236,6 +250,9 @@ subroutine mio_dump (time,h0,tol,jcen,rcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,
   !      if (algor.eq.11) call mco_h2ub (time,jcen,nbod,nbig,h0,m,x,v,
   !     %   x0,v0)
   
+  ! Write the outputs of the tides and rotation stored by the user module, so they match the dump
+  call flush_tidal_outputs ()
+  
   ! Dump to temporary files (idp=1) and real dump files (idp=2)
   do idp = 1, 2
      
@@ -373,7 +390,11 @@ subroutine mio_dump (time,h0,tol,jcen,rcen,en,am,cefac,ndump,nfun,nbod,nbig,m,x,
      else
         write (33,'(2a)') mem(171)(1:lmem(171)),mem(8)(1:lmem(8))
      end if
-     write (33,'(a)') mem(172)(1:lmem(172))
+     if (opt(5).eq.1) then
+        write (33,'(2a)') mem(172)(1:lmem(172)),mem(6)(1:lmem(6))
+     else
+        write (33,'(2a)') mem(172)(1:lmem(172)),mem(5)(1:lmem(5))
+     end if
      if (opt(7).eq.1) then
         write (33,'(2a)') mem(173)(1:lmem(173)),mem(6)(1:lmem(6))
      else
@@ -708,6 +729,20 @@ subroutine mio_out (time,jcen,rcen,nbod,nbig,m,xh,vh,s,rho,stat,id,opflag,outfil
   end do
   
   close (21)
+  
+  ! Binary snapshot, at full precision
+  if (opt(5).eq.1) then
+     open (SNAPSHOT_UNIT, file=SNAPSHOT_FILE, status='old', access='stream', form='unformatted', position='append', &
+          convert='little_endian', iostat=error)
+     if (error /= 0) then
+        write (*,'(/,2a)') " ERROR: Programme terminated. Unable to open ",trim(SNAPSHOT_FILE)
+        stop
+     end if
+     write (SNAPSHOT_UNIT) time,dble(nbig),dble(nbod),(dble(k - 1),m(k) * k_2,xh(:,k),vh(:,k),s(:,k) * k_2, &
+          rho(k) / rhocgs,k=2,nbod)
+     close (SNAPSHOT_UNIT)
+  end if
+  
   opflag = 0
   
   !------------------------------------------------------------------------------
@@ -715,6 +750,40 @@ subroutine mio_out (time,jcen,rcen,nbod,nbig,m,xh,vh,s,rho,stat,id,opflag,outfil
   return
 end subroutine mio_out
 
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
+!
+! DESCRIPTION: 
+!> @brief Creates the file of the binary snapshots (SNAPSHOT_FILE) and writes its header,
+!! that describes the values of each frame written by mio_out
+!
+!%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% 
+subroutine mio_snapshot_header ()
+  
+  implicit none
+  
+  ! Local
+  integer :: header_size
+  integer :: error
+  
+  !------------------------------------------------------------------------------
+  
+  open (SNAPSHOT_UNIT, file=SNAPSHOT_FILE, status='new', access='stream', form='unformatted', &
+       convert='little_endian', iostat=error)
+  if (error /= 0) then
+     write (*,'(/,2a)') " ERROR: Programme terminated. Unable to open ",trim(SNAPSHOT_FILE)
+     stop
+  end if
+  
+  header_size = len(SNAPSHOT_MAGIC) + 4 * 4 + 16 * (size(SNAPSHOT_FRAME) + size(SNAPSHOT_BODY))
+  write (SNAPSHOT_UNIT) SNAPSHOT_MAGIC,int(SNAPSHOT_VERSION,int32),int(header_size,int32), &
+       int(size(SNAPSHOT_FRAME),int32),int(size(SNAPSHOT_BODY),int32),SNAPSHOT_FRAME,SNAPSHOT_BODY
+  close (SNAPSHOT_UNIT)
+  
+  !------------------------------------------------------------------------------
+  
+  return
+end subroutine mio_snapshot_header
+
 !%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%
 !> @author 
 !> John E. Chambers
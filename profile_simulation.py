@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Script that run a simulation with the mercury binary compiled with profiling options, then summarize the
+# profile of gprof (time spent in each routine) in a report that can be compared with a baseline.
+
+import sys
+import os
+import re
+import glob
+import json
+import time
+import shutil
+import subprocess
+
+PROGRAM_NAME = "mercury"
+BUILD_FOLDER = os.path.join("build", "profile") # Where 'Makefile.py profiling' compile the binaries
+RUN_FOLDER = os.path.join(BUILD_FOLDER, "gprof") # Where the simulation is run
+SIMULATION_FILES = ["*.in", "*.dat"] # Input files copied from the simulation folder to RUN_FOLDER
+
+# Columns of the CSV report, in that order
+CSV_COLUMNS = ["name", "module", "self_seconds", "self_percent", "total_seconds", "calls", "symbol"]
+
+# Parameters
+folder = "pgo_workload" # The simulation folder
+output = "profile" # The report is written in 'output'.json and 'output'.csv
+baseline = "profile_baseline.json"
+isCompile = True
+isSave = False # The report becomes the new baseline
+threshold = 10. # Relative increase (in percents) of the self time of a routine to be considered as a regression
+nb_routines = 20 # Number of routines displayed
+
+isProblem = False
+problem_message = """Script that run a simulation with the binary compiled with profiling options
+(Makefile.py profiling), then run gprof and parse the flat profile and call graph into
+a report of the time spent in each routine (JSON and CSV). The report is compared with
+a baseline, if any, to see which routines are slower after a modification.
+
+The script can take various arguments :
+(no spaces between the key and the values, only separated by '=')
+ * help : display a little help message on HOW to use various options
+ * folder=%s : folder of the simulation (*.in files, the message.in and data
+            files of the source folder are used if the simulation folder do not have them)
+ * nocompile : do not compile mercury with profiling options beforehand (%s/%s is used as is)
+ * output=%s : The report is written in %s.json and %s.csv
+ * baseline=%s : report of reference for the comparison
+ * save : the report becomes the new baseline
+ * threshold=%g : relative increase (in percents) of the self time of a routine to be considered
+            as a regression
+ * top=%d : number of routines displayed (the slowest ones)
+
+ Example :
+> profile_simulation.py save # Before the modification
+> profile_simulation.py # After the modification
+> profile_simulation.py folder=../my_simulation top=40""" % (folder, BUILD_FOLDER, PROGRAM_NAME, output, output, output,
+                                                          baseline, threshold, nb_routines)
+
+value_message = "/!\ Warning: %s does not need any value, but you defined '%s=%s' ; value ignored."
+
+# We get arguments from the script
+for arg in sys.argv[1:]:
+  try:
+    (key, value) = arg.split("=")
+  except:
+    key = arg
+    value = None
+  if (key == 'folder'):
+    folder = value
+  elif (key == 'nocompile'):
+    isCompile = False
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'output'):
+    output = value
+  elif (key == 'baseline'):
+    baseline = value
+  elif (key == 'save'):
+    isSave = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  elif (key == 'threshold'):
+    threshold = float(value)
+  elif (key == 'top'):
+    nb_routines = int(value)
+  elif (key == 'help'):
+    isProblem = True
+    if (value != None):
+      print(value_message % (key, key, value))
+  else:
+    print("the key '%s' does not match" % key)
+    isProblem = True
+
+if isProblem:
+  print(problem_message)
+  exit()
+
+def run(commande, cwd=None):
+  """run a command (a string, or a list). Return a tuple with the output, the error and the return code"""
+  if (type(commande)==list):
+    process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+  elif (type(commande)==str):
+    process = subprocess.Popen(commande, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True, cwd=cwd)
+  else:
+    raise TypeError("The command is neither a string nor a list.")
+  (process_stdout, process_stderr) = process.communicate()
+  returncode = process.poll()
+
+  return (process_stdout.decode("utf-8", "replace"), process_stderr.decode("utf-8", "replace"), returncode)
+
+def split_symbol(symbol):
+  """return a tuple (routine, module) from the name of the symbol of a fortran routine.
+  The module is None if the routine is not in a module.
+
+  gfortran name module procedures '__module_MOD_routine', ifort 'module_mp_routine_'
+  """
+
+  match = re.match(r"^__(\w+?)_MOD_(\w+)$", symbol)
+  if match:
+    return (match.group(2), match.group(1))
+
+  match = re.match(r"^(\w+?)_mp_(\w+?)_$", symbol)
+  if match:
+    return (match.group(2), match.group(1))
+
+  # External routines have a trailing underscore
+  if (symbol.endswith("_") and not(symbol.endswith("__"))):
+    return (symbol[:-1], None)
+
+  return (symbol, None)
+
+def parse_flat_profile(lines):
+  """return the dictionnary {symbol: (self_percent, self_seconds, calls)} of the flat profile of gprof (option -b -p).
+  calls is None if the routine was not compiled with profiling options (system libraries for instance)
+  """
+
+  routines = {}
+  isTable = False
+  for line in lines:
+    if not(isTable):
+      # The table start after the line of the column names, that ends with 'name'
+      isTable = (line.split()[-1:] == ["name"])
+      continue
+
+    if (line.strip() == ""):
+      break
+
+    match = re.match(r"^\s*([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+(?:(\d+)\s+([\d.]+)\s+([\d.]+)\s+)?(\S.*)$", line)
+    if match:
+      if (match.group(4) != None):
+        calls = int(match.group(4))
+      else:
+        calls = None
+      routines[match.group(7).strip()] = (float(match.group(1)), float(match.group(3)), calls)
+
+  return routines
+
+def parse_call_graph(lines):
+  """return the dictionnary {symbol: (total_seconds, callers)} of the call graph of gprof (option -b -q).
+  total_seconds is the time spent in the routine and its children, callers the list of symbols that call it
+  """
+
+  routines = {}
+  callers = []
+  for line in lines:
+    # The index of the function names is after the call graph
+    if line.strip().startswith("Index by function name"):
+      break
+
+    # Each routine has its own block, separated by dashes. The callers are above the primary line, children below
+    if line.startswith("-----"):
+      callers = []
+      continue
+
+    # Primary line : [index] %time self children called name [index]
+    match = re.match(r"^\[\d+\]\s+[\d.]+\s+([\d.]+)\s+([\d.]+)\s+(?:[\d+/]+\s+)?(.+?)\s+\[\d+\]$", line)
+    if match:
+      routines[match.group(3)] = (float(match.group(1)) + float(match.group(2)), callers)
+      callers = None
+      continue
+
+    # A caller (self children called/total name [index]). Lines below the primary line are children
+    match = re.match(r"^\s+(?:[\d.]+\s+[\d.]+\s+)?[\d+/]+\s+(.+?)\s+\[\d+\]$", line)
+    if (match and callers != None):
+      callers.append(match.group(1))
+
+  return routines
+
+def get_report(gprof_output):
+  """return the report (a dictionnary) of the time spent in each routine, from the output of 'gprof -b'"""
+
+  lines = gprof_output.split("\n")
+
+  # In brief mode, the call graph starts with 'Call graph', after the flat profile
+  index = len(lines)
+  for (i, line) in enumerate(lines):
+    if line.strip().startswith("Call graph"):
+      index = i
+      break
+
+  flat_profile = parse_flat_profile(lines[:index])
+  call_graph = parse_call_graph(lines[index:])
+
+  routines = {}
+  for (symbol, (self_percent, self_seconds, calls)) in flat_profile.items():
+    (name, module) = split_symbol(symbol)
+    # The same routine name can exist in two modules. The symbol is used for the second one.
+    if (name in routines):
+      name = symbol
+    (total_seconds, callers) = call_graph.get(symbol, (self_seconds, []))
+    routines[name] = {"symbol": symbol, "module": module, "self_percent": self_percent, "self_seconds": self_seconds,
+                      "total_seconds": total_seconds, "calls": calls,
+                      "callers": [split_symbol(caller)[0] for caller in callers]}
+
+  return {"routines": routines, "self_seconds": sum([routine["self_seconds"] for routine in routines.values()])}
+
+def write_csv(report, filename):
+  """write the routines of the report in a CSV file, the slowest first"""
+
+  f = open(filename, 'w')
+  f.write(",".join(CSV_COLUMNS) + "\n")
+  for (name, routine) in sorted(report["routines"].items(), key=lambda item: -item[1]["self_seconds"]):
+    values = dict(routine)
+    values["name"] = name
+    f.write(",".join(["" if (values[column] == None) else str(values[column]) for column in CSV_COLUMNS]) + "\n")
+  f.close()
+
+def compare_reports(report, reference):
+  """print the time spent in the slowest routines of report and reference. Routines whose self time
+  increased more than 'threshold' percents are marked as regressions.
+
+  Return : the list of the routines that regressed
+  """
+
+  # Differences below two sampling intervals of gprof are noise
+  resolution = 0.02
+
+  names = set(report["routines"].keys()) | set(reference["routines"].keys())
+  empty = {"self_seconds": 0., "self_percent": 0.}
+  rows = []
+  regressions = []
+  for name in names:
+    new = report["routines"].get(name, empty)
+    old = reference["routines"].get(name, empty)
+    difference = new["self_seconds"] - old["self_seconds"]
+    if (old["self_seconds"] > 0):
+      relative = 100. * difference / old["self_seconds"]
+    elif (new["self_seconds"] > 0):
+      relative = float("inf")
+    else:
+      relative = 0.
+
+    isRegression = (relative > threshold and difference > resolution)
+    if isRegression:
+      regressions.append(name)
+    rows.append((max(new["self_seconds"], old["self_seconds"]), name, old, new, relative, isRegression))
+
+  rows.sort(reverse=True)
+
+  print("%-30s %12s %12s %9s" % ("routine", "baseline (s)", "new (s)", "change"))
+  for (dummy, name, old, new, relative, isRegression) in rows[:nb_routines]:
+    line = "%-30s %6.2f %4.1f%% %6.2f %4.1f%% %+8.1f%%" % (name, old["self_seconds"], old["self_percent"],
+                                                           new["self_seconds"], new["self_percent"], relative)
+    if isRegression:
+      line += " <- regression"
+    print(line)
+  print("%-30s %12.2f %12.2f" % ("total", reference["self_seconds"], report["self_seconds"]))
+
+  return regressions
+
+#    .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
+#  .'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `.
+# (    .     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .    )
+#  `.   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   .'
+#    )    )                                                       (    (
+#  ,'   ,'                                                         `.   `.
+# (    (                     DEBUT DU PROGRAMME                     )    )
+#  `.   `.                                                         .'   .'
+#    )    )                                                       (    (
+#  ,'   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   `.
+# (    '  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `-'  _  `    )
+#  `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .' `.   .'
+#    `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'     `-'
+
+if isCompile:
+  compilation = [sys.executable, "Makefile.py", "profiling", "mercury", "noinstall"]
+  print(" ".join(compilation[1:]))
+  (stdout, stderr, returnCode) = run(compilation)
+  if (returnCode != 0):
+    print(stdout)
+    print(stderr)
+    sys.exit(1)
+
+binary = os.path.abspath(os.path.join(BUILD_FOLDER, PROGRAM_NAME))
+if not(os.path.isfile(binary)):
+  print("'%s' does not exist, compile it with 'Makefile.py profiling'" % binary)
+  sys.exit(1)
+
+if not(os.path.isfile(os.path.join(folder, "param.in"))):
+  print("'%s' is not a simulation folder (no param.in)" % folder)
+  sys.exit(1)
+
+# The simulation is run from scratch in its own folder, so that the outputs of a previous run are not used
+if os.path.isdir(RUN_FOLDER):
+  shutil.rmtree(RUN_FOLDER)
+os.makedirs(RUN_FOLDER)
+
+for pattern in SIMULATION_FILES:
+  for filename in glob.glob(pattern) + glob.glob(os.path.join(folder, pattern)):
+    shutil.copy(filename, RUN_FOLDER)
+
+print("Running %s in %s..." % (folder, RUN_FOLDER))
+start = time.time()
+(stdout, stderr, returnCode) = run([binary], cwd=RUN_FOLDER)
+duration = time.time() - start
+
+if (returnCode != 0 or not(os.path.isfile(os.path.join(RUN_FOLDER, "gmon.out")))):
+  print("The simulation failed (return code %d), see %s" % (returnCode, RUN_FOLDER))
+  print(stderr)
+  sys.exit(1)
+
+(gprof_output, stderr, returnCode) = run(["gprof", "-b", binary, "gmon.out"], cwd=RUN_FOLDER)
+if (returnCode != 0):
+  print(stderr)
+  sys.exit(1)
+
+# The raw output is kept, for details the report does not have
+f = open(os.path.join(RUN_FOLDER, "gprof.txt"), 'w')
+f.write(gprof_output)
+f.close()
+
+report = get_report(gprof_output)
+report["folder"] = folder
+report["duration"] = duration
+report["date"] = time.strftime("%Y-%m-%d %H:%M:%S")
+
+f = open("%s.json" % output, 'w')
+json.dump(report, f, indent=2, sort_keys=True)
+f.close()
+write_csv(report, "%s.csv" % output)
+print("Report written in %s.json and %s.csv (gprof output in %s)" % (output, output, os.path.join(RUN_FOLDER, "gprof.txt")))
+
+if (os.path.isfile(baseline) and not(isSave)):
+  f = open(baseline, 'r')
+  reference = json.load(f)
+  f.close()
+
+  print("Comparison with %s (%s, %s) :" % (baseline, reference["folder"], reference["date"]))
+  regressions = compare_reports(report, reference)
+  if (regressions != []):
+    print("Slower routines : %s" % ", ".join(regressions))
+else:
+  # Without baseline, we only display the slowest routines
+  for (name, routine) in sorted(report["routines"].items(), key=lambda item: -item[1]["self_seconds"])[:nb_routines]:
+    print("%-30s %6.2f s %5.1f%% (with children %6.2f s)" % (name, routine["self_seconds"], routine["self_percent"], routine["total_seconds"]))
+
+if isSave:
+  shutil.copy("%s.json" % output, baseline)
+  print("%s.json saved as the baseline (%s)" % (output, baseline))
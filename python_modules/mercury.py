@@ -859,6 +859,7 @@ class Param(object):
   time_format = "years" : sous quel format est écrit le temps (years, days)
   relative_time = "yes" : (yes/no) est-ce que le temps au cours de la simulation doit être exprimé avec pour référence le début de la simulation (yes) ou pas (dans le cas où la date a une signification dans la simulation)
   output_precision = "high" : (low, medium, high) for the precision we want for the outputs (4, 9, 15)
+  binary_output = "no" : (yes/no) if we want binary snapshots at full precision in xv.bin, in addition to xv.out (see mercury_outputs.Snapshots)
   relativity = "no" : (yes/no) if we want to include relativity (currently not implemented)
   user_force = "no" : (yes/no) if we want to take into account the user-defined force put in the associated sub-routine
   ejection_distance = 1000 : (in au) distance from the star where objets will be treated as ejected (and then erased for the next timestep)
@@ -898,7 +899,7 @@ class Param(object):
   
   def __init__(self, algorithme, start_time, stop_time, h, accuracy=1.e-12, 
   stop_integration="no", collisions="yes", fragmentation="no", time_format="years", 
-  relative_time="yes", output_precision="high", relativity="no", user_force="no", 
+  relative_time="yes", output_precision="high", binary_output="no", relativity="no", user_force="no", 
   ejection_distance=1000, radius_star=0.005, central_mass=1.0, J2=0, J4=0, J6=0, 
   changeover=3., periodic_effect=100, data_dump=500, output_interval=365.25):
     """initialise the class and store the datas
@@ -917,6 +918,7 @@ class Param(object):
     self.time_format = time_format
     self.relative_time = relative_time
     self.output_precision = output_precision
+    self.binary_output = binary_output
     self.relativity = relativity
     self.user_force = user_force
     self.ejection_distance = ejection_distance
@@ -1024,30 +1026,37 @@ class Param(object):
         tmp = tmp.split()[0] # we take of extra spaces before and after
         parameters.append(tmp) # we take the last element [-1] of the split, but without the last caracter (which is '\n')
     
+    # Fortran exponents (e.g. 365.25d2) are not understood by float()
+    to_float = lambda value: float(value.replace("D", "E").replace("d", "e"))
+    
     self.algorithme = parameters[0]
-    self.start_time = float(parameters[1])
-    self.stop_time = float(parameters[2])
-    self.output_interval = float(parameters[3])
-    self.h = float(parameters[4])
-    self.accuracy = float(parameters[5])
+    self.start_time = to_float(parameters[1])
+    self.stop_time = to_float(parameters[2])
+    self.output_interval = to_float(parameters[3])
+    self.h = to_float(parameters[4])
+    self.accuracy = to_float(parameters[5])
     self.stop_integration = parameters[6]
     self.collisions = parameters[7]
     self.fragmentation = parameters[8]
     self.time_format = parameters[9]
     self.relative_time = parameters[10]
     self.output_precision = parameters[11]
-    # Not used
+    # Line "< not used at present >" in param.in files older than this option
+    if parameters[12].lower().startswith("y"):
+      self.binary_output = "yes"
+    else:
+      self.binary_output = "no"
     self.relativity = parameters[13]
     self.user_force = parameters[14]
-    self.ejection_distance = float(parameters[15])
-    self.radius_star = float(parameters[16])
-    self.central_mass = float(parameters[17])
-    self.J2 = float(parameters[18])
-    self.J4 = float(parameters[19])
-    self.J6 = float(parameters[20])
+    self.ejection_distance = to_float(parameters[15])
+    self.radius_star = to_float(parameters[16])
+    self.central_mass = to_float(parameters[17])
+    self.J2 = to_float(parameters[18])
+    self.J4 = to_float(parameters[19])
+    self.J6 = to_float(parameters[20])
     # Not used
     # Not used
-    self.changeover = float(parameters[23])
+    self.changeover = to_float(parameters[23])
     self.data_dump = int(parameters[24])
     self.periodic_effect = int(parameters[25])
     
@@ -1074,7 +1083,7 @@ class Param(object):
     param.write(" express time in days or years = "+self.time_format+"\n")
     param.write(" express time relative to integration start time = "+self.relative_time+"\n")
     param.write(" output precision = "+self.output_precision+"\n")
-    param.write(" < not used at present >\n")
+    param.write(" binary output (xv.bin) = "+self.binary_output+"\n")
     param.write(" include relativity in integration = "+self.relativity+"\n")
     param.write(" include user-defined force = "+self.user_force+"\n")
     param.write(Param.PARAM_PAR)
@@ -1307,7 +1316,7 @@ class Message(object):
 169 33  express time in days or years = 
 170 51  express time relative to integration start time = 
 171 20  output precision = 
-172 24  < Not used at present > 
+172 26  binary output (xv.bin) = 
 173 37  include relativity in integration = 
 174 30  include user-defined force = 
 175 52 ) These parameters do not need to be adjusted often:
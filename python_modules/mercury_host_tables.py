@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module to read and write the tables of the evolution of brown dwarfs used by the user module (read_BD_tables in
+user_module.f90) : the index of the available masses (tablesBD.dat), the tables of the radius (mass_xx.xxxx.dat) and
+of the radius of gyration (rg2BD.dat). Tables for intermediate masses can be interpolated between the two masses
+around, the same way read_BD_tables does it when no table exists for the mass of the brown dwarf."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import os
+import numpy as np
+
+INDEX_FILE = "tablesBD.dat" # BD_INDEX_FILE of user_module.f90
+NB_RG2 = 37 # Number of rows of the tables of the radius of gyration (NB_RG2 of user_module.f90)
+MASS_TOLERANCE = 0.01 # Relative difference below which a table is used for a mass, as in read_BD_tables
+
+class TableEntry(object):
+  """One line of the index of the brown dwarf tables
+
+  Attributes :
+  self.mass : mass of the brown dwarf (Msun)
+  self.radius_file, self.nb_rows : table of the radius and its number of rows
+  self.rg2_file, self.column : table of the radius of gyration, and column (starting at 1) of the brown dwarf in it
+  self.k2 : love number
+  self.Ps0 : initial rotation period (hours)
+  """
+
+  def __init__(self, mass, radius_file, nb_rows, rg2_file, column, k2, Ps0):
+    self.mass = float(mass)
+    self.radius_file = radius_file
+    self.nb_rows = int(nb_rows)
+    self.rg2_file = rg2_file
+    self.column = int(column)
+    self.k2 = float(k2)
+    self.Ps0 = float(Ps0)
+
+  def __str__(self):
+    return "%-6s %s %5d %s %2d %.6g %.6g" % (repr(self.mass), self.radius_file, self.nb_rows, self.rg2_file,
+                                            self.column, self.k2, self.Ps0)
+
+def get_radius_filename(mass):
+  """return the name of the table of the radius for a mass (Msun), in the convention of the existing tables (the mass
+  in thousandths of solar mass, i.e. roughly in Jupiter mass)"""
+
+  return "mass_%07.4f.dat" % (mass * 1000.)
+
+def read_index(folder="."):
+  """return the list of TableEntry of the index of the folder, sorted by mass"""
+
+  entries = []
+  f = open(os.path.join(folder, INDEX_FILE), 'r')
+  for line in f:
+    line = line.strip()
+    if (line == "" or line.startswith("!")):
+      continue
+    entries.append(TableEntry(*line.split()[:7]))
+  f.close()
+
+  entries.sort(key=lambda entry: entry.mass)
+
+  return entries
+
+def append_index(entry, folder="."):
+  """add a line to the index of the folder"""
+
+  f = open(os.path.join(folder, INDEX_FILE), 'a')
+  f.write("%s\n" % entry)
+  f.close()
+
+def read_radius_table(entry, folder="."):
+  """return the table of the radius of an entry of the index, as a 2D array (one row per time). The first column is
+  the time (years), the second the radius (Rsun). The other ones (luminosity and limits of the habitable zone) are not
+  used by mercury"""
+
+  return np.loadtxt(os.path.join(folder, entry.radius_file), ndmin=2)[:entry.nb_rows]
+
+def read_rg2_table(entry, folder="."):
+  """return a tuple (times (years), radius of gyration) of an entry of the index"""
+
+  table = np.loadtxt(os.path.join(folder, entry.rg2_file), ndmin=2)[:NB_RG2]
+
+  return (table[:, 0], table[:, entry.column - 1])
+
+def spline_b_val(tdata, ydata, tval):
+  """Vectorized version of spline_b_val (spline.f90) : B spline approximation of the data (tdata, ydata) at the times
+  tval, with the same phantom nodes at both ends"""
+
+  tdata = np.asarray(tdata, dtype=np.float64)
+  ydata = np.asarray(ydata, dtype=np.float64)
+  tval = np.asarray(tval, dtype=np.float64)
+  ndata = len(tdata)
+
+  # Same interval as rvec_bracket : the first one below tdata[1], the last one above tdata[-2]
+  left = np.searchsorted(tdata[1:ndata-1], tval, side='right')
+  right = left + 1
+
+  # Data extended with the phantom nodes, shifted by one
+  extended = np.concatenate([[2. * ydata[0] - ydata[1]], ydata, [2. * ydata[-1] - ydata[-2]]])
+
+  u = (tval - tdata[left]) / (tdata[right] - tdata[left])
+  yval = extended[left] * (1. - 3. * u + 3. * u**2 - u**3) / 6.
+  yval += extended[left + 1] * (4. - 6. * u**2 + 3. * u**3) / 6.
+  yval += extended[right + 1] * (1. + 3. * u + 3. * u**2 - 3. * u**3) / 6.
+  yval += extended[right + 2] * u**3 / 6.
+
+  return yval
+
+def get_bounds(entries, mass):
+  """return the entries used for a mass (Msun), as in read_BD_tables : a tuple (entry, None) if there is a table for
+  this mass, else the tuple (lower entry, upper entry) of the two masses around
+
+  Raise a ValueError if the mass is outside the masses of the index
+  """
+
+  for entry in entries:
+    if (abs(entry.mass - mass) <= MASS_TOLERANCE * entry.mass):
+      return (entry, None)
+
+  lower = [entry for entry in entries if (entry.mass < mass)]
+  upper = [entry for entry in entries if (entry.mass > mass)]
+  if (lower == [] or upper == []):
+    raise ValueError("The mass %g Msun is outside the masses of %s (%g to %g Msun)" % (mass, INDEX_FILE,
+                     entries[0].mass, entries[-1].mass))
+
+  return (lower[-1], upper[0])
+
+def interpolate(mass, lower, upper, folder="."):
+  """interpolate linearly in mass the tables of two entries of the index, on the time grid of the lower mass (only
+  the times that are also in the table of the upper mass are kept). All the columns of the table of the radius are
+  interpolated.
+
+  Return : a tuple (radius table, rg2 times, rg2, k2, Ps0)
+  """
+
+  weight = (mass - lower.mass) / (upper.mass - lower.mass)
+
+  table_low = read_radius_table(lower, folder)
+  table_up = read_radius_table(upper, folder)
+  times = table_low[:, 0]
+  isInside = (times >= table_up[0, 0]) & (times <= table_up[-1, 0])
+  times = times[isInside]
+
+  table = np.empty((len(times), table_low.shape[1]))
+  table[:, 0] = times
+  for column in range(1, table.shape[1]):
+    values_up = spline_b_val(table_up[:, 0], table_up[:, column], times)
+    table[:, column] = (1. - weight) * table_low[isInside, column] + weight * values_up
+
+  (rg2_times, rg2_low) = read_rg2_table(lower, folder)
+  (rg2_times_up, rg2_up) = read_rg2_table(upper, folder)
+  if not(np.array_equal(rg2_times, rg2_times_up)):
+    raise ValueError("The radius of gyration of %s and %s are not given at the same times" % (lower.rg2_file, upper.rg2_file))
+  rg2 = (1. - weight) * rg2_low + weight * rg2_up
+
+  k2 = (1. - weight) * lower.k2 + weight * upper.k2
+  Ps0 = (1. - weight) * lower.Ps0 + weight * upper.Ps0
+
+  return (table, rg2_times, rg2, k2, Ps0)
+
+def generate_table(mass, folder="."):
+  """write the tables of a brown dwarf of an intermediate mass (Msun), interpolated between the two masses around, and
+  add it to the index of the folder. The radius of gyration is written in its own table (rg2BD_xx.xxxx.dat, time in the
+  first column, the brown dwarf in the second).
+
+  Return : the new TableEntry, or the existing one if there is already a table for this mass
+  """
+
+  entries = read_index(folder)
+  (lower, upper) = get_bounds(entries, mass)
+  if (upper == None):
+    return lower
+
+  (table, rg2_times, rg2, k2, Ps0) = interpolate(mass, lower, upper, folder)
+
+  radius_file = get_radius_filename(mass)
+  rg2_file = "rg2BD_%s" % radius_file[len("mass_"):]
+  np.savetxt(os.path.join(folder, radius_file), table, fmt="%.6e", delimiter="    ")
+  np.savetxt(os.path.join(folder, rg2_file), np.column_stack([rg2_times, rg2]), fmt="%.6e", delimiter="    ")
+
+  entry = TableEntry(mass, radius_file, len(table), rg2_file, 2, k2, Ps0)
+  append_index(entry, folder)
+
+  return entry
@@ -0,0 +1,617 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module that help to follow running mercury simulations without re-reading every output file each time we look at them.
+It defines incremental readers for the files written by mercury while it runs (big.tmp, big.dmp, xv.out, info.out, ...) and
+a watchdog that stop a simulation as soon as it diverges (NaN, Inf or energy error above a threshold)."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import os
+import re
+import glob
+import signal
+import subprocess
+import time as _time
+import mercury
+
+# Name of the file created in a simulation folder when the watchdog stopped the simulation.
+# mercury-check-simulation.py consider such folders the same way as the one with NaN (i.e they can be restarted)
+FAILED_FILENAME = "watchdog.failed"
+
+# Default threshold for the relative energy error dE/E above which the simulation is considered as diverged
+ENERGY_THRESHOLD = 1e-2
+
+# Name of the file where we store the progress of a simulation (one sample per data dump seen)
+HISTORY_FILENAME = "progress.history"
+
+# The speed of the integration is an exponential moving average over the RATE_SAMPLES last samples, with a weight
+# RATE_SMOOTHING for the newest one. Intervals GAP_FACTOR times longer than the median are
+# considered as the time spent waiting in the queue between two jobs, and skipped.
+RATE_SAMPLES = 20
+RATE_SMOOTHING = 0.3
+GAP_FACTOR = 5.
+
+# Files that are rewritten entirely at each data dump, and files where mercury only append data
+REWRITTEN_FILES = ["big.tmp", "big.dmp"]
+APPENDED_FILES = ["info.out"]
+
+# Messages written in info.out by mercury at the end of the integration, and when it continues from the dump files
+FINISHED_MESSAGE = "Integration complete"
+CONTINUE_MESSAGE = "Continuing integration"
+
+NAN_PATTERN = re.compile(r"\b(NaN|-?Infinity|-?Inf)\b", re.IGNORECASE)
+ENERGY_PATTERN = re.compile(r"(?:dE/E:|Fractional energy change due to integrator:)\s*([-+0-9.EeDd]+|NaN|-?Infinity)")
+
+class TailReader(object):
+  """Class that read a file incrementally. Each call to read() only return what has been written in the file since the previous call.
+
+  Mercury write some files by appending data (info.out, xv.out) and rewrite some others completely at each dump (big.tmp, big.dmp).
+  For the latter, use rewritten=True : the file will be read again entirely, but only if it changed since the last call.
+
+  Parameters :
+  filename : the name of the file to follow
+  rewritten=False : True if the file is rewritten from the start each time it is modified
+
+  Attributes :
+  self.offset : the position (in bytes) up to which the file has already been read
+  self.signature : (inode, size, mtime) of the file at the last read, to detect modifications
+  """
+
+  def __init__(self, filename, rewritten=False):
+    """initialisation of the class"""
+
+    self.filename = filename
+    self.rewritten = rewritten
+
+    self.offset = 0
+    self.signature = None
+
+    # We keep the end of the last line if it was not complete, to avoid splitting a line in two reads
+    self.remainder = b""
+
+  def read(self):
+    """return the new content of the file since the last call, as a string (the file is decoded in latin-1
+    because xv.out can contain any character between 32 and 255). An empty string is returned if
+    nothing changed or if the file does not exist."""
+
+    try:
+      stat = os.stat(self.filename)
+    except OSError:
+      return ""
+
+    signature = (stat.st_ino, stat.st_size, stat.st_mtime)
+    if (signature == self.signature):
+      return ""
+
+    # If the file is rewritten, or has been replaced by a smaller file (restart of the simulation), we start from the beginning
+    if (self.rewritten or (self.signature is not None and stat.st_ino != self.signature[0]) or stat.st_size < self.offset):
+      self.offset = 0
+      self.remainder = b""
+
+    object_file = open(self.filename, 'rb')
+    object_file.seek(self.offset)
+    data = object_file.read()
+    object_file.close()
+
+    self.offset += len(data)
+    self.signature = signature
+
+    if self.rewritten:
+      return data.decode("latin-1")
+
+    # We only return complete lines, the rest will be returned at the next call.
+    data = self.remainder + data
+    last_newline = data.rfind(b"\n")
+    self.remainder = data[last_newline+1:]
+
+    return data[:last_newline+1].decode("latin-1")
+
+  def reset(self):
+    """force the next read() to start from the beginning of the file"""
+
+    self.offset = 0
+    self.signature = None
+    self.remainder = b""
+
+def has_NaN(text):
+  """return True if the string in parameter (typically the content of an ASCII output of mercury) contains NaN or Inf values"""
+
+  return (NAN_PATTERN.search(text) is not None)
+
+def xv_has_NaN(text):
+  """return True if one of the records of the compressed xv.out content given in parameter has a NaN position.
+
+  Positions are encoded by mio_re2c in xv.out. NaN values can't be encoded and let the field empty (only spaces),
+  while the first variable (log of the radial distance) is always strictly positive for a body that is still alive.
+
+  Parameter :
+  text : The content of xv.out (or a part of it, as long as it contains complete lines)
+  """
+
+  isRecord = False
+  for line in text.split("\n"):
+    # Line that start a normal output. Each of the following lines are bodies until the next header
+    if line.startswith("\x0c6"):
+      isRecord = line.startswith("\x0c6b")
+      continue
+
+    if not(isRecord):
+      continue
+
+    # Each record is 3 characters (index of the body) followed by 6 variables of 'nchar' characters
+    nchar = (len(line) - 3) // 6
+    if (nchar in (2, 4, 7)):
+      if (line[3:3+nchar].strip() == ""):
+        return True
+
+  return False
+
+def get_energy_errors(text):
+  """return the list of relative energy errors (dE/E) found in the string given in parameter. We search for the
+  lines written by mio_log (during the integration) and at the end of the integration in info.out.
+  Values that can't be read (NaN) are returned as float('nan')."""
+
+  errors = []
+  for value in ENERGY_PATTERN.findall(text):
+    try:
+      errors.append(float(value.replace("D", "E").replace("d", "e")))
+    except ValueError:
+      errors.append(float('nan'))
+
+  return errors
+
+def get_job_outputs(folder="."):
+  """return the list of files where the job scheduler store the standard output of mercury
+  (for instance simulation.sh.o123456), sorted by job ID"""
+
+  outputs = glob.glob(os.path.join(folder, "*.o[0-9]*"))
+
+  job_outputs = []
+  for output in outputs:
+    try:
+      job_outputs.append((int(output.split(".o")[-1]), output))
+    except ValueError:
+      pass
+  job_outputs.sort()
+
+  return [output for (jobID, output) in job_outputs]
+
+def find_mercury_process(folder, binary_name="mercury"):
+  """return the list of PID of the 'mercury' processes running in the folder given in parameter.
+  This only works on Linux (where /proc exists) and for processes launched on the current machine."""
+
+  folder = os.path.realpath(folder)
+
+  pids = []
+  if not(os.path.isdir("/proc")):
+    return pids
+
+  for pid in os.listdir("/proc"):
+    if not(pid.isdigit()):
+      continue
+    try:
+      cwd = os.readlink(os.path.join("/proc", pid, "cwd"))
+      exe = os.readlink(os.path.join("/proc", pid, "exe"))
+    except OSError:
+      # The process ended, or belong to someone else
+      continue
+
+    if (cwd == folder and os.path.basename(exe) == binary_name):
+      pids.append(int(pid))
+
+  return pids
+
+def mark_failed(folder, reason):
+  """Create the file FAILED_FILENAME in the given folder, with the reason why the simulation has been stopped"""
+
+  object_file = open(os.path.join(folder, FAILED_FILENAME), 'w')
+  object_file.write("%s\n" % reason)
+  object_file.close()
+
+def is_failed(folder="."):
+  """return True if the simulation in the folder has been stopped by the watchdog"""
+
+  return os.path.isfile(os.path.join(folder, FAILED_FILENAME))
+
+class Watchdog(object):
+  """Class that follow one simulation folder and decide if the simulation diverged. Files are read incrementally
+  so that the same object can be checked regularly at a small cost, even for big xv.out files.
+
+  Parameters :
+  folder : the simulation folder
+  threshold=ENERGY_THRESHOLD : above this relative energy error (in absolute value), the simulation is considered as diverged
+
+  Methods :
+  .check() : return None if everything is fine, or a string explaining the problem
+  .stop(reason) : kill the mercury process (or delete the job) and mark the folder as failed
+  """
+
+  def __init__(self, folder, threshold=ENERGY_THRESHOLD):
+    """initialisation of the class"""
+
+    self.folder = folder
+    self.threshold = threshold
+
+    self.dumps = [TailReader(os.path.join(folder, filename), rewritten=True) for filename in REWRITTEN_FILES]
+    self.logs = [TailReader(os.path.join(folder, filename)) for filename in APPENDED_FILES]
+    self.xv = TailReader(os.path.join(folder, "xv.out"))
+
+    # The job output file can change if the simulation is continued, so we only store the reader of the current one
+    self.job_output = None
+
+    self.energy_error = None # the last relative energy error read
+    self.reason = None # the last problem found
+    self.isFinished = False # True if the end of info.out says that the integration is complete
+
+  def __update_job_output(self):
+    """check if there is a new job output file where mio_log write dE/E"""
+
+    outputs = get_job_outputs(self.folder)
+    if (outputs == []):
+      return
+
+    if (self.job_output is None or self.job_output.filename != outputs[-1]):
+      self.job_output = TailReader(outputs[-1])
+
+  def check(self):
+    """read what changed in the simulation files since the last call and return None if everything is fine.
+    Else, return a string that explain why the simulation diverged."""
+
+    for reader in self.dumps:
+      if has_NaN(reader.read()):
+        self.reason = "NaN or Inf in %s" % os.path.basename(reader.filename)
+        return self.reason
+
+    if xv_has_NaN(self.xv.read()):
+      self.reason = "NaN in xv.out"
+      return self.reason
+
+    self.__update_job_output()
+    logs = list(self.logs)
+    if (self.job_output is not None):
+      logs.append(self.job_output)
+
+    for reader in logs:
+      text = reader.read()
+
+      if (reader in self.logs):
+        # The integration is only finished if it was not continued since the last 'Integration complete'
+        if (text.rfind(FINISHED_MESSAGE) > text.rfind(CONTINUE_MESSAGE)):
+          self.isFinished = True
+        elif (CONTINUE_MESSAGE in text):
+          self.isFinished = False
+
+      errors = get_energy_errors(text)
+      if (errors == []):
+        continue
+
+      self.energy_error = errors[-1]
+      # The test is written that way so that NaN values also fail
+      if not(abs(self.energy_error) <= self.threshold):
+        self.reason = "dE/E = %g above threshold %g in %s" % (self.energy_error, self.threshold, os.path.basename(reader.filename))
+        return self.reason
+
+    return None
+
+  def stop(self, reason):
+    """Stop the simulation and mark the folder as failed.
+
+    We first kill the mercury processes running in the folder on this machine. If there is none,
+    we try to delete the job whose ID is in the name of the last job output file (qdel)
+
+    Return : the list of PID or job IDs that have been stopped
+    """
+
+    stopped = []
+    for pid in find_mercury_process(self.folder):
+      try:
+        os.kill(pid, signal.SIGTERM)
+        stopped.append(pid)
+      except OSError:
+        pass
+
+    if (stopped == []):
+      outputs = get_job_outputs(self.folder)
+      if (outputs != []):
+        jobID = int(outputs[-1].split(".o")[-1])
+        process = subprocess.Popen("qdel %d" % jobID, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        process.communicate()
+        if (process.poll() == 0):
+          stopped.append(jobID)
+
+    mark_failed(self.folder, reason)
+
+    return stopped
+
+def read_dump(folder="."):
+  """return a tuple (time, nb_bodies) read from the big.dmp of the simulation folder, with the time in days.
+  Return None if big.dmp does not exist (yet)."""
+
+  filename = os.path.join(folder, "big.dmp")
+  if not(os.path.isfile(filename)):
+    return None
+
+  object_file = open(filename, 'r')
+  lines = object_file.readlines()
+  object_file.close()
+
+  time = None
+  nb_bodies = 0
+  for line in lines:
+    if ("epoch" in line and "=" in line):
+      time = float(line.split("=")[1])
+    elif ("m=" in line):
+      nb_bodies += 1
+
+  if (time == None):
+    return None
+
+  return (time, nb_bodies)
+
+def read_parameters(folder="."):
+  """return the mercury.Param object of the simulation. param.dmp is read if it exists (continued simulation), param.in otherwise"""
+
+  filename = os.path.join(folder, "param.dmp")
+  if not(os.path.isfile(filename)):
+    filename = os.path.join(folder, "param.in")
+
+  paramin = mercury.Param(algorithme="HYBRID", start_time=0, stop_time=0, h=0)
+  paramin.read(filename=filename)
+
+  return paramin
+
+def read_stop_time(folder="."):
+  """return the stop time (in days) of the simulation"""
+
+  return read_parameters(folder).get_stop_time()
+
+class ProgressHistory(object):
+  """Class that store the progress of a simulation in a small file of the simulation folder (HISTORY_FILENAME).
+
+  Each sample is (wall clock, simulated time, number of big bodies). The wall clock is the modification time of big.dmp,
+  that is, the moment when the dump was written, and not the moment when we looked at it. Thus two samples
+  at two different dumps are enough to get the speed of the integration, no matter when they were recorded.
+
+  Parameters :
+  folder="." : the simulation folder
+  isReadOnly=False : if True, the history file is only read once, new samples are only kept in memory
+
+  Methods :
+  .record() : add a sample if there was a new dump since the last one
+  .get_rate() : return the integration speed in simulated days per wall second
+  .get_remaining_walltime() : return an estimation of the wall time (in seconds) needed to finish the simulation
+  """
+
+  def __init__(self, folder=".", isReadOnly=False):
+    """initialisation of the class"""
+
+    self.folder = folder
+    self.filename = os.path.join(folder, HISTORY_FILENAME)
+    self.isReadOnly = isReadOnly
+
+    self.samples = []
+    self.load()
+
+  def load(self):
+    """read the samples stored in the history file, if any"""
+
+    self.samples = []
+    if not(os.path.isfile(self.filename)):
+      return
+
+    object_file = open(self.filename, 'r')
+    for line in object_file:
+      words = line.split()
+      if (len(words) == 3 and not(line.startswith("#"))):
+        self.samples.append((float(words[0]), float(words[1]), int(words[2])))
+    object_file.close()
+
+  def record(self):
+    """read big.dmp and store a new sample if the dump changed since the last sample.
+
+    Return : the last sample, or None if the simulation didn't write any dump so far"""
+
+    try:
+      wall_clock = os.path.getmtime(os.path.join(self.folder, "big.dmp"))
+    except OSError:
+      return None
+
+    # big.dmp is only read again if it changed since the last sample (the history file stores 3 decimals)
+    if (self.samples != [] and abs(wall_clock - self.samples[-1][0]) < 1e-3):
+      return self.samples[-1]
+
+    dump = read_dump(self.folder)
+    if (dump == None):
+      return None
+
+    (time, nb_bodies) = dump
+
+    # A simulation that restarted from the beginning invalidates the previous samples
+    if (self.samples != [] and time < self.samples[-1][1]):
+      self.samples = []
+      if not(self.isReadOnly):
+        os.remove(self.filename)
+
+    if (self.samples == [] or wall_clock > self.samples[-1][0]):
+      sample = (wall_clock, time, nb_bodies)
+      self.samples.append(sample)
+
+      if self.isReadOnly:
+        return sample
+
+      isNew = not(os.path.isfile(self.filename))
+      object_file = open(self.filename, 'a')
+      if isNew:
+        object_file.write("# wall clock (s) ; simulated time (days) ; number of big bodies\n")
+      object_file.write("%.3f %.17e %d\n" % sample)
+      object_file.close()
+
+    return self.samples[-1]
+
+  def get_rate(self, nb_samples=RATE_SAMPLES, smoothing=RATE_SMOOTHING):
+    """return the speed of the integration in simulated days per wall second.
+
+    The speed between each couple of consecutive samples is smoothed with an exponential moving average,
+    so that the last dumps count more (the speed change with the number of bodies) without being too sensitive
+    to the load of the node.
+
+    Parameters :
+    nb_samples=RATE_SAMPLES : number of samples used (the most recent ones)
+    smoothing=RATE_SMOOTHING : weight of the newest speed in the moving average (1 means we only use the two last samples)
+
+    Return None if we don't have enough samples."""
+
+    samples = self.samples[-nb_samples:]
+
+    intervals = []
+    for ((wall_1, time_1, nb_1), (wall_2, time_2, nb_2)) in zip(samples[:-1], samples[1:]):
+      if (wall_2 > wall_1):
+        intervals.append((wall_2 - wall_1, time_2 - time_1))
+
+    if (intervals == []):
+      return None
+
+    # Lower median, so that with only two intervals, the shorter one is the reference
+    durations = sorted([duration for (duration, dt) in intervals])
+    median = durations[(len(durations) - 1) // 2]
+
+    rate = None
+    for (duration, dt) in intervals:
+      # Interval that include the time spent in the queue between two jobs
+      if (duration > GAP_FACTOR * median):
+        continue
+
+      if (rate == None):
+        rate = dt / duration
+      else:
+        rate = smoothing * dt / duration + (1. - smoothing) * rate
+
+    return rate
+
+  def get_dump_interval(self, nb_samples=RATE_SAMPLES):
+    """return the median wall time (in seconds) between two dumps, or None if we don't have enough samples"""
+
+    samples = self.samples[-nb_samples:]
+    durations = sorted([wall_2 - wall_1 for ((wall_1, time_1, nb_1), (wall_2, time_2, nb_2)) in zip(samples[:-1], samples[1:])])
+
+    if (durations == []):
+      return None
+
+    return durations[len(durations) // 2]
+
+  def get_remaining_walltime(self):
+    """return the estimated wall time (in seconds) needed to reach the stop time of the simulation,
+    or None if the speed of the integration can't be measured yet"""
+
+    rate = self.get_rate()
+    if (rate == None or rate == 0 or self.samples == []):
+      return None
+
+    remaining = (read_stop_time(self.folder) - self.samples[-1][1]) / rate
+
+    return max(remaining, 0.)
+
+  def get_eta(self):
+    """return the estimated wall clock (in seconds since the epoch, as time.time()) when the simulation will be finished,
+    or None if the speed of the integration can't be measured yet"""
+
+    remaining = self.get_remaining_walltime()
+    if (remaining == None):
+      return None
+
+    return self.samples[-1][0] + remaining
+
+class SimulationMetrics(object):
+  """Class that gather the metrics of one simulation folder (time, progress, number of bodies, energy error, speed and status)
+  for dashboards. The object must be kept between two refreshes : files are read incrementally
+  (through a Watchdog that never stops the simulation), and the progress history of the simulation is read once,
+  then completed in memory from big.dmp. Nothing is written in the simulation folder.
+
+  Parameters :
+  folder : the simulation folder
+  threshold=ENERGY_THRESHOLD : energy error above which the simulation is considered as diverged
+
+  The possible status are :
+  waiting : no dump so far
+  running : the last dump is recent
+  stopped : no dump since a long time (GAP_FACTOR times the usual interval between dumps), and the integration is not complete
+  finished : the integration is complete
+  diverged : NaN, Inf, or an energy error above the threshold
+  failed : stopped by the watchdog (see FAILED_FILENAME)
+  error : the simulation could not be read (set by mercury-metrics.py when .get() raises an exception)
+  """
+
+  STATUS = ["waiting", "running", "stopped", "finished", "diverged", "failed", "error"]
+
+  def __init__(self, folder, threshold=ENERGY_THRESHOLD):
+    """initialisation of the class"""
+
+    self.folder = folder
+    self.watchdog = Watchdog(folder, threshold=threshold)
+    self.history = ProgressHistory(folder, isReadOnly=True)
+
+    # The parameters are only read again if the parameter file changed
+    self.parameters = None
+    self.parameters_signature = None
+
+  def __update_parameters(self):
+    """read the integration parameters again if param.dmp (or param.in) changed since the last call"""
+
+    signature = []
+    for filename in ["param.dmp", "param.in"]:
+      try:
+        signature.append(os.path.getmtime(os.path.join(self.folder, filename)))
+      except OSError:
+        signature.append(None)
+
+    if (signature != self.parameters_signature):
+      self.parameters = read_parameters(self.folder)
+      self.parameters_signature = signature
+
+  def get(self):
+    """return a dictionnary with the current metrics of the simulation. Values that can't be computed yet are None.
+
+    Keys : simulation, time (years since the start), fraction (between 0 and 1), nb_bodies, energy_error,
+    steps_per_second, status
+    """
+
+    self.__update_parameters()
+    self.watchdog.check()
+
+    sample = self.history.record()
+
+    metrics = {"simulation": self.folder, "time": None, "fraction": None, "nb_bodies": None,
+               "energy_error": self.watchdog.energy_error, "steps_per_second": None}
+
+    start_time = self.parameters.get_start_time()
+    integration_time = self.parameters.get_stop_time() - start_time
+
+    if (sample != None):
+      (wall_clock, time, nb_bodies) = sample
+      metrics["time"] = (time - start_time) / 365.25
+      if (integration_time != 0):
+        metrics["fraction"] = (time - start_time) / integration_time
+      metrics["nb_bodies"] = nb_bodies
+
+    rate = self.history.get_rate()
+    if (rate != None and self.parameters.h != 0):
+      metrics["steps_per_second"] = abs(rate / self.parameters.h)
+
+    if is_failed(self.folder):
+      status = "failed"
+    elif (self.watchdog.reason != None):
+      status = "diverged"
+    elif self.watchdog.isFinished:
+      status = "finished"
+    elif (sample == None):
+      status = "waiting"
+    else:
+      interval = self.history.get_dump_interval()
+      if (interval != None and os.path.getmtime(os.path.join(self.folder, "big.dmp")) + GAP_FACTOR * interval < _time.time()):
+        status = "stopped"
+      else:
+        status = "running"
+    metrics["status"] = status
+
+    return metrics
@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module to read the compressed outputs of mercury (xv.out and ce.out) directly in python, without running element or close.
+Values are decoded with numpy, all the bodies of an output at once.
+
+The binary snapshots of xv.bin (full precision, when "binary output" is set in param.in) are mapped in memory.
+
+The outputs of the user module (spins, spinpi, horbi and dEdti) can also be read, in text (.out) or binary (.bin, when
+binary_output=1 in tides_constant_GR.f90) format."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import os
+import numpy as np
+
+PI = np.pi
+TWOPI = 2. * np.pi
+
+# Upper bound used by mercury to encode the indexes and numbers of bodies (see mio_out and mio_ce)
+INDEX_MAX = 11239424.
+
+# Names of the variables of each body in xv.out (see mco_x2ov), and of both bodies of each encounter in ce.out
+XV_VARIABLES = ["fr", "theta", "phi", "fv", "vtheta", "vphi"]
+CE_VARIABLES = ["%s_%s" % (variable, body) for body in ["i", "j"] for variable in XV_VARIABLES]
+
+# Number of characters of each variable in xv.out, for each output precision (low, medium, high) of param.in
+NCHAR = {1: 2, 2: 4, 3: 7}
+
+# Line types. Each one starts with a form feed
+FULL_HEADER = b"\x0c6a" # Parameters and list of the bodies (name, mass, spin, density)
+NORMAL_HEADER = b"\x0c6b" # Time and number of bodies (xv.out), or a close encounter (ce.out)
+
+# Binary snapshots (see mio_snapshot_header in mercury_outputs.f90)
+SNAPSHOT_MAGIC = b"MERCSNAP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<i4"), ("header_size", "<i4"), ("nb_frame_columns", "<i4"),
+                                  ("nb_body_columns", "<i4")])
+
+# Binary outputs of the user module (see open_tidal_file in user_module.f90)
+TIDAL_MAGIC = b"MERCTIDE"
+TIDAL_VERSION = 1
+TIDAL_HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<i4"), ("planet", "<i4"), ("nb_columns", "<i4"),
+                               ("header_size", "<i4")])
+
+# Columns of the text outputs of the user module, by prefix of the filename (the same as in the binary files)
+TIDAL_COLUMNS = {"spins": ["time", "spin_x", "spin_y", "spin_z", "radius", "rg2", "k2", "sigma"],
+                 "spinp": ["time", "spin_x", "spin_y", "spin_z", "radius", "rg2"],
+                 "horb": ["time", "horb_x", "horb_y", "horb_z"],
+                 "dEdt": ["time", "dEdt"]}
+
+def to_array(lines):
+  """return a 2D array (one line per row) of the ASCII codes of the list of lines given in parameter. All lines must
+  have the same length."""
+
+  return np.frombuffer(b"".join(lines), dtype=np.uint8).reshape(len(lines), -1).astype(np.float64)
+
+def c2re(codes, xmin, xmax):
+  """Vectorized version of mio_c2re. Converts the ASCII codes of the last dimension of the array in parameter (base 224 digits)
+  into a real number between xmin and xmax.
+
+  Parameters :
+  codes : an array whose last dimension is the characters of the encoded number
+  xmin, xmax : the range of the values (float or arrays that can be broadcast)
+
+  Return : an array with one dimension less than codes
+  """
+
+  nchar = codes.shape[-1]
+  weights = 224.**(-np.arange(1, nchar + 1))
+  y = np.dot(codes - 32., weights)
+
+  return xmin + y * (xmax - xmin)
+
+def c2fl(codes):
+  """Vectorized version of mio_c2fl. Converts the ASCII codes of the last dimension (8 characters) of the array in
+  parameter into a real number (7 characters for the mantissa, the 8th for the exponent)"""
+
+  x = c2re(codes[..., :7], 0., 1.) * 2. - 1.
+  ex = codes[..., 7] - 32. - 112.
+
+  return x * 10.**ex
+
+def c2index(codes):
+  """return the integers (index of a body, number of bodies) encoded on the 3 characters of the last dimension of the array"""
+
+  return (c2re(codes, 0., INDEX_MAX) + .5).astype(int)
+
+def re2c(values, xmin, xmax, nchar=8):
+  """Vectorized version of mio_re2c (the inverse of c2re). Converts real numbers between xmin and xmax into nchar
+  characters (base 224 digits). Values below xmin are spaces, values above xmax are char(255).
+
+  Return : an array of ASCII codes (uint8) with one more dimension (the nchar characters) than values
+  """
+
+  y = (np.asarray(values, dtype=np.float64) - xmin) / (xmax - xmin)
+  codes = np.empty(y.shape + (nchar,), dtype=np.uint8)
+
+  z = np.where(y > 0., y, 0.)
+  for j in range(nchar):
+    z = np.mod(z, 1.) * 224.
+    codes[..., j] = z.astype(int) + 32
+
+  codes[y <= 0.] = 32
+  codes[y >= 1.] = 255
+
+  return codes
+
+def fl2c(values):
+  """Vectorized version of mio_fl2c (the inverse of c2fl). Converts real numbers into 8 characters (7 for the mantissa,
+  the 8th for the exponent)
+
+  Return : an array of ASCII codes (uint8) with one more dimension (the 8 characters) than values
+  """
+
+  shape = np.shape(values)
+  x = np.atleast_1d(np.asarray(values, dtype=np.float64))
+  ax = np.abs(x)
+  isZero = (x == 0.)
+
+  # As in fortran, int() truncates toward 0
+  ex = np.trunc(np.log10(np.where(isZero, 1., ax))).astype(int)
+  ex[ax >= 1.] += 1
+  y = ax * 10.**(-ex)
+  isOne = (y == 1.)
+  y[isOne] *= .1
+  ex[isOne] += 1
+  y = np.where(x < 0., -y, y) * .5 + .5
+  y[isZero] = .5
+  ex[isZero] = 0
+
+  codes = re2c(y, 0., 1.)
+  codes[..., 7] = np.clip(ex + 112, 0, 223) + 32
+
+  return codes.reshape(shape + (8,))
+
+def index2c(indexes):
+  """return the ASCII codes of the 3 characters used to encode integers (index of a body, number of bodies)"""
+
+  return re2c(indexes, 0., INDEX_MAX - 0.01, nchar=3)
+
+def read_lines(filename):
+  """return the list of lines of a compressed output of mercury, as bytes (any character between 32 and 255 can appear)"""
+
+  f = open(filename, 'rb')
+  data = f.read()
+  f.close()
+
+  lines = data.split(b"\n")
+  if (lines[-1] == b""):
+    lines.pop()
+
+  return lines
+
+class Header(object):
+  """Parameters of the simulation and names of the bodies, as found in the last full header of xv.out or ce.out
+
+  Attributes :
+  self.rcen, self.rmax : radius of the central body and maximum distance (AU), used to decode the distances
+  self.nchar : number of characters of each variable in xv.out (2, 4 or 7, depending on the precision)
+  self.names : dictionnary {index: name} of the bodies (the index of the central body is 0)
+  """
+
+  def __init__(self, line, bodies):
+    """initialisation of the class, from the header line and the lines of the bodies that follow"""
+
+    codes = to_array([line[5:67]])[0]
+    self.rcen = c2fl(codes[46:54])
+    self.rmax = c2fl(codes[54:62])
+    self.nchar = NCHAR[int(line[67:68])]
+
+    self.names = {}
+    for body in bodies:
+      index = c2index(to_array([body[0:3]]))[0]
+      self.names[index] = body[3:11].decode("latin-1").strip()
+
+  def get_ranges(self):
+    """return the ranges (min, max) of the 6 variables of each body (see mco_x2ov)"""
+
+    rfac = np.log10(self.rmax / self.rcen)
+    xmin = np.zeros(6)
+    xmax = np.array([rfac, PI, TWOPI, 1., PI, TWOPI])
+
+    return (xmin, xmax)
+
+def iter_xv(filename="xv.out"):
+  """Generator that return, for each output of xv.out, a tuple (time, names, values) where names is the list
+  of the bodies of the output and values an array (one row per body) of the variables XV_VARIABLES.
+
+  The variables are the compressed ones, not cartesian coordinates : element does the conversion to orbital elements.
+  """
+
+  lines = read_lines(filename)
+
+  header = None
+  i = 0
+  while (i < len(lines)):
+    line = lines[i]
+    if line.startswith(FULL_HEADER):
+      # The list of bodies follow, until the next header
+      j = i + 1
+      while (j < len(lines) and not(lines[j].startswith(b"\x0c"))):
+        j += 1
+      header = Header(line, lines[i+1:j])
+      i = j
+    elif line.startswith(NORMAL_HEADER):
+      codes = to_array([line[3:17]])[0]
+      time = c2fl(codes[0:8])
+      nbodies = c2index(codes[8:11]) + c2index(codes[11:14])
+
+      bodies = lines[i+1:i+1+nbodies]
+      i += 1 + nbodies
+
+      if (nbodies == 0):
+        yield (time, [], np.zeros((0, 6)))
+        continue
+
+      nchar = header.nchar
+      codes = to_array([body[:3+6*nchar] for body in bodies])
+      indexes = c2index(codes[:, 0:3])
+      (xmin, xmax) = header.get_ranges()
+      values = c2re(codes[:, 3:].reshape(nbodies, 6, nchar), xmin, xmax)
+
+      yield (time, [header.names.get(index, str(index)) for index in indexes], values)
+    else:
+      i += 1
+
+def read_ce(filename="ce.out"):
+  """return all the close encounters of ce.out, as a tuple (times, names, distances, values) where names is the list of
+  (name_i, name_j) for each encounter, and values an array (one row per encounter) of the variables CE_VARIABLES"""
+
+  lines = read_lines(filename)
+
+  times = []
+  names = []
+  distances = []
+  values = []
+
+  header = None
+  i = 0
+  while (i < len(lines)):
+    line = lines[i]
+    if line.startswith(FULL_HEADER):
+      j = i + 1
+      while (j < len(lines) and not(lines[j].startswith(b"\x0c"))):
+        j += 1
+      header = Header(line, lines[i+1:j])
+      i = j
+      continue
+
+    # All the encounters until the next full header are decoded at once
+    j = i
+    while (j < len(lines) and lines[j].startswith(NORMAL_HEADER)):
+      j += 1
+
+    if (j == i):
+      i += 1
+      continue
+
+    codes = to_array([encounter[3:73] for encounter in lines[i:j]])
+    times.append(c2fl(codes[:, 0:8]))
+    distances.append(c2fl(codes[:, 14:22]))
+    for (index_i, index_j) in zip(c2index(codes[:, 8:11]), c2index(codes[:, 11:14])):
+      names.append((header.names.get(index_i, str(index_i)), header.names.get(index_j, str(index_j))))
+
+    (xmin, xmax) = header.get_ranges()
+    xmin = np.concatenate([xmin, xmin])
+    xmax = np.concatenate([xmax, xmax])
+    values.append(c2re(codes[:, 22:70].reshape(j - i, 12, 4), xmin, xmax))
+
+    i = j
+
+  if (times == []):
+    return (np.zeros(0), [], np.zeros(0), np.zeros((0, 12)))
+
+  return (np.concatenate(times), names, np.concatenate(distances), np.concatenate(values))
+
+class Snapshots(object):
+  """Binary snapshots of a simulation (xv.bin), mapped in memory. Each frame can be accessed directly by its index
+  (snapshots[i]), or all of them in order (for frame in snapshots).
+
+  Attributes :
+  self.frame_columns : names of the values at the start of each frame (time (days), nbig, nbod)
+  self.body_columns : names of the values of each body (id, m (solar masses), x, y, z (AU), vx, vy, vz (AU/day),
+  sx, sy, sz (solar masses AU^2/day), rho (g/cm^3)). id is the index of the body, as in xv.out
+  self.data : the whole file after the header, as a read-only np.memmap of float64
+  self.offsets : array of the position of each frame in self.data
+  """
+
+  def __init__(self, filename="xv.bin"):
+    """initialisation of the class. Only the time and number of bodies of each frame are read, to locate them. An
+    incomplete last frame (simulation stopped while writing it) is ignored."""
+
+    f = open(filename, 'rb')
+    header = np.frombuffer(f.read(SNAPSHOT_HEADER_DTYPE.itemsize), dtype=SNAPSHOT_HEADER_DTYPE)
+    if (len(header) == 0 or header["magic"][0] != SNAPSHOT_MAGIC):
+      f.close()
+      raise ValueError("%s is not a file of binary snapshots" % filename)
+    (magic, version, header_size, nb_frame_columns, nb_body_columns) = header[0]
+    if (version > SNAPSHOT_VERSION):
+      f.close()
+      raise ValueError("%s : version %d of the binary snapshots is not supported (%d at most)" % (filename, version, SNAPSHOT_VERSION))
+    self.frame_columns = [f.read(16).decode("latin-1").strip() for column in range(nb_frame_columns)]
+    self.body_columns = [f.read(16).decode("latin-1").strip() for column in range(nb_body_columns)]
+    f.close()
+
+    nb_values = (os.path.getsize(filename) - header_size) // 8
+    if (nb_values == 0):
+      self.data = np.zeros(0)
+    else:
+      self.data = np.memmap(filename, dtype="<f8", mode='r', offset=header_size, shape=(nb_values,))
+
+    nbod_index = self.frame_columns.index("nbod")
+    offsets = []
+    offset = 0
+    while (offset + nb_frame_columns <= nb_values):
+      nbod = int(self.data[offset + nbod_index])
+      size = nb_frame_columns + (nbod - 1) * nb_body_columns
+      if (offset + size > nb_values):
+        break
+      offsets.append(offset)
+      offset += size
+    self.offsets = np.array(offsets, dtype=int)
+
+  def __len__(self):
+    return len(self.offsets)
+
+  def __getitem__(self, index):
+    """return a tuple (time, nbig, nbod, values) of the frame, where values is an array (one row per body, the central
+    one excluded) of the variables of self.body_columns"""
+
+    offset = self.offsets[index]
+    nb_frame_columns = len(self.frame_columns)
+    (time, nbig, nbod) = self.data[offset:offset + nb_frame_columns]
+    nbod = int(nbod)
+    values = self.data[offset + nb_frame_columns:offset + nb_frame_columns + (nbod - 1) * len(self.body_columns)]
+
+    return (time, int(nbig), nbod, values.reshape(nbod - 1, len(self.body_columns)))
+
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self[index]
+
+  def get_times(self):
+    """return the array of the times (days) of the frames"""
+
+    return self.data[self.offsets + self.frame_columns.index("time")]
+
+class TidalOutput(object):
+  """One output file of the user module (spins, spinpi, horbi or dEdti)
+
+  Attributes :
+  self.columns : list of the names of the columns ("time" (years), "spin_x", ...)
+  self.planet : index of the planet (0 for the star)
+  self.data : 2D array (one row per output, one column per name of self.columns). For binary files, this is a
+  read-only np.memmap, nothing is read until the values are used
+  """
+
+  def __init__(self, columns, planet, data):
+    self.columns = columns
+    self.planet = planet
+    self.data = data
+
+  def __getitem__(self, column):
+    """return the values of a column, given by its name"""
+
+    return self.data[:, self.columns.index(column)]
+
+def read_tidal_header(filename):
+  """return a tuple (version, planet, columns, header size (bytes)) from the header of a binary output of the user
+  module. Raise a ValueError if the file is not one of them"""
+
+  f = open(filename, 'rb')
+  header = np.frombuffer(f.read(TIDAL_HEADER_DTYPE.itemsize), dtype=TIDAL_HEADER_DTYPE)
+  if (len(header) == 0 or header["magic"][0] != TIDAL_MAGIC):
+    f.close()
+    raise ValueError("%s is not a binary output of the user module" % filename)
+  (magic, version, planet, nb_columns, header_size) = header[0]
+  if (version > TIDAL_VERSION):
+    f.close()
+    raise ValueError("%s : version %d of the binary outputs is not supported (%d at most)" % (filename, version, TIDAL_VERSION))
+  columns = [f.read(16).decode("latin-1").strip() for column in range(nb_columns)]
+  f.close()
+
+  return (int(version), int(planet), columns, int(header_size))
+
+def read_tidal(filename):
+  """return a TidalOutput of an output of the user module. Binary files (.bin) are mapped in memory, text files
+  (.out) are read with np.loadtxt and their columns named from the prefix of their name (see TIDAL_COLUMNS).
+
+  The last output of a binary file is ignored if it is incomplete (simulation stopped while writing it).
+  """
+
+  if filename.endswith(".bin"):
+    (version, planet, columns, header_size) = read_tidal_header(filename)
+    nb_columns = len(columns)
+    nb_rows = (os.path.getsize(filename) - header_size) // (8 * nb_columns)
+    if (nb_rows == 0):
+      data = np.zeros((0, nb_columns))
+    else:
+      data = np.memmap(filename, dtype="<f8", mode='r', offset=header_size, shape=(nb_rows, nb_columns))
+    return TidalOutput(columns, planet, data)
+
+  name = os.path.splitext(os.path.basename(filename))[0]
+  prefix = name.rstrip("0123456789")
+  if not(prefix in TIDAL_COLUMNS):
+    raise ValueError("%s is not an output of the user module" % filename)
+  columns = TIDAL_COLUMNS[prefix]
+  if (prefix == "spins"):
+    planet = 0
+  else:
+    planet = int(name[len(prefix):])
+
+  return TidalOutput(columns, planet, np.loadtxt(filename, ndmin=2).reshape(-1, len(columns)))
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module that expand a parameter sweep (grid, Latin hypercube or Sobol design over keys of 'meta_simulation.in')
+into meta simulation folders. Each point of the design is a copy of a base 'meta_simulation.in' where the values of
+the swept keys are replaced. Points are identified by a hash of their parameter file, so that identical points
+are only integrated once, even across several runs of the sweep."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import os
+import random
+import hashlib
+import itertools
+from math import log10
+
+# Name of the file that define the sweep, and of the index file that list the points already created
+SWEEP_FILENAME = "sweep.in"
+INDEX_FILENAME = "sweep.index"
+
+# Prefix of the meta simulation folders created for each point
+FOLDER_PREFIX = "sweep_"
+
+DESIGNS = ["grid", "lhs", "sobol"]
+
+# Direction numbers of the Sobol sequence (Joe & Kuo 2008) for the dimensions 2 and more, as (s, a, [m_1, ..., m_s]).
+# The first dimension is the van der Corput sequence in base 2.
+SOBOL_DIRECTIONS = [(1, 0, [1]),
+                    (2, 1, [1, 3]),
+                    (3, 1, [1, 3, 1]),
+                    (3, 2, [1, 1, 1]),
+                    (4, 1, [1, 1, 3, 3]),
+                    (4, 4, [1, 3, 5, 13]),
+                    (5, 2, [1, 1, 5, 5, 17]),
+                    (5, 4, [1, 1, 5, 5, 5]),
+                    (5, 7, [1, 1, 7, 11, 19]),
+                    (5, 11, [1, 1, 5, 1, 1]),
+                    (5, 13, [1, 1, 1, 3, 11]),
+                    (5, 14, [1, 3, 5, 5, 31])]
+SOBOL_BITS = 30
+
+DEMO_FILE = """# Parameter sweep over the keys of the base meta_simulation.in file
+base = meta_simulation.in # the file used for all the values that are not swept
+design = sobol # grid, lhs (Latin hypercube) or sobol
+nb_points = 16 # number of points for the lhs and sobol designs (ignored for grid)
+seed = 0 # random seed for the lhs design
+
+# Any key of meta_simulation.in can then be swept, with one of the following values :
+# [value_1, value_2, ...] : discrete values
+# uniform(min, max, nb) : continuous interval. 'nb' is the number of values for the grid design only
+# loguniform(min, max, nb) : continuous interval, uniform in log
+viscosity = loguniform(1e14, 1e16, 3) # cm^2/s
+surface_density = [(500, 0.5), (1000, 0.5)]
+timestep = uniform(0.2, 0.8, 3) # days
+"""
+
+class Dimension(object):
+  """Class that define one swept key, either with a list of discrete values, or with a continuous interval.
+
+  Parameters :
+  key : the key in meta_simulation.in
+  values=None : list of discrete values
+  bounds=None : (min, max) of the continuous interval
+  isLog=False : if True, the continuous interval is uniform in log
+  nb_levels=None : number of values of the continuous interval for the grid design
+
+  Methods :
+  .get_levels() : the list of values for the grid design
+  .get_value(u) : the value for a coordinate u in [0, 1[ (for the lhs and sobol designs)
+  """
+
+  def __init__(self, key, values=None, bounds=None, isLog=False, nb_levels=None):
+    """initialisation of the class"""
+
+    if ((values == None) == (bounds == None)):
+      raise ValueError("The key '%s' must be defined either with discrete values or with an interval" % key)
+
+    if (values != None and len(values) == 0):
+      raise ValueError("The key '%s' has no value" % key)
+
+    if (isLog and bounds != None and min(bounds) <= 0):
+      raise ValueError("The interval of the key '%s' must be strictly positive to be uniform in log" % key)
+
+    self.key = key
+    self.values = values
+    self.bounds = bounds
+    self.isLog = isLog
+    self.nb_levels = nb_levels
+
+    # Integer intervals give integer values (nb_dumps, sample, ...)
+    self.isInteger = (bounds != None and not(isLog) and all([type(bound) == int for bound in bounds]))
+
+  def __interpolate(self, u):
+    """return the value of the continuous interval at the coordinate u in [0, 1]"""
+    (value_min, value_max) = self.bounds
+    if self.isLog:
+      value = 10**(log10(value_min) + u * (log10(value_max) - log10(value_min)))
+    elif self.isInteger:
+      value = min(int(value_min + u * (value_max - value_min + 1)), value_max)
+    else:
+      value = value_min + u * (value_max - value_min)
+
+    return value
+
+  def get_levels(self):
+    """return the list of values for the grid design"""
+
+    if (self.values != None):
+      return list(self.values)
+
+    if (self.nb_levels == None):
+      raise ValueError("The number of values of the interval must be given for the key '%s' in a grid design" % self.key)
+
+    if (self.nb_levels == 1):
+      return [self.__interpolate(0.5)]
+
+    if self.isInteger:
+      (value_min, value_max) = self.bounds
+      return sorted(set([int(round(value_min + i * (value_max - value_min) / float(self.nb_levels - 1))) for i in range(self.nb_levels)]))
+
+    return [self.__interpolate(i / float(self.nb_levels - 1)) for i in range(self.nb_levels)]
+
+  def get_value(self, u):
+    """return the value for a coordinate u in [0, 1[
+
+    For discrete values, the interval is divided in as many bins as there are values."""
+
+    if (self.values != None):
+      return self.values[min(int(u * len(self.values)), len(self.values) - 1)]
+
+    return self.__interpolate(u)
+
+def uniform(value_min, value_max, nb_levels=None):
+  """continuous interval of a swept key (to be used in the sweep file)"""
+  return {"bounds": (value_min, value_max), "isLog": False, "nb_levels": nb_levels}
+
+def loguniform(value_min, value_max, nb_levels=None):
+  """continuous interval, uniform in log, of a swept key (to be used in the sweep file)"""
+  return {"bounds": (value_min, value_max), "isLog": True, "nb_levels": nb_levels}
+
+def latin_hypercube(nb_points, nb_dimensions, seed=None):
+  """return nb_points coordinates in [0, 1[^nb_dimensions so that each dimension has exactly one point in each
+  of its nb_points bins"""
+
+  generator = random.Random(seed)
+
+  columns = []
+  for dimension in range(nb_dimensions):
+    bins = list(range(nb_points))
+    generator.shuffle(bins)
+    columns.append([(bin + generator.random()) / nb_points for bin in bins])
+
+  return [list(point) for point in zip(*columns)]
+
+def sobol(nb_points, nb_dimensions):
+  """return the nb_points first points (the origin excluded) of the Sobol sequence in [0, 1[^nb_dimensions"""
+
+  if (nb_dimensions > len(SOBOL_DIRECTIONS) + 1):
+    raise ValueError("The Sobol design is limited to %d dimensions" % (len(SOBOL_DIRECTIONS) + 1))
+
+  # Direction numbers V[dimension][bit], scaled by 2**SOBOL_BITS
+  directions = [[1 << (SOBOL_BITS - bit - 1) for bit in range(SOBOL_BITS)]]
+  for (s, a, m) in SOBOL_DIRECTIONS[:nb_dimensions - 1]:
+    V = [m[bit] << (SOBOL_BITS - bit - 1) for bit in range(s)]
+    for bit in range(s, SOBOL_BITS):
+      value = V[bit - s] ^ (V[bit - s] >> s)
+      for k in range(1, s):
+        value ^= ((a >> (s - 1 - k)) & 1) * V[bit - k]
+      V.append(value)
+    directions.append(V)
+
+  # Gray code construction : each point only differ from the previous one by one direction number
+  points = []
+  X = [0] * nb_dimensions
+  for index in range(nb_points):
+    # Index of the rightmost zero bit of index
+    bit = 0
+    while ((index >> bit) & 1):
+      bit += 1
+    X = [X[dimension] ^ directions[dimension][bit] for dimension in range(nb_dimensions)]
+    points.append([x / float(1 << SOBOL_BITS) for x in X])
+
+  return points
+
+def read_sweep(filename=SWEEP_FILENAME, COMMENT_CHARACTER="#", PARAMETER_SEPARATOR="="):
+  """read the sweep file
+
+  Parameters :
+  filename=SWEEP_FILENAME : the name of the sweep file
+  COMMENT_CHARACTER="#" : after this character in the parameter file, all the rest of the line will be ignored
+  PARAMETER_SEPARATOR="=" : This character will separate the key and the value for a given parameter
+
+  Return : a dictionnary with the keys 'base', 'design', 'nb_points', 'seed' and 'dimensions' (list of Dimension objects)
+  """
+
+  sweep = {"base": "meta_simulation.in", "design": "grid", "nb_points": None, "seed": None, "dimensions": []}
+  namespace = {"uniform": uniform, "loguniform": loguniform}
+
+  object_file = open(filename, 'r')
+  lines = object_file.readlines()
+  object_file.close()
+
+  for line in lines:
+    line = line.split(COMMENT_CHARACTER)[0].strip()
+
+    if (line.count(PARAMETER_SEPARATOR) != 1):
+      continue
+
+    (key, value) = [word.strip() for word in line.split(PARAMETER_SEPARATOR)]
+
+    if (key == "base"):
+      sweep["base"] = value
+    elif (key == "design"):
+      sweep["design"] = value
+    elif (key == "nb_points"):
+      sweep["nb_points"] = int(value)
+    elif (key == "seed"):
+      sweep["seed"] = int(value)
+    else:
+      # We must use 'eval' to get lists of tuples, and the intervals
+      definition = eval(value, namespace)
+      if (type(definition) == dict):
+        sweep["dimensions"].append(Dimension(key, **definition))
+      elif (type(definition) in [list, tuple]):
+        sweep["dimensions"].append(Dimension(key, values=list(definition)))
+      else:
+        raise ValueError("The key '%s' must be a list of values, uniform() or loguniform()" % key)
+
+  if not(sweep["design"] in DESIGNS):
+    raise ValueError("The design '%s' does not exist. Possible values are %s" % (sweep["design"], DESIGNS))
+
+  if (sweep["design"] != "grid" and sweep["nb_points"] == None):
+    raise ValueError("The number of points 'nb_points' must be given for the '%s' design" % sweep["design"])
+
+  if (sweep["dimensions"] == []):
+    raise ValueError("No key to sweep in '%s'" % filename)
+
+  return sweep
+
+def generate_points(sweep):
+  """return the list of points of the sweep. Each point is a list of (key, value), in the order of the design."""
+
+  dimensions = sweep["dimensions"]
+  keys = [dimension.key for dimension in dimensions]
+
+  if (sweep["design"] == "grid"):
+    return [list(zip(keys, values)) for values in itertools.product(*[dimension.get_levels() for dimension in dimensions])]
+
+  if (sweep["design"] == "lhs"):
+    coordinates = latin_hypercube(sweep["nb_points"], len(dimensions), seed=sweep["seed"])
+  else:
+    coordinates = sobol(sweep["nb_points"], len(dimensions))
+
+  return [[(dimension.key, dimension.get_value(u)) for (dimension, u) in zip(dimensions, point)] for point in coordinates]
+
+def format_value(value):
+  """return the string of a value as it must be written in meta_simulation.in"""
+  if (type(value) == float):
+    return repr(value)
+
+  return str(value)
+
+def write_meta_simulation(base_lines, point, COMMENT_CHARACTER="#", PARAMETER_SEPARATOR="="):
+  """return the content of meta_simulation.in for a point of the sweep
+
+  Parameters :
+  base_lines : the lines of the base meta_simulation.in
+  point : list of (key, value) that replace the values of the base file. Keys that do not exist in the base file are appended.
+  """
+
+  values = dict(point)
+  written = []
+
+  lines = []
+  for line in base_lines:
+    data = line.split(COMMENT_CHARACTER)[0]
+
+    if (data.count(PARAMETER_SEPARATOR) == 1):
+      key = data.split(PARAMETER_SEPARATOR)[0].strip()
+      if key in values:
+        comment = line[len(data):].rstrip("\n")
+        if (comment != ""):
+          comment = " " + comment
+        line = "%s = %s%s\n" % (key, format_value(values[key]), comment)
+        written.append(key)
+
+    lines.append(line)
+
+  if (lines != [] and not(lines[-1].endswith("\n"))):
+    lines[-1] += "\n"
+
+  for (key, value) in point:
+    if not(key in written):
+      lines.append("%s = %s\n" % (key, format_value(value)))
+
+  return "".join(lines)
+
+def get_hash(content, COMMENT_CHARACTER="#", PARAMETER_SEPARATOR="="):
+  """return the hash of the content of a meta_simulation.in file. Comments, spaces and the order of the keys are
+  not taken into account, the same way they are ignored by mercury-meta-simulation.py"""
+
+  parameters = {}
+  for line in content.split("\n"):
+    line = line.split(COMMENT_CHARACTER)[0].replace(" ", "")
+    if (line.count(PARAMETER_SEPARATOR) == 1):
+      (key, value) = line.split(PARAMETER_SEPARATOR)
+      parameters[key] = value
+
+  normalized = "\n".join(["%s=%s" % item for item in sorted(parameters.items())])
+
+  return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+def read_index(filename=INDEX_FILENAME):
+  """return the dictionnary {hash: folder} of the points already created"""
+
+  index = {}
+  if not(os.path.isfile(filename)):
+    return index
+
+  object_file = open(filename, 'r')
+  for line in object_file:
+    words = line.split()
+    if (len(words) >= 2 and not(line.startswith("#"))):
+      index[words[0]] = words[1]
+  object_file.close()
+
+  return index
+
+def add_to_index(point_hash, folder, point, filename=INDEX_FILENAME):
+  """add a point at the end of the index file"""
+
+  isNew = not(os.path.isfile(filename))
+  object_file = open(filename, 'a')
+  if isNew:
+    object_file.write("# hash ; folder ; values of the swept keys\n")
+  object_file.write("%s %s %s\n" % (point_hash, folder, " ; ".join(["%s=%s" % (key, format_value(value).replace(" ", "")) for (key, value) in point])))
+  object_file.close()
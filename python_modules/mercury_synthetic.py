@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module that write synthetic outputs of mercury (.aei, element.out, info.out, xv.out, ce.out and the spins, horb and
+dEdt files of the user module) with the formats of element and mio_out, for any number of bodies and outputs.
+Used to benchmark the analysis tools without running a simulation (see benchmark_analysis.py)."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import os
+import numpy as np
+import mercury_outputs
+
+K2 = 2.959122082855911e-4 # Gaussian gravitational constant (AU^3.MSUN-1.DAY-2), as in physical_constant.f90
+EARTH_MASS = 3.00374072e-6 # Mass of the Earth (MSUN), as in physical_constant.f90
+RSUN = 4.649130365292e-3 # Radius of the sun (AU), as in tides_constant_GR.f90
+DEG2RAD = np.pi / 180.
+
+# Default output format of element.in
+ELEMENT_FORMAT = "a13.8 e13.8 i10.7 g8.4 n8.4 l8.4 m13e x10.7 y10.7 z10.7 u10.7 v10.7 w10.7"
+
+# Codes and column names of the orbital elements that element can write (see get_aei_format in element.f90)
+ELEMENT_CODES = "aeignlpqbxyzuvwrfmosdc"
+ELEMENT_HEADERS = ["  a ", "  e ", "  i ", "peri", "node", "  M ", "long", "  q ", "  Q ", "  x ", "  y ", "  z ",
+                   " vx ", " vy ", " vz ", "  r ", "  f ", "mass", "oblq", "spin", "dens", "comp"]
+
+# Period ratios of the resonant pairs, and fraction of the neighbours that are in resonance
+RESONANCES = [(7, 6), (6, 5), (5, 4), (4, 3), (3, 2)]
+RESONANT_FRACTION = 0.2
+
+def fortran_exponent(values, decimals, exponent_digits=2):
+  """return the list of strings of the values in the ES format of fortran (1p,e), with the given number of decimals and
+  digits of the exponent (python always write at least 2 digits)"""
+
+  texts = []
+  for value in values:
+    (mantissa, exponent) = ("%.*E" % (decimals, value)).split("E")
+    texts.append("%sE%+0*d" % (mantissa, exponent_digits + 1, int(exponent)))
+
+  return texts
+
+def get_aei_format(element_format=ELEMENT_FORMAT):
+  """python version of get_aei_format (element.f90), for a time in years.
+
+  Return : a tuple (codes, formats, header) with the list of the element codes, the list of the python formats of
+  each column (time included) and the header line of the .aei files
+  """
+
+  codes = []
+  formats = [" %18.7f"]
+  header = "    Time (years)   "
+  lenhead = len(header)
+  for element in element_format.split():
+    code = element[0]
+    if ("." in element):
+      (width, decimals) = [int(number) for number in element[1:].split(".")]
+      formats.append(" %%%d.%df" % (width, decimals))
+    else:
+      width = int(element[1:-1])
+      formats.append(" %%%d.%dE" % (width, width - 7))
+
+    # The name of the column is centered, as in element
+    itmp = (width - 4) // 2
+    header = header.ljust(lenhead + itmp + 1) + ELEMENT_HEADERS[ELEMENT_CODES.index(code)]
+    lenhead += width + 1
+    codes.append(code)
+
+  return (codes, formats, header.ljust(lenhead))
+
+def el2x(gm, a, e, I, g, n, M):
+  """Vectorized conversion of orbital elements (AU, degrees) into cartesian coordinates (AU, AU/day), for elliptic orbits
+
+  Return : a tuple (x, y, z, vx, vy, vz) of arrays of the shape of the elements
+  """
+
+  (I, g, n, M) = [angle * DEG2RAD for angle in (I, g, n, M)]
+
+  # Kepler equation, with Newton iterations
+  E = M + e * np.sin(M)
+  for iteration in range(10):
+    E -= (E - e * np.sin(E) - M) / (1. - e * np.cos(E))
+
+  (cosE, sinE) = (np.cos(E), np.sin(E))
+  b = a * np.sqrt(1. - e * e)
+  x_orb = a * (cosE - e)
+  y_orb = b * sinE
+  mean_motion = np.sqrt(gm / a**3)
+  vx_orb = - a * mean_motion * sinE / (1. - e * cosE)
+  vy_orb = b * mean_motion * cosE / (1. - e * cosE)
+
+  (cosg, sing, cosn, sinn, cosi, sini) = (np.cos(g), np.sin(g), np.cos(n), np.sin(n), np.cos(I), np.sin(I))
+  p = (cosg * cosn - sing * sinn * cosi, cosg * sinn + sing * cosn * cosi, sing * sini)
+  q = (- sing * cosn - cosg * sinn * cosi, - sing * sinn + cosg * cosn * cosi, cosg * sini)
+
+  return tuple([x_orb * p[k] + y_orb * q[k] for k in range(3)] + [vx_orb * p[k] + vy_orb * q[k] for k in range(3)])
+
+def generate_system(nb_bodies, nb_samples, duration=1e6, m_star=1., seed=0):
+  """return the evolution of a synthetic planetary system, as a dictionnary of arrays (one row per output, one column
+  per body) : a tightly packed disk where some neighbours are in mean motion resonance (their resonant angle librates),
+  with slow migration, secular evolution of the orbits, and collisions and ejections.
+
+  Parameters :
+  nb_bodies : number of bodies at the beginning
+  nb_samples : number of outputs
+  duration : time of the last output (years)
+  m_star : mass of the central body (solar mass)
+  seed : seed of the random generator, so that the system is always the same for a given seed
+
+  Return : a dictionnary with the keys
+  'names', 'density' : name and density (g/cm^3) of each body
+  'time' : time of each output (years)
+  'a', 'e', 'I', 'g', 'n', 'M', 'm' : orbital elements (AU, degrees) and mass (solar mass)
+  'lost' : index of the first output where each body is no longer there (nb_samples if it survives)
+  'events' : list of (time, index, index of the body that hit it or None for an ejection), ordered by time
+  """
+
+  generator = np.random.RandomState(seed)
+  time = np.linspace(0., duration, nb_samples)
+  t = time[:, np.newaxis]
+
+  names = ["PL%06d" % index for index in range(nb_bodies)]
+  density = generator.uniform(3., 5.5, nb_bodies)
+  m0 = EARTH_MASS * 10.**generator.uniform(-2., 1., nb_bodies)
+
+  # Semi-major axis : each neighbour is either close, or at the resonance
+  resonance = [None]
+  a0 = [0.1]
+  for index in range(1, nb_bodies):
+    if (generator.uniform() < RESONANT_FRACTION):
+      (p, q) = RESONANCES[generator.randint(len(RESONANCES))]
+      resonance.append((p, q))
+      a0.append(a0[-1] * (float(p) / q)**(2. / 3.) * (1. + generator.normal(0., 1e-4)))
+    else:
+      resonance.append(None)
+      a0.append(a0[-1] * generator.uniform(1.01, 1.04))
+  a0 = np.array(a0)
+
+  # Slow inward migration, with small oscillations
+  migration = generator.uniform(0., 0.1, nb_bodies)
+  a = a0 * (1. - migration * t / duration) * (1. + 1e-4 * np.sin(2. * np.pi * t / generator.uniform(1e2, 1e4, nb_bodies)))
+
+  # Secular evolution (degrees and degrees per year)
+  e0 = np.abs(generator.normal(0., 0.02, nb_bodies))
+  I0 = np.abs(generator.normal(0., 1., nb_bodies))
+  e = e0 * (1. + 0.3 * np.sin(2. * np.pi * t / generator.uniform(1e3, 1e5, nb_bodies)))
+  I = I0 * (1. + 0.3 * np.sin(2. * np.pi * t / generator.uniform(1e3, 1e5, nb_bodies)))
+  varpi = generator.uniform(0., 360., nb_bodies) + generator.uniform(1e-3, 1e-2, nb_bodies) * t
+  node = generator.uniform(0., 360., nb_bodies) - generator.uniform(1e-3, 1e-2, nb_bodies) * t
+
+  # Mean longitudes. For resonant pairs (period ratio p:q), the one of the outer body is such that the resonant
+  # angle p * lambda_2 - q * lambda_1 - (p - q) * varpi_1 librates around 0
+  mean_motion = 360. * np.sqrt(m_star / a0**3) # degrees per year
+  longitude = generator.uniform(0., 360., nb_bodies) + mean_motion * t
+  for index in range(1, nb_bodies):
+    if (resonance[index] != None):
+      (p, q) = resonance[index]
+      libration = generator.uniform(5., 60.) * np.sin(2. * np.pi * time / generator.uniform(1e2, 1e3))
+      longitude[:, index] = (libration + q * longitude[:, index - 1] + (p - q) * varpi[:, index - 1]) / p
+
+  # Collisions and ejections : about 10 % of the bodies are lost, at a random output
+  lost = np.ones(nb_bodies, dtype=int) * nb_samples
+  m = np.ones((nb_samples, 1)) * m0
+  events = []
+  nb_lost = nb_bodies // 10
+  for index in generator.permutation(range(1, nb_bodies))[:nb_lost]:
+    lost[index] = generator.randint(1, nb_samples)
+
+  for index in np.argsort(lost):
+    if (lost[index] == nb_samples):
+      break
+    # The body is either hit by a neighbour that is still there, or ejected
+    neighbours = [neighbour for neighbour in (index - 1, index + 1) if (0 <= neighbour < nb_bodies and lost[neighbour] > lost[index])]
+    if (neighbours != [] and generator.uniform() < 0.7):
+      survivor = neighbours[generator.randint(len(neighbours))]
+      m[lost[index]:, survivor] += m[lost[index] - 1, index]
+    else:
+      survivor = None
+    events.append((0.5 * (time[lost[index] - 1] + time[lost[index]]), index, survivor))
+
+  # Angles between 0 and 360
+  g = np.mod(varpi - node, 360.)
+  M = np.mod(longitude - varpi, 360.)
+
+  return {"names": names, "density": density, "time": time, "a": a, "e": e, "I": I, "g": g, "n": np.mod(node, 360.),
+          "M": M, "m": m, "lost": lost, "events": events, "m_star": m_star}
+
+def get_cartesian(system):
+  """return the cartesian coordinates (x, y, z, vx, vy, vz) of each body at each output of the system (see generate_system)"""
+
+  gm = K2 * (system["m_star"] + system["m"])
+
+  return el2x(gm, system["a"], system["e"], system["I"], system["g"], system["n"], system["M"])
+
+def get_elements(system, codes):
+  """return the list of the arrays of the orbital elements of the given codes (see ELEMENT_CODES)"""
+
+  (x, y, z, vx, vy, vz) = get_cartesian(system)
+  (a, e) = (system["a"], system["e"])
+  r = np.sqrt(x**2 + y**2 + z**2)
+
+  E = np.arccos(np.clip((1. - r / a) / np.where(e > 0, e, 1.), -1., 1.))
+  true_anomaly = np.degrees(2. * np.arctan(np.sqrt((1. + e) / (1. - e)) * np.tan(E / 2.)))
+  true_anomaly = np.where(system["M"] > 180., 360. - true_anomaly, true_anomaly)
+
+  values = {"a": a, "e": e, "i": system["I"], "g": system["g"], "n": system["n"], "l": system["M"],
+            "p": np.mod(system["g"] + system["n"], 360.), "q": a * (1. - e), "b": a * (1. + e),
+            "x": x, "y": y, "z": z, "u": vx, "v": vy, "w": vz, "r": r, "f": true_anomaly, "m": system["m"],
+            "o": system["I"], "s": np.zeros_like(a), "d": np.ones_like(a) * system["density"], "c": np.zeros_like(a)}
+
+  return [values[code] for code in codes]
+
+def write_aei(system, folder=".", element_format=ELEMENT_FORMAT):
+  """write the .aei file of each body of the system (see generate_system), as element would"""
+
+  (codes, formats, header) = get_aei_format(element_format)
+  columns = get_elements(system, codes)
+  line_format = "".join(formats)
+
+  for (index, name) in enumerate(system["names"]):
+    nb_lines = system["lost"][index]
+    table = np.column_stack([system["time"][:nb_lines]] + [column[:nb_lines, index] for column in columns])
+
+    f = open(os.path.join(folder, "%s.aei" % name), 'w')
+    f.write("\n%s%-8s\n\n%s\n" % (" " * 30, name, header))
+    np.savetxt(f, table, fmt=line_format)
+    f.close()
+
+def write_element_out(system, folder="."):
+  """write element.out (final elements of the surviving bodies, sorted by semi-major axis), as element would"""
+
+  survivors = [index for index in range(len(system["names"])) if (system["lost"][index] == len(system["time"]))]
+  survivors.sort(key=lambda index: system["a"][-1, index])
+
+  f = open(os.path.join(folder, "element.out"), 'w')
+  f.write("\n Time (years): %18.7f\n\n" % system["time"][-1])
+  f.write("              a        e       i      mass    Rot/day  Obl\n\n")
+  for index in survivors:
+    mass = fortran_exponent([system["m"][-1, index] / EARTH_MASS], 4)[0]
+    f.write(" %-8s %8.4f %7.5f %7.3f%11s %6.3f %6.2f\n" % (system["names"][index], system["a"][-1, index],
+            system["e"][-1, index], system["I"][-1, index], mass, 0., system["I"][-1, index]))
+  f.close()
+
+def write_info_out(system, folder="."):
+  """write info.out, with the collisions and ejections of the system, as mercury would (the time is in years)"""
+
+  nb_bodies = len(system["names"])
+  names = system["names"]
+
+  f = open(os.path.join(folder, "info.out"), 'w')
+  f.write("\n           Integration parameters\n           ----------------------\n\n")
+  f.write("   Algorithm: Hybrid symplectic integrator (mixed coordinates)\n\n")
+  f.write("   Integration start epoch:         %15.7f days \n" % 0.)
+  f.write("   Integration stop  epoch:         %15.7f\n" % (system["time"][-1] * 365.25))
+  f.write("   Output interval:                 %11.3f\n" % ((system["time"][1] - system["time"][0]) * 365.25))
+  f.write("   Output precision:                 medium\n\n")
+  f.write("   Initial timestep:                %9.3f days \n" % 1.)
+  f.write("   Accuracy parameter:              1.0000E-12\n")
+  f.write("   Central mass:                    %s solar masses\n" % fortran_exponent([system["m_star"]], 4)[0])
+  f.write("   J_2:                              0.0000E+00\n   J_4:                              0.0000E+00\n")
+  f.write("   J_6:                              0.0000E+00\n")
+  f.write("   Ejection distance:               1.0000E+02 AU\n   Radius of central body:          5.0000E-03 AU\n\n")
+  f.write("   Includes collisions:                 yes\n   Includes fragmentation:              no \n")
+  f.write("   Includes relativity:                 no \n   Includes user-defined force routine: no \n\n")
+  f.write("   Number of Big bodies:    %5d\n   Number of Small bodies:      0\n\n" % nb_bodies)
+  f.write("\n           Integration details\n           -------------------\n\n")
+  f.write("   Initial energy:           -2.69010E-09 solar masses AU^2 day^-2 \n")
+  f.write("   Initial angular momentum:  2.88501E-07 solar masses AU^2 day^-1 \n\n")
+  f.write("   Beginning the main integration.\n\n")
+
+  for (time, index, survivor) in system["events"]:
+    if (survivor == None):
+      f.write(" %-8s ejected at %18.7f years\n" % (names[index], time))
+    else:
+      f.write(" %-8s was hit by %-8s at  %14.3f years\n" % (names[survivor], names[index], time))
+
+  f.write("\n   Integration complete.\n\n")
+  f.write("   Fractional energy change due to integrator:   1.86119E-09\n")
+  f.write("   Fractional angular momentum change:           6.63108E-14\n\n")
+  f.write("   Fractional energy change due to collisions/ejections:  0.00000E+00\n")
+  f.write("   Fractional angular momentum change:                    0.00000E+00\n")
+  f.close()
+
+def get_full_header(system, output, bodies, algor, opt4, rcen, rmax):
+  """return the lines (bytes) of a full header ('6a') of xv.out or ce.out, and the list of bodies that follow"""
+
+  codes = np.ones(62, dtype=np.uint8) * 32
+  codes[0:8] = mercury_outputs.fl2c(system["time"][output] * 365.25)
+  codes[8:11] = mercury_outputs.index2c(len(bodies))
+  codes[11:14] = mercury_outputs.index2c(0)
+  codes[14:22] = mercury_outputs.fl2c(system["m_star"])
+  codes[22:46] = mercury_outputs.fl2c(np.zeros(3)).ravel()
+  codes[46:54] = mercury_outputs.fl2c(rcen)
+  codes[54:62] = mercury_outputs.fl2c(rmax)
+  lines = [b"\x0c6a" + ("%2d" % algor).encode() + codes.tobytes() + ("%1d" % opt4).encode()]
+
+  for (k, index) in enumerate(bodies):
+    codes = np.ones(51, dtype=np.uint8) * 32
+    codes[0:3] = mercury_outputs.index2c(k + 1)
+    codes[3:11] = np.frombuffer(("%-8s" % system["names"][index]).encode(), dtype=np.uint8)
+    codes[11:19] = mercury_outputs.fl2c(system["m"][output, index])
+    codes[19:43] = mercury_outputs.fl2c(np.zeros(3)).ravel()
+    codes[43:51] = mercury_outputs.fl2c(system["density"][index])
+    lines.append(codes.tobytes())
+
+  return lines
+
+def get_compressed(system, cartesian, output, indexes, rcen, rmax, nchar):
+  """return the ASCII codes of the 6 compressed variables of mco_x2ov (one row per body of indexes, nchar per variable)"""
+
+  (x, y, z, vx, vy, vz) = [variable[output, indexes] for variable in cartesian]
+  gm = K2 * (system["m_star"] + system["m"][output, indexes])
+
+  r = np.sqrt(x * x + y * y + z * z)
+  v2 = vx * vx + vy * vy + vz * vz
+  fr = np.log10(np.clip(r, rcen, rmax) / rcen)
+  fv = 1. / (1. + 2. * (0.5 * v2 / (gm / r))**2)
+  theta = np.mod(np.arccos(z / r) + 2. * np.pi, 2. * np.pi)
+  vtheta = np.mod(np.arccos(vz / np.sqrt(v2)) + 2. * np.pi, 2. * np.pi)
+  phi = np.mod(np.arctan2(y, x) + 2. * np.pi, 2. * np.pi)
+  vphi = np.mod(np.arctan2(vy, vx) + 2. * np.pi, 2. * np.pi)
+
+  ranges = [(fr, np.log10(rmax / rcen)), (theta, np.pi), (phi, 2. * np.pi), (fv, 1.), (vtheta, np.pi), (vphi, 2. * np.pi)]
+
+  return np.concatenate([mercury_outputs.re2c(value, 0., xmax, nchar) for (value, xmax) in ranges], axis=-1)
+
+def write_xv(system, folder=".", opt4=2, rcen=0.005, rmax=100., algor=10):
+  """write xv.out, as mio_out would. A full header is written at the first output, and each time the number of bodies
+  changes. opt4 is the output precision (1, 2 or 3 for low, medium or high)"""
+
+  nchar = mercury_outputs.NCHAR[opt4]
+  cartesian = get_cartesian(system)
+
+  f = open(os.path.join(folder, "xv.out"), 'wb')
+  previous = None
+  for output in range(len(system["time"])):
+    bodies = [index for index in range(len(system["names"])) if (system["lost"][index] > output)]
+    if (bodies != previous):
+      f.write(b"\n".join(get_full_header(system, output, bodies, algor, opt4, rcen, rmax)) + b"\n")
+      previous = bodies
+
+    header = np.concatenate([mercury_outputs.fl2c(system["time"][output] * 365.25),
+                             mercury_outputs.index2c(len(bodies)), mercury_outputs.index2c(0)])
+    codes = np.concatenate([mercury_outputs.index2c(np.arange(1, len(bodies) + 1)),
+                            get_compressed(system, cartesian, output, bodies, rcen, rmax, nchar)], axis=1)
+    f.write(b"\x0c6b" + header.tobytes() + b"\n")
+    f.write(b"\n".join([line.tobytes() for line in codes]) + b"\n")
+  f.close()
+
+def write_ce(system, folder=".", nb_encounters=1000, rcen=0.005, rmax=100., algor=10, seed=0):
+  """write ce.out with nb_encounters close encounters between neighbours, as mio_ce would"""
+
+  generator = np.random.RandomState(seed)
+  cartesian = get_cartesian(system)
+  nb_bodies = len(system["names"])
+
+  # Encounters are sorted in time, a full header is written each time the number of bodies changes
+  encounters = []
+  for k in range(nb_encounters):
+    output = generator.randint(len(system["time"]))
+    index = generator.randint(nb_bodies - 1)
+    encounters.append((output, index, index + 1))
+  encounters.sort()
+
+  f = open(os.path.join(folder, "ce.out"), 'wb')
+  previous = None
+  for (output, i, j) in encounters:
+    bodies = [index for index in range(nb_bodies) if (system["lost"][index] > output)]
+    if not(i in bodies and j in bodies):
+      continue
+    if (bodies != previous):
+      f.write(b"\n".join(get_full_header(system, output, bodies, algor, 2, rcen, rmax)) + b"\n")
+      previous = bodies
+
+    distance = generator.uniform(1e-4, 1e-2)
+    codes = np.concatenate([mercury_outputs.fl2c(system["time"][output] * 365.25),
+                            mercury_outputs.index2c(bodies.index(i) + 1), mercury_outputs.index2c(bodies.index(j) + 1),
+                            mercury_outputs.fl2c(distance),
+                            get_compressed(system, cartesian, output, [i, j], rcen, rmax, 4).ravel()])
+    f.write(b"\x0c6b" + codes.tobytes() + b"\n")
+  f.close()
+
+def write_tidal_outputs(system, folder=".", nb_planets=None):
+  """write spins.out, and spinp, horb and dEdt for each planet, as the user module would. The planet index has only
+  one digit in the name of the files, hence at most 9 planets"""
+
+  if (nb_planets == None):
+    nb_planets = min(9, len(system["names"]))
+
+  time = system["time"]
+  nb_samples = len(time)
+  line_format = "  %20s" # es20.10e3
+
+  def write_table(filename, columns):
+    texts = [fortran_exponent(column, 10, 3) for column in columns]
+    f = open(os.path.join(folder, filename), 'w')
+    for values in zip(*texts):
+      f.write("".join([line_format % value for value in values]) + "\n")
+    f.close()
+
+  # The star spins down slowly, its radius shrinks
+  spin_star = 2. * np.pi / 1. * np.exp(-time / (time[-1] + 1.))
+  zeros = np.zeros(nb_samples)
+  write_table("spins.out", [time, zeros, zeros, spin_star, 0.1 * (1. + 0.1 * np.exp(-time / (time[-1] + 1.))),
+                            zeros + 0.2, zeros + 0.307, zeros + 7.7e4])
+
+  (x, y, z, vx, vy, vz) = get_cartesian(system)
+  for j in range(nb_planets):
+    # The spin of the planet goes from 1 day to the synchronisation with the orbit
+    orbital_spin = 2. * np.pi * np.sqrt(K2 * (system["m_star"] + system["m"][:, j]) / system["a"][:, j]**3)
+    spin = orbital_spin + (2. * np.pi - orbital_spin) * np.exp(-10. * time / (time[-1] + 1.))
+    write_table("spinp%d.out" % (j + 1), [time, zeros, zeros, spin, zeros + 1. * 4.25875047552248e-5 / RSUN, zeros + 0.3308])
+
+    horb = (y[:, j] * vz[:, j] - z[:, j] * vy[:, j], z[:, j] * vx[:, j] - x[:, j] * vz[:, j], x[:, j] * vy[:, j] - y[:, j] * vx[:, j])
+    write_table("horb%d.out" % (j + 1), [time, horb[0], horb[1], horb[2]])
+
+    write_table("dEdt%d.out" % (j + 1), [time, 1e-15 * np.exp(-time / (time[-1] + 1.)) / system["a"][:, j]**6])
+
+def generate(folder, nb_bodies, nb_samples, duration=1e6, nb_encounters=1000, element_format=ELEMENT_FORMAT, seed=0):
+  """write all the synthetic outputs of a system of nb_bodies bodies with nb_samples outputs in the folder
+
+  Return : the system (see generate_system)
+  """
+
+  if not(os.path.isdir(folder)):
+    os.makedirs(folder)
+
+  system = generate_system(nb_bodies, nb_samples, duration=duration, seed=seed)
+  write_aei(system, folder, element_format)
+  write_element_out(system, folder)
+  write_info_out(system, folder)
+  write_xv(system, folder)
+  write_ce(system, folder, nb_encounters=nb_encounters, seed=seed)
+  write_tidal_outputs(system, folder)
+
+  return system
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""module that define the planetary systems used to test and benchmark mercury (compare_simulations.py and
+benchmark_simulation.py), so that the same initial conditions are used everywhere."""
+from __future__ import print_function
+
+__version__ = "1.0"
+
+import random
+from mercury import BodyCart, BodyAst, PlanetarySystem
+
+EARTH_MASS = 3.0034896e-6 # Mass of the Earth, in solar mass
+
+def inner_planets():
+  """return the list of the big bodies of the inner Solar System (Mercury, Venus, Earth-Moon barycentre and Mars),
+  in cartesian coordinates at the epoch 2451000.5"""
+
+  mercury = BodyCart("big",name="MERCURY", x=-3.83966017419175965E-01, y=-1.76865300855700736E-01, z=2.07959213998758705E-02,
+  vx=5.96286238644834141E-03, vy=-2.43281292146216750E-02, vz=-2.53463209848734695E-03, m=1.66013679527193009E-07,
+  r=20.0e0, d=5.43)
+  venus = BodyCart("big",name="VENUS", x=6.33469157915745540E-01, y=3.49855234102151691E-01, z=-3.17853172088953667E-02,
+  vx=-9.84258038001823571E-03, vy=1.76183746921837227E-02, vz=8.08822351013463794E-04, m=2.44783833966454430E-06,
+  r=20.0e0, d=5.24)
+  earthmoo = BodyCart("big", name="EARTHMOO", x=2.42093942183383037E-01, y=-9.87467766698604366E-01, z=-4.54276292555233496E-06,
+  vx=1.64294055023289365E-02, vy=4.03200725816140870E-03, vz=1.13609607260006795E-08, m=3.04043264264672381E-06,
+  r=20.0e0, d=5.52)
+  mars = BodyCart("big", name="MARS", x=2.51831018120174499E-01, y=1.52598983115984788E+00, z=2.57781137811807781E-02,
+  vx=-1.32744166042475433E-02, vy=3.46582959610421387E-03, vz=3.98930013246952611E-04, m=3.22715144505386530E-07,
+  r=20.0e0, d=3.94)
+
+  return [mercury, venus, earthmoo, mars]
+
+def inner_solar_system():
+  """return the inner Solar System (Mercury to Mars), without any small body"""
+
+  return PlanetarySystem(bodies=inner_planets(), m_star=1.0, epoch=2451000.5)
+
+def solar_system():
+  """return the Solar System of the example of mercury : the 9 planets and 6 small bodies"""
+
+  jupiter = BodyCart("big", name="JUPITER", x=4.84143144246472090E+00, y=-1.16032004402742839E+00, z=-1.03622044471123109E-01,
+  vx=1.66007664274403694E-03, vy=7.69901118419740425E-03, vz=-6.90460016972063023E-05, m=9.54791938424326609E-04,
+  r=3.0e0, d=1.33)
+  saturn = BodyCart("big", name="SATURN", x=8.34336671824457987E+00, y=4.12479856412430479E+00, z=-4.03523417114321381E-01,
+  vx=-2.76742510726862411E-03, vy=4.99852801234917238E-03, vz=2.30417297573763929E-05, m=2.85885980666130812E-04,
+  r=3.0e0, d=0.70)
+  uranus = BodyCart("big", name="URANUS", x=1.28943695621391310E+01, y=-1.51111514016986312E+01, z=-2.23307578892655734E-01,
+  vx=2.96460137564761618E-03, vy=2.37847173959480950E-03, vz=-2.96589568540237556E-05, m=4.36624404335156298E-05,
+  r=3.0e0, d=1.30)
+  neptune = BodyCart("big", name="NEPTUNE", x=1.53796971148509165E+01, y=-2.59193146099879641E+01, z=1.79258772950371181E-01,
+  vx=2.68067772490389322E-03, vy=1.62824170038242295E-03, vz=-9.51592254519715870E-05, m=5.15138902046611451E-05,
+  r=3.0e0, d=1.76)
+  pluto = BodyCart("big", name="PLUTO", x=-1.15095623952731607E+01, y=-2.70779438829451422E+01, z=6.22871533567077229E+00,
+  vx=2.97220056963797431E-03, vy=-1.69820233395912967E-03, vz=-6.76798264809371094E-04, m=7.39644970414201173E-09,
+  r=3.0e0, d=1.1)
+
+  apollo = BodyAst("small", name="APOLLO", a=1.4710345, e=.5600245, I=6.35621,
+  g=285.63908, n=35.92313, M=15.77656, ep=2450400.5)
+  jason = BodyAst("small", name="JASON", a=2.2157309, e=.7644575, I=4.84834,
+  g=336.49610, n=169.94137, M=293.37226, ep=2450400.5)
+  khufu = BodyAst("small", name="KHUFU", a=0.9894948, e=.4685310, I=9.91298,
+  g=54.85927, n=152.64772, M=66.69818, ep=2450600.5)
+  minos = BodyAst("small", name="MINOS", a=1.1513383, e=.4127106, I=3.93863,
+  g=239.50170, n=344.85893, M=8.93445, ep=2450400.5)
+  orpheus = BodyAst("small", name="ORPHEUS", a=1.2091305, e=.3226805, I=2.68180,
+  g=301.55128, n=189.79654, M=28.31467, ep=2450400.5)
+  toutatis = BodyAst("small", name="TOUTATIS", a=2.5119660, e=.6335854, I=0.46976,
+  g=274.82273, n=128.20968, M=50.00728, ep=2450600.5)
+
+  bodies = inner_planets() + [jupiter, saturn, uranus, neptune, pluto, apollo, jason, khufu, minos, orpheus, toutatis]
+
+  return PlanetarySystem(bodies=bodies, m_star=1.0, epoch=2451000.5)
+
+def embryo_disk(nb_embryos=100, a_min=0.5, a_max=1.5, seed=0):
+  """return a dense disk of planetary embryos around a solar mass star, every body being a big one. Masses are between
+  0.01 and 0.1 earth mass, with small eccentricities and inclinations.
+
+  Parameters :
+  nb_embryos : number of embryos
+  a_min, a_max : range of the semi-major axis (AU)
+  seed : seed of the random generator, so that the disk is always the same for a given seed
+  """
+
+  generator = random.Random(seed)
+
+  bodies = []
+  for index in range(nb_embryos):
+    bodies.append(BodyAst("big", name="EMB%04d" % index, m=generator.uniform(0.01, 0.1) * EARTH_MASS, r=1.0, d=3.0,
+    a=generator.uniform(a_min, a_max), e=generator.uniform(0., 0.01), I=generator.uniform(0., 0.5),
+    g=generator.uniform(0., 360.), n=generator.uniform(0., 360.), M=generator.uniform(0., 360.)))
+
+  return PlanetarySystem(bodies=bodies, m_star=1.0, epoch=0.)
+
+def tidal_close_in():
+  """return two close-in planets around a 0.1 solar mass M-dwarf (M_dwarf host of tides_constant_GR.f90), where tides,
+  rotational flattening and general relativity are important. The orbital period of the inner planet is 1.7 days"""
+
+  planet1 = BodyAst("big", name="PLANET1", m=1. * EARTH_MASS, r=1.0, d=5.6, a=0.013, e=0.01, I=1.5, g=0., n=0., M=0.)
+  planet2 = BodyAst("big", name="PLANET2", m=2. * EARTH_MASS, r=1.0, d=5.6, a=0.025, e=0.05, I=1.0, g=0., n=0., M=90.)
+
+  return PlanetarySystem(bodies=[planet1, planet2], m_star=0.1, epoch=0.)
+
+def brown_dwarf_system():
+  """return the two planets around a 0.08 solar mass brown dwarf (brown_dwarf host of tides_constant_GR.f90) of the
+  example simulation with tides"""
+
+  planet1 = BodyAst("big", name="PLANET1", m=3.0e-6, r=1.0, d=5.6, a=0.018, e=0., I=1.5, g=0., n=0., M=0.)
+  planet2 = BodyAst("big", name="PLANET2", m=6.0e-6, r=1.0, d=5.6, a=0.1, e=0.5, I=1.0, g=0., n=0., M=0.)
+
+  return PlanetarySystem(bodies=[planet1, planet2], m_star=0.08, epoch=0.)
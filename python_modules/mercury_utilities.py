@@ -9,7 +9,9 @@ __version__ = "1.1"
 
 import mercury
 from random import uniform 
+from math import ceil
 import simulations_utilities
+import mercury_monitoring
 import autiwa
 import subprocess
 import pdb
@@ -21,16 +23,27 @@ import os
                  #~ 'avakas-frontend1':"/home/ccossou/bin/mercury",
                  #~ 'new-host.home':"/Users/cossou/Documents/programmation/mercury"}
 
-def prepareSubmission(BinaryPath, walltime=48):
+def prepareSubmission(BinaryPath, walltime=48, nb_jobs=1):
   """This function will generate files usefull to launch the simulation, 
   especially if the simulation has moved from a server to another. 
   'runjob' and 'simulation.sh' will be generated. 'runjob' is the file that must be executed to launch the simulation. 
   In fact, 'runjob' will submit to the queue scheduler the script 'simulation.sh' that contains all the 
   binaries that must be launched by the simulation.
   
-  Indeed, the scripts used to launch the simulation will be adapted in function of the hostname"""
+  Indeed, the scripts used to launch the simulation will be adapted in function of the hostname
   
-  command = BinaryPath+"/mercury\n" + \
+  Parameters :
+  walltime=48 : (in hours) the walltime of each job (only for PBS)
+  nb_jobs=1 : the number of chained jobs submitted by 'runjob'. Each one continue the simulation from the dumps of the previous one.
+  The chained jobs start whatever the exit status of the previous one, so each job first checks that the simulation has 
+  not been stopped by the watchdog (mercury_monitoring.FAILED_FILENAME) in the meantime.
+  """
+  
+  command = "if [ -f %s ]; then\n" % mercury_monitoring.FAILED_FILENAME + \
+            "  echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ': Stopped by the watchdog, job skipped'>>~/qsub.log\n" + \
+            "  exit 0\n" + \
+            "fi\n" + \
+            BinaryPath+"/mercury\n" + \
             BinaryPath+"/element\n" + \
             "echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ': Done'>>~/qsub.log\n"
   
@@ -40,11 +53,11 @@ def prepareSubmission(BinaryPath, walltime=48):
   # We define a bash script to launch the simulation in a queue
   if ('arguin' in hostname):
     script = simulations_utilities.SimpleJob(command) # For arguin
-    simulations_utilities.writeRunjobSGE("simulation.sh") # For arguin
+    simulations_utilities.writeRunjobSGE("simulation.sh", nb_jobs=nb_jobs) # For arguin
     script.write()
   elif('avakas' in hostname):
     script = simulations_utilities.Job_PBS(command, walltime=walltime) # For avakas
-    simulations_utilities.writeRunjobPBS("simulation.sh") # For avakas
+    simulations_utilities.writeRunjobPBS("simulation.sh", nb_jobs=nb_jobs) # For avakas
     script.write()
   else:
     print("The hostname %s is not recognized by the script" % hostname)
@@ -53,6 +66,38 @@ def prepareSubmission(BinaryPath, walltime=48):
   
   simulations_utilities.setExecutionRight("simulation.sh")
 
+def prepareChainedSubmission(BinaryPath, max_walltime=48, safety_factor=1.2, margin=0.5):
+  """Same as prepareSubmission, but the walltime and the number of jobs are deduced from the speed of the integration 
+  measured on the previous dumps (see mercury_monitoring.ProgressHistory). The remaining time is split into chained 
+  jobs, each one asking for the same walltime, lower than 'max_walltime'. 
+  
+  If the speed can't be measured (less than two dumps recorded so far), one job of 'max_walltime' is submitted.
+  
+  Parameters :
+  BinaryPath : the folder where are the binaries
+  max_walltime=48 : (in hours) the maximum walltime allowed by the queue
+  safety_factor=1.2 : factor applied to the predicted time, the speed of the integration being not constant
+  margin=0.5 : (in hours) added to the walltime of each job, to have time to write the outputs
+  
+  Return : (nb_jobs, walltime) the number of jobs and the walltime of each job (in hours)
+  """
+  
+  history = mercury_monitoring.ProgressHistory(".")
+  history.record()
+  remaining = history.get_remaining_walltime()
+  
+  if (remaining == None):
+    nb_jobs = 1
+    walltime = max_walltime
+  else:
+    hours = remaining * safety_factor / 3600.
+    nb_jobs = max(int(ceil(hours / (max_walltime - margin))), 1)
+    walltime = min(hours / nb_jobs + margin, max_walltime)
+  
+  prepareSubmission(BinaryPath, walltime=walltime, nb_jobs=nb_jobs)
+  
+  return (nb_jobs, walltime)
+
 def definePlanetarySystem(m, a, e, I, m_star=1.0, epoch=0, d=None):
   """ We will assume a certain number of parameters. For example, all bodies will be big bodies. 
   We will also assume that all the bodies will be set with the 'asteroidal' properties (that is to say (a, e, I, g, n, M)). Plus, 
@@ -134,7 +179,7 @@ def mercury_restart():
   """
   
   # For each folder were there is a problem (NaN in the output in other words) we clean and relaunch the simulation
-  command = "rm *.out *.dmp *.tmp *.sh.* *.aei *.clo"
+  command = "rm *.out *.bin *.dmp *.tmp *.sh.* *.aei *.clo %s" % mercury_monitoring.FAILED_FILENAME
   print("\tCleaning the simulation files : %s" % command)
   (stdout, stderr, returnCode) = autiwa.lancer_commande(command)
   
@@ -60,7 +60,7 @@ def str2str(value):
   return value
 
 
-def writeRunjobSGE(command, queue="", nb_proc=1):
+def writeRunjobSGE(command, queue="", nb_proc=1, nb_jobs=1):
   """function that creates a script named 'runjob' that
   will run a job on a queue. If the number of processor exceed 1, then
    the function will try to launch the job on every queue. If not, it
@@ -72,6 +72,7 @@ def writeRunjobSGE(command, queue="", nb_proc=1):
   nb_proc=1 : (integer) number of processor we want to use. By default, it will be 1
   queue : the queue you want to use to launch your job. You can use the various syntaxes allowed by the job scheduler. 
   command : The command you want the job to launch. 
+  nb_jobs=1 : (integer) number of chained jobs. Each job will only start once the previous one is over (-hold_jid)
   
   Example : 
   writeRunjob("./mercury", "arguin1.q,arguin2.q")
@@ -100,12 +101,18 @@ def writeRunjobSGE(command, queue="", nb_proc=1):
   script.write("stdout=$("+qsub+")\n")
   script.write("echo $stdout\n")
   script.write("echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ':' $stdout>>~/qsub.log\n")
+  # qsub display 'Your job 123456 ("simulation.sh") has been submitted', the third word is the job ID
+  for i in range(nb_jobs - 1):
+    script.write("jobid=$(echo $stdout | awk '{print $3}')\n")
+    script.write("stdout=$("+qsub.replace("qsub", "qsub -hold_jid $jobid", 1)+")\n")
+    script.write("echo $stdout\n")
+    script.write("echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ':' $stdout>>~/qsub.log\n")
   script.close()
 
   setExecutionRight(NAME_SCRIPT)
   
 
-def writeRunjobPBS(command):
+def writeRunjobPBS(command, nb_jobs=1):
   """function that creates a script named 'runjob' that
   will run a job on a queue. If the number of processor exceed 1, then
    the function will try to launch the job on every queue. If not, it
@@ -116,6 +123,8 @@ def writeRunjobPBS(command):
 
   Parameters
   command : The command you want the job to launch. 
+  nb_jobs=1 : (integer) number of chained jobs. Each job will only start once the previous one 
+              is over, whatever its exit status (-W depend=afterany)
   
   Example : 
   writeRunjob("./mercury")
@@ -135,6 +144,11 @@ def writeRunjobPBS(command):
   script.write("echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ': launched'>>~/qsub.log\n")
   script.write("echo $stdout # display the output of the qsub\n")
   script.write("echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ':' $stdout>>~/qsub.log\n")
+  # For PBS, qsub only display the job ID
+  for i in range(nb_jobs - 1):
+    script.write("stdout=$(qsub -W depend=afterany:$stdout "+command+")\n")
+    script.write("echo $stdout\n")
+    script.write("echo `date '+%d-%m-%Y at %H:%M:%S'` `pwd` ':' $stdout>>~/qsub.log\n")
   script.close()
 
   setExecutionRight(NAME_SCRIPT)
@@ -10,6 +10,18 @@ module spline
 
   implicit none
 
+  !
+  !  Last interval found by rvec_bracket for the last tables used. A table is identified
+  !  by its size and its first and last values (the same time array is used for several
+  !  quantities, e.g. the radius and the luminosity of the host body).
+  !
+  integer, parameter :: NB_BRACKET_CACHE = 8
+  integer, save :: cache_n(NB_BRACKET_CACHE) = 0
+  integer, save :: cache_left(NB_BRACKET_CACHE) = 1
+  integer, save :: cache_next = 1
+  real(double_precision), save :: cache_first(NB_BRACKET_CACHE) = 0.
+  real(double_precision), save :: cache_last(NB_BRACKET_CACHE) = 0.
+
 contains
 
   subroutine spline_b_val (ndata,tdata,ydata,tval,yval)
@@ -70,24 +82,65 @@ contains
   end subroutine spline_b_val
 
   subroutine rvec_bracket (n,x,xval,left,right)
+    !
+    !  Find LEFT such that X(LEFT) <= XVAL < X(LEFT+1), with LEFT = 1 if XVAL < X(2)
+    !  and LEFT = N-1 if XVAL >= X(N-1) (X must be sorted in increasing order).
+    !  RIGHT = LEFT + 1.
+    !
+    !  As time increases monotonically during the integration, the interval is almost
+    !  always the one of the previous call for the same table, or the next one. They are
+    !  tested first, then a bisection is done.
     !
     implicit none
     !
     integer :: n
     !
-    integer :: i,left,right
+    integer :: i,left,right,slot,lo,hi,mid
     real(double_precision), dimension(n) :: x
     real(double_precision) :: xval
     !
-    do i = 2,n-1
-       if (xval.lt.x(i)) then
-          left = i-1
-          right = i
+    slot = 0
+    do i = 1, NB_BRACKET_CACHE
+       if ((cache_n(i).eq.n).and.(cache_first(i).eq.x(1)).and.(cache_last(i).eq.x(n))) then
+          slot = i
+          exit
+       end if
+    end do
+    !
+    if (slot.eq.0) then
+       slot = cache_next
+       cache_next = mod(cache_next, NB_BRACKET_CACHE) + 1
+       cache_n(slot) = n
+       cache_first(slot) = x(1)
+       cache_last(slot) = x(n)
+       cache_left(slot) = 1
+    end if
+    !
+    !  Same interval as before, or the next one
+    !
+    do left = cache_left(slot), min(cache_left(slot) + 1, n - 1)
+       if (((left.eq.1).or.(xval.ge.x(left))).and.((left.eq.n-1).or.(xval.lt.x(left+1)))) then
+          right = left + 1
+          cache_left(slot) = left
           return
        end if
     end do
-    left = n - 1
-    right = n
+    !
+    !  Bisection : smallest I in [2, N-1] such that XVAL < X(I) (N if there is none)
+    !
+    lo = 2
+    hi = n
+    do while (lo.lt.hi)
+       mid = (lo + hi) / 2
+       if (xval.lt.x(mid)) then
+          hi = mid
+       else
+          lo = mid + 1
+       end if
+    end do
+    left = lo - 1
+    right = lo
+    cache_left(slot) = left
     return
   end subroutine rvec_bracket
 
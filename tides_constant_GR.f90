@@ -10,6 +10,9 @@ module tides_constant_GR
   !----------------------------------------------------------------------------- 
   ! Output of spin every 'output' years
   real(double_precision), parameter :: output = 100
+  ! If binary_output = 1, spins, spinpi, horbi and dEdti are written in binary
+  ! files (.bin, little-endian float64, see mercury_outputs.py) instead of text (.out)
+  integer, parameter :: binary_output = 0
 
   !---------------------------  effects  --------------------------------------- 
   ! If you want effect of rotational induced flattening or not
@@ -13,12 +13,44 @@ module user_module
 
   use types_numeriques
   use mercury_globals
+  use tides_constant_GR, only : ntid
 
   implicit none
 
   private
 
-  public :: mfo_user
+  public :: mfo_user, flush_tidal_outputs
+
+  ! Index of the tables of the evolution of brown dwarfs, one line per mass (see read_BD_tables)
+  character(len=*), parameter :: BD_INDEX_FILE = 'tablesBD.dat'
+  ! Number of rows of the tables of the radius of gyration of brown dwarfs (rg2BD.dat)
+  integer, parameter :: NB_RG2 = 37
+
+  ! Number of outputs of spins.out, spinpi.out, horbi.out and dEdti.out kept in memory before being written
+  integer, parameter :: TIDAL_BUFFER_SIZE = 1000
+  ! Unit of spins.out. Planet i use the 3 following ones (spinpi.out, horbi.out and dEdti.out)
+  integer, parameter :: TIDAL_UNIT = 40
+
+  ! Binary outputs (binary_output=1 in tides_constant_GR, see mercury_outputs.py for the reader) : a header (magic
+  !! string, version, index of the planet (0 for the star), number of columns, size of the header in bytes, then the
+  !! name of each column on 16 characters) followed by one record of little-endian float64 per output
+  character(len=8), parameter :: TIDAL_MAGIC = 'MERCTIDE'
+  integer, parameter :: TIDAL_VERSION = 1
+  integer, parameter :: int32 = selected_int_kind(9)
+  character(len=16), parameter, dimension(8) :: STAR_COLUMNS = (/ character(len=16) :: 'time','spin_x','spin_y', &
+       'spin_z','radius','rg2','k2','sigma' /)
+  character(len=16), parameter, dimension(6) :: SPIN_COLUMNS = (/ character(len=16) :: 'time','spin_x','spin_y', &
+       'spin_z','radius','rg2' /)
+  character(len=16), parameter, dimension(4) :: HORB_COLUMNS = (/ character(len=16) :: 'time','horb_x','horb_y','horb_z' /)
+  character(len=16), parameter, dimension(2) :: DEDT_COLUMNS = (/ character(len=16) :: 'time','dEdt' /)
+
+  ! Outputs waiting to be written (see flush_tidal_outputs). For the star : the time (years), spin (3 components),
+  !! radius (Rsun), rg2, k2 and sigma. For each planet : spin (3 components), radius (Rsun), rg2, horb (3 components)
+  !! and dEdt.
+  integer, save :: nb_tidal_outputs = 0
+  real(double_precision), dimension(8,TIDAL_BUFFER_SIZE), save :: star_outputs
+  real(double_precision), dimension(9,ntid,TIDAL_BUFFER_SIZE), save :: planet_outputs
+  logical, save :: isTidalOpened = .false.
 
   contains
 
@@ -73,7 +105,7 @@ module user_module
     !------Local-------
 
     ! Local
-    integer :: j,kk, error, iPs0, nptmss
+    integer :: j,kk, error, nptmss
     integer :: flagrg2=0
     integer :: flagtime=0
     integer :: ispin=0
@@ -97,10 +129,11 @@ module user_module
     ! Dissipation of the star:
     real(double_precision) :: sigmast
 
-    ! Total forces:
-    real(double_precision) :: F_tid_tot_x,F_tid_tot_y,F_tid_tot_z
-    real(double_precision) :: F_rot_tot_x,F_rot_tot_y,F_rot_tot_z
-    real(double_precision) :: F_GR_tot_x,F_GR_tot_y,F_GR_tot_z
+    ! Total forces on each planet:
+    real(double_precision), dimension(3,nbig+1) :: F_tid,F_rot,F_GR
+    ! Distance to the host body and its powers, velocity and radial velocity of each planet,
+    ! shared by all the forces
+    real(double_precision), dimension(nbig+1) :: r_2,rr,r_5,r_7,r_8,v_2,norm_v,v_rad
     !real(double_precision) :: acc_rot_x,acc_rot_y,acc_rot_z
     !real(double_precision) :: acc_GR_x,acc_GR_y,acc_GR_z
 
@@ -171,15 +204,11 @@ module user_module
     real(double_precision), dimension(10) :: sigmap,tintin,k2p,k2fp,k2pdeltap,rg2p
 
     ! Data tables for evolving host body:
-    ! - Data for Brown dwarf
-    real(double_precision), dimension(:), allocatable :: timeBD,radiusBD,lumiBD,HZinGJ,HZoutGJ,HZinb,HZoutb
-    real(double_precision), dimension(37) :: rg2st,trg2,rg1,rg2,rg3,rg4,rg5,rg6,rg7,rg8,rg9,rg10,rg11,rg12
-    !     * Initial rotation period for brown dwarfs (BD)
-    real(double_precision), parameter, dimension(12) :: Ps0 = (/8.d0,13.d0,19.d0,24.d0,30.d0,36.d0,41.d0, &
-         47.d0,53.d0,58.d0,64.d0,70.d0/)
-    !     * Love number for BD
-    real(double_precision), parameter, dimension(12) :: k2st = (/0.379d0,0.378d0,0.376d0,0.369d0, &
-         0.355d0,0.342d0,0.333d0,0.325d0,0.311d0,0.308d0,0.307d0,0.307d0/)
+    ! - Data for Brown dwarf (times in days, relative to t_init, see read_BD_tables)
+    real(double_precision), dimension(:), allocatable :: timeBD,radiusBD
+    real(double_precision), dimension(NB_RG2) :: rg2st,trg2
+    !     * Love number and initial rotation period (hours) for brown dwarfs (BD)
+    real(double_precision) :: k2BD,Ps0BD
     ! - Data for Star
     real(double_precision), dimension(2003) :: timestar,radiusstar,d2radiusstar
     ! - Data for M dwarf
@@ -188,14 +217,10 @@ module user_module
     real(double_precision), dimension(4755) :: timeJup,radiusJup,k2Jup,rg2Jup,spinJup
 
 
-    character(len=80) :: planet_spin_filename
-    character(len=80) :: planet_orbt_filename
-    character(len=80) :: planet_dEdt_filename
-
     ! Save data of tables for evolving host body
     ! - Data for Brown Dwarf
     save timeBD,radiusBD
-    save trg2,rg1,rg2,rg3,rg4,rg5,rg6,rg7,rg8,rg9,rg10,rg11,rg12
+    save trg2,rg2st,k2BD,Ps0BD
     ! - Date for Star
     save timestar,radiusstar,d2radiusstar
     ! - Data for M dwarf
@@ -337,243 +362,8 @@ module user_module
             if (charge_data.eq.0) then
 
                 if (brown_dwarf.eq.1) then 
-                    ! BD's radius of gyration
-                    open(1,file='rg2BD.dat')
-                    do nptmss=1,37
-                        read(1,*,iostat=error)trg2(nptmss),rg1(nptmss),rg2(nptmss), &
-                             rg3(nptmss),rg4(nptmss),rg5(nptmss),rg6(nptmss),rg7(nptmss), &
-                             rg8(nptmss),rg9(nptmss),rg10(nptmss),rg11(nptmss),rg12(nptmss)
-                    end do
-
-                    ! If BD's mass is equal to one of these values, charge radius... 
-                    if ((m(1).le.0.0101*K2).and.(m(1).ge.0.0099*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg1(j)
-                        enddo
-                        open(1,file='mass_10.0000.dat')
-                        nptmss = 715
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss = 1,715
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0121*K2).and.(m(1).ge.0.0119*K2)) then
-                        do j = 1,37       
-                           rg2st(j) = rg2(j)
-                        enddo
-                        open(1,file='mass_12.0000.dat')
-                        nptmss = 720
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss=1,720
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0151*K2).and.(m(1).ge.0.0149*K2)) then
-                        do j = 1,37       
-                           rg2st(j) = rg3(j)
-                        enddo
-                        open(1,file='mass_15.0000.dat')
-                        nptmss = 856
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss=1,856
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0201*K2).and.(m(1).ge.0.0199*K2)) then
-                        do j = 1,37       
-                           rg2st(j) = rg4(j)
-                        enddo
-                        open(1,file='mass_20.0000.dat')
-                        nptmss = 864
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss =1,864
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0301*K2).and.(m(1).ge.0.0299*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg5(j)
-                        enddo
-                        open(1,file='mass_30.0000.dat')
-                        nptmss = 878
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss=1,878
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0401*K2).and.(m(1).ge.0.0399*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg6(j)
-                        enddo
-                        open(1,file='mass_40.0000.dat')
-                        nptmss = 886
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss = 1,886
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)  
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0501*K2).and.(m(1).ge.0.0499*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg7(j)
-                        enddo
-                        open(1,file='mass_50.0000.dat')
-                        nptmss = 891
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss=1,891
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0601*K2).and.(m(1).ge.0.0599*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg8(j)
-                        enddo
-                        open(1,file='mass_60.0000.dat')
-                        nptmss = 1663
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss=1,1663
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0701*K2).and.(m(1).ge.0.0699*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg9(j)
-                        enddo
-                        open(1,file='mass_70.0000.dat')
-                        nptmss = 3585
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss =1,3585
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0721*K2).and.(m(1).ge.0.0719*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg10(j)
-                        enddo
-                        open(1,file='mass_72.0000.dat')
-                        nptmss = 3721
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss =1,3721
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0751*K2).and.(m(1).ge.0.0749*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg11(j)
-                        enddo
-                        open(1,file='mass_75.0000.dat')
-                        nptmss = 3903
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss =1,3903
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-
-                    else if ((m(1).le.0.0801*K2).and.(m(1).ge.0.0799*K2)) then
-                        do j = 1,37       
-                            rg2st(j) = rg12(j)
-                        enddo
-                        open(1,file='mass_80.0000.dat')
-                        nptmss = 4161
-                        allocate( timeBD(nptmss) )
-                        allocate( radiusBD(nptmss))
-                        allocate( lumiBD(nptmss) )
-                        allocate( HZinGJ(nptmss) )
-                        allocate( HZoutGJ(nptmss))
-                        allocate( HZinb(nptmss)  )
-                        allocate( HZoutb(nptmss) )
-                        do nptmss =1,4161
-                           read(1,*,iostat=error)timeBD(nptmss),radiusBD(nptmss),lumiBD(nptmss), &
-                                HZinGJ(nptmss),HZoutGJ(nptmss),HZinb(nptmss),HZoutb(nptmss)
-                        end do
-                        nptmss = nptmss - 1
-                    endif
+                    ! BD's radius and radius of gyration for its mass, listed in BD_INDEX_FILE
+                    call read_BD_tables(m(1)/K2,nptmss,timeBD,radiusBD,trg2,rg2st,k2BD,Ps0BD)
                 endif
 
                 ! Charge file of radius of Mdwarf 
@@ -625,55 +415,8 @@ module user_module
                 if (brown_dwarf.eq.1) then 
                     
                     ! Here defining k2s and initial rotation period of BD
-                    if ((m(1).le.0.0101*K2).and.(m(1).ge.0.0099*K2)) then
-                        iPs0 = 1
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0121*K2).and.(m(1).ge.0.0119*K2)) then
-                        iPs0 = 2
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0151*K2).and.(m(1).ge.0.0149*K2)) then
-                        iPs0 = 3
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0201*K2).and.(m(1).ge.0.0199*K2)) then    
-                        iPs0 = 4
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0301*K2).and.(m(1).ge.0.0299*K2)) then
-                        iPs0 = 5
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0401*K2).and.(m(1).ge.0.0399*K2)) then
-                        iPs0 = 6
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0501*K2).and.(m(1).ge.0.0499*K2)) then
-                        iPs0 = 7
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0601*K2).and.(m(1).ge.0.0599*K2)) then
-                        iPs0 = 8
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0701*K2).and.(m(1).ge.0.0699*K2)) then
-                        iPs0 = 9
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0721*K2).and.(m(1).ge.0.0719*K2)) then
-                        iPs0 = 10
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0751*K2).and.(m(1).ge.0.0749*K2)) then
-                        iPs0 = 11
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    else if ((m(1).le.0.0801*K2).and.(m(1).ge.0.0799*K2)) then
-                        iPs0 = 12
-                        k2s  = k2st(iPs0)
-                        Pst0 = Ps0(iPs0)
-                    endif
+                    k2s  = k2BD
+                    Pst0 = Ps0BD
 
                     ! Fluid Love number = potential Love number 
                     k2fs = k2s
@@ -684,14 +427,14 @@ module user_module
                     ! gyration
                     if (crash.eq.0) then
                         ! Determination of the radius at time = t_init
-                        call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time,Rstb0)
+                        call spline_b_val(nptmss,timeBD,radiusBD,time,Rstb0)
                         ! Determination of the radius of gyration at time = t_init
-                        call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time,rg2s0)
+                        call spline_b_val(37,trg2,rg2st,time,rg2s0)
                     else
                         ! Determination of the radius at time = t_crash
-                        call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-t_crash,Rstb0)
+                        call spline_b_val(nptmss,timeBD,radiusBD,time-t_crash,Rstb0)
                         ! Determination of the radius of gyration at time = t_crash
-                        call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-t_crash,rg2s0)
+                        call spline_b_val(37,trg2,rg2st,time-t_crash,rg2s0)
                     endif
                     Rst0    = Rsun * Rstb0
                     Rst0_5  = Rst0*Rst0*Rst0*Rst0*Rst0
@@ -1037,24 +780,24 @@ module user_module
 
                 if (crash.eq.0) then
                     if (ispin.eq.0) then 
-                        call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-dt,Rstb0)
-                        call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-dt,rg2s0)
+                        call spline_b_val(nptmss,timeBD,radiusBD,time-dt,Rstb0)
+                        call spline_b_val(37,trg2,rg2st,time-dt,rg2s0)
                     endif
-                    call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-hdt,Rstbh)
-                    call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time,Rstb)
+                    call spline_b_val(nptmss,timeBD,radiusBD,time-hdt,Rstbh)
+                    call spline_b_val(nptmss,timeBD,radiusBD,time,Rstb)
                     
-                    call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-hdt,rg2sh)
-                    call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time,rg2s)
+                    call spline_b_val(37,trg2,rg2st,time-hdt,rg2sh)
+                    call spline_b_val(37,trg2,rg2st,time,rg2s)
                 else
                     if (ispin.eq.0) then 
-                        call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-t_crash-dt,Rstb0)
-                        call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-t_crash-dt,rg2s0)
+                        call spline_b_val(nptmss,timeBD,radiusBD,time-t_crash-dt,Rstb0)
+                        call spline_b_val(37,trg2,rg2st,time-t_crash-dt,rg2s0)
                     endif
-                    call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-t_crash-hdt,Rstbh)
-                    call spline_b_val(nptmss,timeBD*365.25d0-t_init,radiusBD,time-t_crash,Rstb)
+                    call spline_b_val(nptmss,timeBD,radiusBD,time-t_crash-hdt,Rstbh)
+                    call spline_b_val(nptmss,timeBD,radiusBD,time-t_crash,Rstb)
 
-                    call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-t_crash-hdt,rg2sh)
-                    call spline_b_val(37,trg2*365.25d0-t_init,rg2st,time-t_crash,rg2s)
+                    call spline_b_val(37,trg2,rg2st,time-t_crash-hdt,rg2sh)
+                    call spline_b_val(37,trg2,rg2st,time-t_crash,rg2s)
                 endif
 
                 if (ispin.eq.0) Rst0 = Rsun * Rstb0
@@ -2261,6 +2004,18 @@ module user_module
         sum_F_GR_y = 0.0d0
         sum_F_GR_z = 0.0d0
 
+        ! Distances, powers and velocities are computed once for all the planets,
+        ! then each force is computed for all the planets at once
+        call planet_powers (ntid+1,xh,vh,r_2,rr,r_5,r_7,r_8,v_2,norm_v,v_rad)
+        ! Here I call subroutines that give the total tidal force, rotation flattening
+        ! induced force and GR force
+        if (tides.eq.1) call F_tides_tot (ntid+1,m,xh,vh,spin,rr,r_7,r_8,v_rad &
+                 ,Rsth5,Rsth10,k2s,sigmast,Rp5,Rp10,k2fp,sigmap,F_tid)
+        if (rot_flat.eq.1) call F_rotation (ntid+1,m,xh,spin,r_5,r_7 &
+                 ,Rsth5,k2fs,Rp5,k2fp,F_rot)
+        if (GenRel.eq.1) call F_GenRel (ntid+1,m,xh,vh,r_2,rr,v_2,norm_v,v_rad &
+                 ,tintin,C2,F_GR)
+
         ! The acceleration in the heliocentric coordinate is not just F/m,
         ! it must be the reduced mass, and the effect of other planets on the
         ! star also has to be removed, see in article for explanation
@@ -2270,19 +2025,14 @@ module user_module
             if (tides.eq.1) then 
                 tmp  = K2/m(j)
                 tmp1 = K2/m(1) 
-                ! Here I call subroutine that gives the total tidal force
-                call F_tides_tot (nbod,m,xh(1,j),xh(2,j),xh(3,j),vh(1,j),vh(2,j),vh(3,j),spin &
-                     ,Rsth5,Rsth10,k2s,sigmast &
-                     ,Rp5(j),Rp10(j),k2fp(j-1),k2p(j-1),sigmap(j) &
-                     ,j,F_tid_tot_x,F_tid_tot_y,F_tid_tot_z)
                 ! Calculation of the acceleration     
-                a1(1,j) = tmp*F_tid_tot_x
-                a1(2,j) = tmp*F_tid_tot_y
-                a1(3,j) = tmp*F_tid_tot_z
+                a1(1,j) = tmp*F_tid(1,j)
+                a1(2,j) = tmp*F_tid(2,j)
+                a1(3,j) = tmp*F_tid(3,j)
                 ! Calculation of the sum of the acceleration of all planets
-                sum_F_tid_x = sum_F_tid_x + tmp1*F_tid_tot_x
-                sum_F_tid_y = sum_F_tid_y + tmp1*F_tid_tot_y
-                sum_F_tid_z = sum_F_tid_z + tmp1*F_tid_tot_z
+                sum_F_tid_x = sum_F_tid_x + tmp1*F_tid(1,j)
+                sum_F_tid_y = sum_F_tid_y + tmp1*F_tid(2,j)
+                sum_F_tid_z = sum_F_tid_z + tmp1*F_tid(3,j)
             else
                 a1(1,j) = 0.0d0
                 a1(2,j) = 0.0d0
@@ -2292,19 +2042,14 @@ module user_module
             if (rot_flat.eq.1) then 
                 tmp  = K2/m(j)
                 tmp1 = K2/m(1) 
-                ! Here I call subroutine that gives the total rotation flattening
-                ! induced force
-                call F_rotation (nbod,m,xh(1,j),xh(2,j),xh(3,j),spin &
-                     ,Rsth5,k2fs,Rp5(j),k2fp(j-1) &
-                     ,j,F_rot_tot_x,F_rot_tot_y,F_rot_tot_z)
                 ! Calculation of the acceleration     
-                a2(1,j) = tmp*F_rot_tot_x
-                a2(2,j) = tmp*F_rot_tot_y
-                a2(3,j) = tmp*F_rot_tot_z
+                a2(1,j) = tmp*F_rot(1,j)
+                a2(2,j) = tmp*F_rot(2,j)
+                a2(3,j) = tmp*F_rot(3,j)
                 ! Calculation of the sum of the acceleration of all planets
-                sum_F_rot_x = sum_F_rot_x + tmp1*F_rot_tot_x
-                sum_F_rot_y = sum_F_rot_y + tmp1*F_rot_tot_y
-                sum_F_rot_z = sum_F_rot_z + tmp1*F_rot_tot_z
+                sum_F_rot_x = sum_F_rot_x + tmp1*F_rot(1,j)
+                sum_F_rot_y = sum_F_rot_y + tmp1*F_rot(2,j)
+                sum_F_rot_z = sum_F_rot_z + tmp1*F_rot(3,j)
             else
                 a2(1,j) = 0.0d0
                 a2(2,j) = 0.0d0
@@ -2314,17 +2059,14 @@ module user_module
             if (GenRel.eq.1) then 
                 tmp  = K2/m(j)
                 tmp1 = K2/m(1) 
-                ! Here I call subroutine that gives the total GR force
-                call F_GenRel (nbod,m,xh(1,j),xh(2,j),xh(3,j),vh(1,j),vh(2,j),vh(3,j) &
-                     ,tintin(j),C2,j,F_GR_tot_x,F_GR_tot_y,F_GR_tot_z)
                 ! Calculation of the acceleration     
-                a3(1,j) = tmp*F_GR_tot_x
-                a3(2,j) = tmp*F_GR_tot_y
-                a3(3,j) = tmp*F_GR_tot_z
+                a3(1,j) = tmp*F_GR(1,j)
+                a3(2,j) = tmp*F_GR(2,j)
+                a3(3,j) = tmp*F_GR(3,j)
                 ! Calculation of the sum of the acceleration of all planets
-                sum_F_GR_x = sum_F_GR_x + tmp1*F_GR_tot_x
-                sum_F_GR_y = sum_F_GR_y + tmp1*F_GR_tot_y
-                sum_F_GR_z = sum_F_GR_z + tmp1*F_GR_tot_z
+                sum_F_GR_x = sum_F_GR_x + tmp1*F_GR(1,j)
+                sum_F_GR_y = sum_F_GR_y + tmp1*F_GR(2,j)
+                sum_F_GR_z = sum_F_GR_z + tmp1*F_GR(3,j)
             else
                 a3(1,j) = 0.0d0
                 a3(2,j) = 0.0d0
@@ -2346,59 +2088,21 @@ module user_module
         !---------------------------------------------------------------------------
 
         if ((flagbug.ge.1).and.((tides.eq.1).or.(rot_flat.eq.1))) then          
-            if (crash.eq.0) then
-                if (time.ge.timestep) then
-                    open(13, file="spins.out", access="append")
-                    write(13,'(8("  ", es20.10e3))') time/365.25d0,spin(1,1),spin(2,1),spin(3,1),Rst/rsun,rg2s,k2s,sigmast
-                    close(13)
-                    do j=2,ntid+1
-                        write(planet_spin_filename,('(a,i1,a)')) 'spinp',j-1,'.out'
-                        write(planet_orbt_filename,('(a,i1,a)')) 'horb',j-1,'.out'
-                        write(planet_dEdt_filename,('(a,i1,a)')) 'dEdt',j-1,'.out'
-                        open(13, file=planet_spin_filename, access='append')
-                        write(13,'(6("  ", es20.10e3))') time/365.25d0,spin(1,j),spin(2,j),spin(3,j),Rp(j)/rsun,rg2p(j-1)
-                        close(13)
-                        open(13, file=planet_orbt_filename, access='append')
-                        write(13,'(4("  ", es20.10e3))') time/365.25d0,horb(1,j),horb(2,j),horb(3,j)
-                        close(13)
-                        if (tides.eq.1) then
-                            ! Here I calculate the instantaneous energy loss in Msun.AU^2.day^-3
-                            call dEdt_tides (nbod,m,xh(1,j),xh(2,j),xh(3,j),vh(1,j),vh(2,j),vh(3,j),spin &
-                                 ,Rp10(j),sigmap(j),j,tmp_dEdt)
-                        endif
-                        open(13, file=planet_dEdt_filename, access='append')
-                        write(13,'(4("  ", es20.10e3))') time/365.25d0,tmp_dEdt
-                        close(13)
-                    enddo
-                    timestep = timestep + output*365.25d0
-                endif
-            endif
-            if (crash.eq.1) then
-                if (time.ge.timestep) then
-                    open(13, file="spins.out", access="append")
-                    write(13,'(8("  ", es20.10e3))') time/365.25d0,spin(1,1),spin(2,1),spin(3,1),Rst/rsun,rg2s,k2s,sigmast
-                    close(13)
-                    do j=2,ntid+1
-                        write(planet_spin_filename,('(a,i1,a)')) 'spinp',j-1,'.out'
-                        write(planet_orbt_filename,('(a,i1,a)')) 'horb',j-1,'.out'
-                        write(planet_dEdt_filename,('(a,i1,a)')) 'dEdt',j-1,'.out'
-                        open(13, file=planet_spin_filename, access='append')
-                        write(13,'(6("  ", es20.10e3))') time/365.25d0,spin(1,j),spin(2,j),spin(3,j),Rp(j)/rsun,rg2p(j-1)
-                        close(13)
-                        open(13, file=planet_orbt_filename, access='append')
-                        write(13,'(4("  ", es20.10e3))') time/365.25d0,horb(1,j),horb(2,j),horb(3,j)
-                        close(13)
-                        if (tides.eq.1) then
-                            ! Here I calculate the instantaneous energy loss in Msun.AU^2.day^-3
-                            call dEdt_tides (nbod,m,xh(1,j),xh(2,j),xh(3,j),vh(1,j),vh(2,j),vh(3,j),spin &
-                                 ,Rp10(j),sigmap(j),j,tmp_dEdt)
-                        endif
-                        open(13, file=planet_dEdt_filename, access='append')
-                        write(13,'(4("  ", es20.10e3))') time/365.25d0,tmp_dEdt
-                        close(13)
-                    enddo
-                    timestep = timestep + output*365.25d0
-                endif
+            if (time.ge.timestep) then
+                ! The outputs are stored, and written in blocks by flush_tidal_outputs
+                if (nb_tidal_outputs.eq.TIDAL_BUFFER_SIZE) call flush_tidal_outputs ()
+                nb_tidal_outputs = nb_tidal_outputs + 1
+                star_outputs(:,nb_tidal_outputs) = (/time/365.25d0,spin(1,1),spin(2,1),spin(3,1),Rst/rsun,rg2s,k2s,sigmast/)
+                do j=2,ntid+1
+                    if (tides.eq.1) then
+                        ! Here I calculate the instantaneous energy loss in Msun.AU^2.day^-3
+                        call dEdt_tides (nbod,m,xh(1,j),xh(2,j),xh(3,j),vh(1,j),vh(2,j),vh(3,j),spin &
+                             ,Rp10(j),sigmap(j),j,tmp_dEdt)
+                    endif
+                    planet_outputs(:,j-1,nb_tidal_outputs) = (/spin(1,j),spin(2,j),spin(3,j),Rp(j)/rsun,rg2p(j-1), &
+                         horb(1,j),horb(2,j),horb(3,j),tmp_dEdt/)
+                enddo
+                timestep = timestep + output*365.25d0
             endif
         endif    
 
@@ -2498,6 +2202,319 @@ module user_module
       return
   end subroutine conversion_dh2h
 
+  !-----------------------------------------------------------------------------
+  ! Write the outputs stored by mfo_user in spins.out, spinpi.out, horbi.out and
+  ! dEdti.out (.bin instead of .out if binary_output=1). The files are opened once
+  ! (in append mode, as the restart needs) and stay opened. Called when the buffer
+  ! is full, and by mio_dump so that the files are complete at each dump and at
+  ! the end of the integration.
+  subroutine flush_tidal_outputs ()
+
+      use tides_constant_GR, only : binary_output
+
+      implicit none
+      ! Local
+      integer :: i,k,unit
+      character(len=80) :: filename
+      !-------------------------------------------------------------------------
+      if (nb_tidal_outputs.eq.0) return
+
+      if (.not.isTidalOpened) then
+          call open_tidal_file (TIDAL_UNIT,'spins',0,STAR_COLUMNS)
+          do i=1,ntid
+              write(filename,('(a,i1)')) 'spinp',i
+              call open_tidal_file (TIDAL_UNIT+3*i-2,trim(filename),i,SPIN_COLUMNS)
+              write(filename,('(a,i1)')) 'horb',i
+              call open_tidal_file (TIDAL_UNIT+3*i-1,trim(filename),i,HORB_COLUMNS)
+              write(filename,('(a,i1)')) 'dEdt',i
+              call open_tidal_file (TIDAL_UNIT+3*i,trim(filename),i,DEDT_COLUMNS)
+          enddo
+          isTidalOpened = .true.
+      endif
+
+      if (binary_output.eq.1) then
+          write(TIDAL_UNIT) star_outputs(:,1:nb_tidal_outputs)
+          flush(TIDAL_UNIT)
+          do i=1,ntid
+              unit = TIDAL_UNIT+3*i-2
+              write(unit) (star_outputs(1,k),planet_outputs(1:5,i,k),k=1,nb_tidal_outputs)
+              flush(unit)
+              unit = TIDAL_UNIT+3*i-1
+              write(unit) (star_outputs(1,k),planet_outputs(6:8,i,k),k=1,nb_tidal_outputs)
+              flush(unit)
+              unit = TIDAL_UNIT+3*i
+              write(unit) (star_outputs(1,k),planet_outputs(9,i,k),k=1,nb_tidal_outputs)
+              flush(unit)
+          enddo
+      else
+          do k=1,nb_tidal_outputs
+              write(TIDAL_UNIT,'(8("  ", es20.10e3))') star_outputs(:,k)
+          enddo
+          flush(TIDAL_UNIT)
+          do i=1,ntid
+              unit = TIDAL_UNIT+3*i-2
+              do k=1,nb_tidal_outputs
+                  write(unit,'(6("  ", es20.10e3))') star_outputs(1,k),planet_outputs(1:5,i,k)
+              enddo
+              flush(unit)
+              unit = TIDAL_UNIT+3*i-1
+              do k=1,nb_tidal_outputs
+                  write(unit,'(4("  ", es20.10e3))') star_outputs(1,k),planet_outputs(6:8,i,k)
+              enddo
+              flush(unit)
+              unit = TIDAL_UNIT+3*i
+              do k=1,nb_tidal_outputs
+                  write(unit,'(4("  ", es20.10e3))') star_outputs(1,k),planet_outputs(9,i,k)
+              enddo
+              flush(unit)
+          enddo
+      endif
+      nb_tidal_outputs = 0
+      !-------------------------------------------------------------------------
+      return
+  end subroutine flush_tidal_outputs
+
+  !-----------------------------------------------------------------------------
+  ! Open one of the tidal outputs in append mode: name.out, or name.bin if
+  ! binary_output=1. A new binary file starts with its header (see TIDAL_MAGIC)
+  subroutine open_tidal_file (unit,name,planet,columns)
+
+      use tides_constant_GR, only : binary_output,crash
+
+      implicit none
+      ! Input/Output
+      integer, intent(in) :: unit,planet
+      character(len=*), intent(in) :: name
+      character(len=16), dimension(:), intent(in) :: columns
+      ! Local
+      logical :: isExisting
+      integer :: header_size
+      !-------------------------------------------------------------------------
+      if (binary_output.eq.1) then
+          ! A fresh start replaces the previous file, a continued integration (from the dumps, or after a 
+          ! crash) appends to it
+          if (is_continued.or.(crash.eq.1)) then
+              inquire(file=name//'.bin', exist=isExisting)
+              open(unit, file=name//'.bin', access='stream', form='unformatted', position='append', &
+                   convert='little_endian')
+          else
+              isExisting = .false.
+              open(unit, file=name//'.bin', access='stream', form='unformatted', status='replace', &
+                   convert='little_endian')
+          endif
+          if (.not.isExisting) then
+              header_size = len(TIDAL_MAGIC)+4*4+16*size(columns)
+              write(unit) TIDAL_MAGIC,int(TIDAL_VERSION,int32),int(planet,int32),int(size(columns),int32), &
+                   int(header_size,int32),columns
+          endif
+      else
+          open(unit, file=name//'.out', access='append')
+      endif
+      !-------------------------------------------------------------------------
+      return
+  end subroutine open_tidal_file
+
+  !-----------------------------------------------------------------------------
+  ! Tables of a brown dwarf of a given mass : radius and radius of gyration as a
+  ! function of time, love number and initial rotation period.
+  ! The tables available are listed in BD_INDEX_FILE, one line per mass:
+  ! mass (Msun), table of the radius, number of rows, table of the radius of
+  ! gyration, column of the BD in it, love number, initial rotation period (hours)
+  ! If the mass is within 1% of one of them, its tables are used. Else, the
+  ! tables of the two masses around are interpolated linearly in mass, on the
+  ! time grid of the lower one (generate_host_table.py can also write such a
+  ! table in advance). Times are returned in days, relative to t_init, i.e. as
+  ! used by spline_b_val in mfo_user.
+  subroutine read_BD_tables (mass,nb_points,time_BD,radius_BD,time_rg2,rg2_BD,k2_BD,Ps0_BD)
+
+      use tides_constant_GR, only : t_init
+      use spline
+
+      implicit none
+      ! Input/Output
+      real(double_precision),intent(in) :: mass
+      integer,intent(out) :: nb_points
+      real(double_precision), dimension(:), allocatable, intent(inout) :: time_BD,radius_BD
+      real(double_precision), dimension(NB_RG2), intent(out) :: time_rg2,rg2_BD
+      real(double_precision), intent(out) :: k2_BD,Ps0_BD
+      ! Local
+      ! For each bound (1: lower mass, 2: upper mass), the line of the index
+      integer :: j,error,nb_rows,column
+      integer, dimension(2) :: nb_rows_b,column_b
+      real(double_precision) :: weight,mass_table,k2_table,Ps0_table,radius_up
+      real(double_precision), dimension(2) :: mass_b,k2_b,Ps0_b
+      character(len=200) :: line
+      character(len=80) :: radius_file,rg2_file
+      character(len=80), dimension(2) :: radius_file_b,rg2_file_b
+      real(double_precision), dimension(:), allocatable :: time_low,radius_low,time_up,radius_up_table
+      real(double_precision), dimension(NB_RG2) :: time_rg2_up,rg2_up
+      !-------------------------------------------------------------------------
+      mass_b(1) = -1.d0
+      mass_b(2) = HUGE
+      weight = -1.d0
+
+      open(1,file=BD_INDEX_FILE,status='old',iostat=error)
+      if (error.ne.0) then
+          write(*,*) "Error: the index of the brown dwarf tables '",BD_INDEX_FILE,"' does not exist"
+          stop
+      endif
+      do
+          read(1,'(a)',iostat=error) line
+          if (error.ne.0) exit
+          line = adjustl(line)
+          if ((len_trim(line).eq.0).or.(line(1:1).eq.'!')) cycle
+          read(line,*,iostat=error) mass_table,radius_file,nb_rows,rg2_file,column,k2_table,Ps0_table
+          if (error.ne.0) then
+              write(*,*) "Error: can't read the line '",trim(line),"' of ",BD_INDEX_FILE
+              stop
+          endif
+
+          if (abs(mass_table-mass).le.0.01d0*mass_table) then
+              j = 1
+              weight = 0.d0
+          else if ((mass_table.lt.mass).and.(mass_table.gt.mass_b(1))) then
+              j = 1
+          else if ((mass_table.gt.mass).and.(mass_table.lt.mass_b(2))) then
+              j = 2
+          else
+              cycle
+          endif
+          mass_b(j) = mass_table
+          radius_file_b(j) = radius_file
+          nb_rows_b(j) = nb_rows
+          rg2_file_b(j) = rg2_file
+          column_b(j) = column
+          k2_b(j) = k2_table
+          Ps0_b(j) = Ps0_table
+          if (weight.eq.0.d0) exit
+      end do
+      close(1)
+
+      if (weight.eq.0.d0) then
+          ! Tables of this mass
+          nb_points = nb_rows_b(1)
+          if (allocated(time_BD)) deallocate(time_BD,radius_BD)
+          allocate(time_BD(nb_points),radius_BD(nb_points))
+          call read_BD_radius(radius_file_b(1),nb_points,time_BD,radius_BD)
+          call read_BD_rg2(rg2_file_b(1),column_b(1),time_rg2,rg2_BD)
+          k2_BD = k2_b(1)
+          Ps0_BD = Ps0_b(1)
+      else
+          if ((mass_b(1).lt.0.d0).or.(mass_b(2).eq.HUGE)) then
+              write(*,*) "Error: the mass of the brown dwarf (",mass," Msun) is outside the masses of ",BD_INDEX_FILE
+              stop
+          endif
+          weight = (mass-mass_b(1))/(mass_b(2)-mass_b(1))
+
+          allocate(time_low(nb_rows_b(1)),radius_low(nb_rows_b(1)))
+          allocate(time_up(nb_rows_b(2)),radius_up_table(nb_rows_b(2)))
+          call read_BD_radius(radius_file_b(1),nb_rows_b(1),time_low,radius_low)
+          call read_BD_radius(radius_file_b(2),nb_rows_b(2),time_up,radius_up_table)
+
+          ! Times of the lower mass that are also in the table of the upper mass
+          nb_points = 0
+          do j = 1, nb_rows_b(1)
+              if ((time_low(j).ge.time_up(1)).and.(time_low(j).le.time_up(nb_rows_b(2)))) nb_points = nb_points + 1
+          end do
+          if (allocated(time_BD)) deallocate(time_BD,radius_BD)
+          allocate(time_BD(nb_points),radius_BD(nb_points))
+          nb_points = 0
+          do j = 1, nb_rows_b(1)
+              if ((time_low(j).ge.time_up(1)).and.(time_low(j).le.time_up(nb_rows_b(2)))) then
+                  nb_points = nb_points + 1
+                  call spline_b_val(nb_rows_b(2),time_up,radius_up_table,time_low(j),radius_up)
+                  time_BD(nb_points) = time_low(j)
+                  radius_BD(nb_points) = (1.d0-weight)*radius_low(j) + weight*radius_up
+              endif
+          end do
+          deallocate(time_low,radius_low,time_up,radius_up_table)
+
+          call read_BD_rg2(rg2_file_b(1),column_b(1),time_rg2,rg2_BD)
+          call read_BD_rg2(rg2_file_b(2),column_b(2),time_rg2_up,rg2_up)
+          do j = 1, NB_RG2
+              if (time_rg2_up(j).ne.time_rg2(j)) then
+                  write(*,*) "Error: the radius of gyration of ",trim(rg2_file_b(1))," and ",trim(rg2_file_b(2)), &
+                             " are not given at the same times"
+                  stop
+              endif
+              rg2_BD(j) = (1.d0-weight)*rg2_BD(j) + weight*rg2_up(j)
+          end do
+
+          k2_BD = (1.d0-weight)*k2_b(1) + weight*k2_b(2)
+          Ps0_BD = (1.d0-weight)*Ps0_b(1) + weight*Ps0_b(2)
+          write(*,*) 'Brown dwarf tables interpolated between',mass_b(1),' and',mass_b(2),' Msun'
+      endif
+
+      ! Tables are in years, spline_b_val is used in days, from t_init
+      time_BD = time_BD*365.25d0-t_init
+      time_rg2 = time_rg2*365.25d0-t_init
+      !-------------------------------------------------------------------------
+      return
+  end subroutine read_BD_tables
+
+  !-----------------------------------------------------------------------------
+  ! Radius (Rsun) of a brown dwarf as a function of time (years), in the
+  ! first two columns of the table (the following ones are not used)
+  subroutine read_BD_radius (filename,nb_points,time_BD,radius_BD)
+
+      implicit none
+      ! Input/Output
+      character(len=*),intent(in) :: filename
+      integer,intent(in) :: nb_points
+      real(double_precision), dimension(nb_points), intent(out) :: time_BD,radius_BD
+      ! Local
+      integer :: j,error
+      !-------------------------------------------------------------------------
+      open(1,file=filename,status='old',iostat=error)
+      if (error.ne.0) then
+          write(*,*) "Error: the brown dwarf table '",trim(filename),"' does not exist"
+          stop
+      endif
+      do j = 1, nb_points
+          read(1,*,iostat=error) time_BD(j),radius_BD(j)
+          if (error.ne.0) then
+              write(*,*) "Error: ",trim(filename)," has less than",nb_points," rows, as given in ",BD_INDEX_FILE
+              stop
+          endif
+      end do
+      close(1)
+      !-------------------------------------------------------------------------
+      return
+  end subroutine read_BD_radius
+
+  !-----------------------------------------------------------------------------
+  ! Radius of gyration of a brown dwarf as a function of time (years) : the
+  ! first column of the table is the time, column is the one of the BD
+  subroutine read_BD_rg2 (filename,column,time_rg2,rg2_BD)
+
+      implicit none
+      ! Input/Output
+      character(len=*),intent(in) :: filename
+      integer,intent(in) :: column
+      real(double_precision), dimension(NB_RG2), intent(out) :: time_rg2,rg2_BD
+      ! Local
+      integer :: j,k,error
+      real(double_precision), dimension(column) :: row
+      !-------------------------------------------------------------------------
+      open(1,file=filename,status='old',iostat=error)
+      if (error.ne.0) then
+          write(*,*) "Error: the brown dwarf table '",trim(filename),"' does not exist"
+          stop
+      endif
+      do j = 1, NB_RG2
+          read(1,*,iostat=error) (row(k), k=1,column)
+          if (error.ne.0) then
+              write(*,*) "Error: can't read the column",column," of the row",j," of ",trim(filename)
+              stop
+          endif
+          time_rg2(j) = row(1)
+          rg2_BD(j) = row(column)
+      end do
+      close(1)
+      !-------------------------------------------------------------------------
+      return
+  end subroutine read_BD_rg2
+
   !-----------------------------------------------------------------------------
   ! Calculation of r(j), powers of r(j)
   ! Distances in AU
@@ -2536,6 +2553,36 @@ module user_module
       return
   end subroutine velocities
 
+  !-----------------------------------------------------------------------------
+  ! Same as rad_power and velocities, for the planets 2 to n at once. The
+  ! results are shared by all the forces (F_tides_tot, F_rotation, F_GenRel)
+  subroutine planet_powers (n,xh,vh,r_2,rr,r_5,r_7,r_8,v_2,norm_v,v_rad)
+
+      implicit none
+      ! Input/Output
+      integer,intent(in) :: n
+      real(double_precision),intent(in) :: xh(3,n),vh(3,n)
+      real(double_precision), dimension(n), intent(out) :: r_2,rr,r_5,r_7,r_8,v_2,norm_v,v_rad
+      ! Local
+      integer :: j
+      real(double_precision) :: r_4
+      !-------------------------------------------------------------------------
+      do j = 2, n
+          r_2(j) = xh(1,j)*xh(1,j)+xh(2,j)*xh(2,j)+xh(3,j)*xh(3,j)
+          rr(j)  = sqrt(r_2(j))
+          r_4    = r_2(j)*r_2(j)
+          r_5(j) = r_4*rr(j)
+          r_7(j) = r_4*r_2(j)*rr(j)
+          r_8(j) = r_4*r_4
+          v_2(j)    = vh(1,j)*vh(1,j)+vh(2,j)*vh(2,j)+vh(3,j)*vh(3,j)
+          norm_v(j) = sqrt(v_2(j))
+          ! Radial velocity
+          v_rad(j)  = (xh(1,j)*vh(1,j)+xh(2,j)*vh(2,j)+xh(3,j)*vh(3,j))/rr(j)
+      end do
+      !-------------------------------------------------------------------------
+      return
+  end subroutine planet_powers
+
   !-----------------------------------------------------------------------------
   ! Calculation of r scalar spin
   subroutine r_scal_spin (xhx,xhy,xhz,spinx,spiny,spinz,rscalspin)
@@ -2577,34 +2624,6 @@ module user_module
   ! Ftidos and Ftidop in Msun.AU.day-1
   ! K2 = G in AU^3.Msun-1.day-2
 
-  !-----------------------------------------------------------------------------
-  ! Conservative part of the radial tidal force
-  subroutine F_tides_rad_cons (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
-         ,R_star5,k2_star &
-         ,R_plan5,k2f_plan,j,Ftidr_cons)
-
-      use physical_constant
-      implicit none
-      ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: R_star5,k2_star
-      real(double_precision),intent(in) :: R_plan5,k2f_plan
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: Ftidr_cons
-      ! Local
-      real(double_precision) :: tmp1,tmp2
-      real(double_precision) :: r_2,rr,r_4,r_5,r_7,r_8
-      !-------------------------------------------------------------------------
-      call rad_power (xhx,xhy,xhz,r_2,rr,r_4,r_5,r_7,r_8)
-      tmp1 = m(1)*m(1)
-      tmp2 = m(j)*m(j)
-      Ftidr_cons =  -3.0d0/(r_7*K2) &
-                *(tmp2*R_star5*k2_star+tmp1*R_plan5*k2f_plan)
-      !-------------------------------------------------------------------------
-      return
-  end subroutine F_tides_rad_cons
-
   !-----------------------------------------------------------------------------
   ! Dissipative part of the radial tidal force
   subroutine F_tides_rad_diss (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
@@ -2636,37 +2655,6 @@ module user_module
       return
   end subroutine F_tides_rad_diss
 
-  !-----------------------------------------------------------------------------
-  ! Sum of the dissipative and conservative part of the radial force
-  subroutine F_tides_rad (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
-         ,R_star5,R_star10,k2_star,sigma_star &
-         ,R_plan5,R_plan10,k2f_plan,k2_plan,sigma_plan,j,Ftidr)
-
-      use physical_constant
-      implicit none
-      ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: sigma_star,sigma_plan
-      real(double_precision),intent(in) :: R_star5,R_star10,k2_star
-      real(double_precision),intent(in) :: R_plan5,R_plan10,k2f_plan,k2_plan
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: Ftidr
-      ! Local
-      real(double_precision) :: Ftidr_cons,Ftidr_diss
-      !-------------------------------------------------------------------------
-      call F_tides_rad_cons (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
-         ,R_star5,k2_star &
-         ,R_plan5,k2f_plan,j,Ftidr_cons)
-      call F_tides_rad_diss (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
-         ,R_star10,sigma_star &
-         ,R_plan10,sigma_plan,j,Ftidr_diss)
- 
-      Ftidr = Ftidr_cons + Ftidr_diss            
-      !-------------------------------------------------------------------------
-      return
-  end subroutine F_tides_rad
-
   !-----------------------------------------------------------------------------
   ! Orthoradial part of the force due to stellar tides
   subroutine F_tides_ortho_star (nbod,m,xhx,xhy,xhz,R_star10 &
@@ -2769,46 +2757,51 @@ module user_module
   end subroutine Torque_tides_s 
 
   !-----------------------------------------------------------------------------
-  ! Total tidal force
-  subroutine F_tides_tot (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,spin &
+  ! Total tidal force on the planets 2 to n (radial part, conservative and
+  ! dissipative, and orthoradial parts due to stellar and planetary tides)
+  subroutine F_tides_tot (n,m,xh,vh,spin,rr,r_7,r_8,v_rad &
        ,R_star5,R_star10,k2_star,sigma_star &
-       ,R_plan5,R_plan10,k2f_plan,k2_plan,sigma_plan,j &
-       ,F_tid_tot_x,F_tid_tot_y,F_tid_tot_z)
+       ,R_plan5,R_plan10,k2f_plan,sigma_plan,F_tid)
 
       use physical_constant
       implicit none
       ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: sigma_star,sigma_plan
-      real(double_precision),intent(in) :: R_star5,R_star10,k2_star
-      real(double_precision),intent(in) :: R_plan5,R_plan10,k2f_plan,k2_plan
-      real(double_precision),intent(in) :: m(nbod),spin(3,10)
-      real(double_precision), intent(out) :: F_tid_tot_x,F_tid_tot_y,F_tid_tot_z
+      integer,intent(in) :: n
+      real(double_precision),intent(in) :: m(n),xh(3,n),vh(3,n),spin(3,10)
+      real(double_precision), dimension(n), intent(in) :: rr,r_7,r_8,v_rad
+      real(double_precision),intent(in) :: R_star5,R_star10,k2_star,sigma_star
+      real(double_precision),intent(in) :: R_plan5(n),R_plan10(n),k2f_plan(n-1),sigma_plan(n)
+      real(double_precision), intent(out) :: F_tid(3,n)
       ! Local
-      real(double_precision) :: tmp1,r_2,rr,r_4,r_5,r_7,r_8,v_2,norm_v,v_rad
-      real(double_precision) :: Ftidr,Ftidos,Ftidop
+      integer :: j
+      real(double_precision) :: K2_2,tmp,tmp1,tmp2
+      real(double_precision) :: Ftidr_cons,Ftidr_diss,Ftidr,Ftidos,Ftidop
       !-------------------------------------------------------------------------
-      call F_tides_rad (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz &
-         ,R_star5,R_star10,k2_star,sigma_star &
-         ,R_plan5,R_plan10,k2f_plan,k2_plan,sigma_plan,j,Ftidr)
-      call F_tides_ortho_star (nbod,m,xhx,xhy,xhz,R_star10 &
-         ,sigma_star,j,Ftidos)
-      call F_tides_ortho_plan (nbod,m,xhx,xhy,xhz,R_plan10,sigma_plan,j,Ftidop)
-      call velocities (xhx,xhy,xhz,vhx,vhy,vhz,v_2,norm_v,v_rad)
-      call rad_power (xhx,xhy,xhz,r_2,rr,r_4,r_5,r_7,r_8)
-
-      tmp1 = Ftidr+(Ftidos+Ftidop)*v_rad/rr
-
-      F_tid_tot_x = (tmp1*xhx/rr &
-           + Ftidos/rr*(spin(2,1)*xhz-spin(3,1)*xhy-vhx) &
-           + Ftidop/rr*(spin(2,j)*xhz-spin(3,j)*xhy-vhx))
-      F_tid_tot_y = (tmp1*xhy/rr &
-           + Ftidos/rr*(spin(3,1)*xhx-spin(1,1)*xhz-vhy) &
-           + Ftidop/rr*(spin(3,j)*xhx-spin(1,j)*xhz-vhy))
-      F_tid_tot_z = (tmp1*xhz/rr &
-           + Ftidos/rr*(spin(1,1)*xhy-spin(2,1)*xhx-vhz) &
-           + Ftidop/rr*(spin(1,j)*xhy-spin(2,j)*xhx-vhz)) 
+      K2_2 = K2*K2
+      tmp1 = m(1)*m(1)
+      do j = 2, n
+          tmp2 = m(j)*m(j)
+          Ftidr_cons = -3.0d0/(r_7(j)*K2) &
+                *(tmp2*R_star5*k2_star+tmp1*R_plan5(j)*k2f_plan(j-1))
+          Ftidr_diss = - 13.5d0*v_rad(j)/(r_8(j)*K2_2) &
+                *(tmp2*R_star10*sigma_star &
+                +tmp1*R_plan10(j)*sigma_plan(j))
+          Ftidr  = Ftidr_cons + Ftidr_diss
+          Ftidos = 4.5d0*m(j)*m(j)*R_star10*sigma_star/(K2_2*r_7(j))
+          Ftidop = 4.5d0*m(1)*m(1)*R_plan10(j)*sigma_plan(j)/(K2_2*r_7(j))
+
+          tmp = Ftidr+(Ftidos+Ftidop)*v_rad(j)/rr(j)
+
+          F_tid(1,j) = (tmp*xh(1,j)/rr(j) &
+               + Ftidos/rr(j)*(spin(2,1)*xh(3,j)-spin(3,1)*xh(2,j)-vh(1,j)) &
+               + Ftidop/rr(j)*(spin(2,j)*xh(3,j)-spin(3,j)*xh(2,j)-vh(1,j)))
+          F_tid(2,j) = (tmp*xh(2,j)/rr(j) &
+               + Ftidos/rr(j)*(spin(3,1)*xh(1,j)-spin(1,1)*xh(3,j)-vh(2,j)) &
+               + Ftidop/rr(j)*(spin(3,j)*xh(1,j)-spin(1,j)*xh(3,j)-vh(2,j)))
+          F_tid(3,j) = (tmp*xh(3,j)/rr(j) &
+               + Ftidos/rr(j)*(spin(1,1)*xh(2,j)-spin(2,1)*xh(1,j)-vh(3,j)) &
+               + Ftidop/rr(j)*(spin(1,j)*xh(2,j)-spin(2,j)*xh(1,j)-vh(3,j)))
+      end do
       !-------------------------------------------------------------------------
       return
   end subroutine F_tides_tot
@@ -2868,40 +2861,6 @@ module user_module
   ! Frot_r in Msun.day-2
   ! Frot_os and Frot_op in Msun.AU.day-1
 
-  !-----------------------------------------------------------------------------
-  ! Radial part of the rotation flattening induced force
-  subroutine F_rot_rad (nbod,m,xhx,xhy,xhz,spin,R_star5,k2_star,R_plan5 &
-         ,k2_plan,j,Frot_r)
-
-      use physical_constant
-      implicit none
-      ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: R_star5,k2_star,R_plan5,k2_plan
-      real(double_precision),intent(in) :: xhx,xhy,xhz
-      real(double_precision),intent(in) :: spin(3,10)
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: Frot_r
-      ! Local
-      real(double_precision) :: Cpi,Csi,rscalspinp,rscalspins
-      real(double_precision) :: normspin_2p,normspin_2s,r_2,rr,r_4,r_5,r_7,r_8
-      !-------------------------------------------------------------------------
-      call rad_power (xhx,xhy,xhz,r_2,rr,r_4,r_5,r_7,r_8)
-      call r_scal_spin (xhx,xhy,xhz,spin(1,j),spin(2,j),spin(3,j),rscalspinp)
-      call r_scal_spin (xhx,xhy,xhz,spin(1,1),spin(2,1),spin(3,1),rscalspins)
-      call norm_spin_2 (spin(1,j),spin(2,j),spin(3,j),normspin_2p)
-      call norm_spin_2 (spin(1,1),spin(2,1),spin(3,1),normspin_2s)
-
-      Cpi = m(1)*k2_plan*normspin_2p*R_plan5/(6.d0*K2)
-      Csi = m(j)*k2_star*normspin_2s*R_star5/(6.d0*K2)
-
-      Frot_r = -3.d0/r_5*(Csi+Cpi) &
-           + 15.d0/r_7*(Csi*rscalspins*rscalspins/normspin_2s &
-           +Cpi*rscalspinp*rscalspinp/normspin_2p)    
-      !-------------------------------------------------------------------------
-      return
-  end subroutine F_rot_rad 
-
   !-----------------------------------------------------------------------------
   ! Orthoradial part of the rotation flattening of the star force
   subroutine F_rot_ortho_s (nbod,m,xhx,xhy,xhz,spinx,spiny,spinz,R_star5 &
@@ -3013,32 +2972,46 @@ module user_module
   end subroutine Torque_rot_s  
 
   !-----------------------------------------------------------------------------
-  ! Force due to the rotational flattening 
-  subroutine F_rotation (nbod,m,xhx,xhy,xhz,spin,R_star5,k2_star,R_plan5 &
-         ,k2_plan,j,F_rot_tot_x,F_rot_tot_y,F_rot_tot_z)
+  ! Force due to the rotational flattening on the planets 2 to n (radial part,
+  ! and orthoradial parts due to the flattening of the star and of the planet)
+  subroutine F_rotation (n,m,xh,spin,r_5,r_7,R_star5,k2_star,R_plan5 &
+         ,k2_plan,F_rot)
 
       use physical_constant
       implicit none
       ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz
+      integer,intent(in) :: n
+      real(double_precision),intent(in) :: m(n),xh(3,n),spin(3,10)
+      real(double_precision), dimension(n), intent(in) :: r_5,r_7
       real(double_precision),intent(in) :: R_star5,k2_star
-      real(double_precision),intent(in) :: R_plan5,k2_plan
-      real(double_precision),intent(in) :: m(nbod),spin(3,10)
-      real(double_precision), intent(out) :: F_rot_tot_x,F_rot_tot_y,F_rot_tot_z
+      real(double_precision),intent(in) :: R_plan5(n),k2_plan(n-1)
+      real(double_precision), intent(out) :: F_rot(3,n)
       ! Local
+      integer :: j
+      real(double_precision) :: Cpi,Csi,rscalspinp,rscalspins,normspin_2p,normspin_2s
       real(double_precision) :: Frot_r,Frot_os,Frot_op
       !-------------------------------------------------------------------------
-      call F_rot_rad (nbod,m,xhx,xhy,xhz,spin,R_star5,k2_star,R_plan5,k2_plan &
-                      ,j,Frot_r)
-      call F_rot_ortho_s (nbod,m,xhx,xhy,xhz,spin(1,1),spin(2,1),spin(3,1) &
-                      ,R_star5,k2_star,j,Frot_os)
-      call F_rot_ortho_p (nbod,m,xhx,xhy,xhz,spin(1,j),spin(2,j),spin(3,j) &
-                      ,R_plan5,k2_plan,j,Frot_op)
-
-      F_rot_tot_x = Frot_r*xhx + Frot_op*spin(1,j) + Frot_os*spin(1,1)
-      F_rot_tot_y = Frot_r*xhy + Frot_op*spin(2,j) + Frot_os*spin(2,1)
-      F_rot_tot_z = Frot_r*xhz + Frot_op*spin(3,j) + Frot_os*spin(3,1)
+      normspin_2s = spin(1,1)*spin(1,1)+spin(2,1)*spin(2,1)+spin(3,1)*spin(3,1)
+      do j = 2, n
+          rscalspinp  = xh(1,j)*spin(1,j)+xh(2,j)*spin(2,j)+xh(3,j)*spin(3,j)
+          rscalspins  = xh(1,j)*spin(1,1)+xh(2,j)*spin(2,1)+xh(3,j)*spin(3,1)
+          normspin_2p = spin(1,j)*spin(1,j)+spin(2,j)*spin(2,j)+spin(3,j)*spin(3,j)
+
+          Cpi = m(1)*k2_plan(j-1)*normspin_2p*R_plan5(j)/(6.d0*K2)
+          Csi = m(j)*k2_star*normspin_2s*R_star5/(6.d0*K2)
+
+          ! Radial part
+          Frot_r = -3.d0/r_5(j)*(Csi+Cpi) &
+               + 15.d0/r_7(j)*(Csi*rscalspins*rscalspins/normspin_2s &
+               +Cpi*rscalspinp*rscalspinp/normspin_2p)
+          ! Orthoradial parts, due to the star and to the planet
+          Frot_os =  -6.d0*Csi*rscalspins/(normspin_2s*r_5(j))
+          Frot_op =  -6.d0*Cpi*rscalspinp/(normspin_2p*r_5(j))
+
+          F_rot(1,j) = Frot_r*xh(1,j) + Frot_op*spin(1,j) + Frot_os*spin(1,1)
+          F_rot(2,j) = Frot_r*xh(2,j) + Frot_op*spin(2,j) + Frot_os*spin(2,1)
+          F_rot(3,j) = Frot_r*xh(3,j) + Frot_op*spin(3,j) + Frot_os*spin(3,1)
+      end do
       !-------------------------------------------------------------------------
       return
   end subroutine F_rotation
@@ -3054,77 +3027,34 @@ module user_module
   ! FGR_rad in AU.day-2 and FGR_ort in day-1
 
   !-----------------------------------------------------------------------------
-  ! Radial part of the GR force (Kidder 1995, Mardling & Lin 2002)
-  subroutine F_GR_rad (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,tintin,C2,j,FGR_rad)
-
-      implicit none
-      ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: tintin,C2
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: FGR_rad
-      ! Local
-      real(double_precision) :: r_2,rr,r_4,r_5,r_7,r_8,v_2,norm_v,v_rad
-      !-------------------------------------------------------------------------
-      call rad_power (xhx,xhy,xhz,r_2,rr,r_4,r_5,r_7,r_8)
-      call velocities (xhx,xhy,xhz,vhx,vhy,vhz,v_2,norm_v,v_rad)
-
-      FGR_rad = -(m(1)+m(j))/(r_2*C2*C2) &
-           *((1.0d0+3.0d0*tintin)*v_2 &  
-           -2.d0*(2.d0+tintin)*(m(1)+m(j))/rr &
-           -1.5d0*tintin*v_rad*v_rad) 
-      !-------------------------------------------------------------------------
-      return
-  end subroutine F_GR_rad
-
-  !-----------------------------------------------------------------------------
-  ! Orthoradial part of the GR force
-  subroutine F_GR_ortho (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,tintin,C2,j,FGR_ort)
-
-      implicit none
-      ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: tintin,C2
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: FGR_ort
-      ! Local
-      real(double_precision) :: r_2,rr,r_4,r_5,r_7,r_8,v_2,norm_v,v_rad
-      !-------------------------------------------------------------------------
-      call rad_power (xhx,xhy,xhz,r_2,rr,r_4,r_5,r_7,r_8)
-      call velocities (xhx,xhy,xhz,vhx,vhy,vhz,v_2,norm_v,v_rad)
-
-      FGR_ort = (m(1)+m(j))/(r_2*C2*C2) &
-                    *2.0d0*(2.0d0-tintin)*v_rad*norm_v 
-      !-------------------------------------------------------------------------
-      return
-  end subroutine F_GR_ortho
-
-  !-----------------------------------------------------------------------------
-  ! GR force
-  subroutine F_GenRel (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,tintin,C2,j &
-         ,F_GR_tot_x,F_GR_tot_y,F_GR_tot_z)
+  ! GR force on the planets 2 to n (Kidder 1995, Mardling & Lin 2002)
+  subroutine F_GenRel (n,m,xh,vh,r_2,rr,v_2,norm_v,v_rad,tintin,C2,F_GR)
 
       implicit none
       ! Input/Output
-      integer,intent(in) :: nbod,j
-      real(double_precision),intent(in) :: xhx,xhy,xhz,vhx,vhy,vhz
-      real(double_precision),intent(in) :: tintin,C2
-      real(double_precision),intent(in) :: m(nbod)
-      real(double_precision), intent(out) :: F_GR_tot_x,F_GR_tot_y,F_GR_tot_z
+      integer,intent(in) :: n
+      real(double_precision),intent(in) :: m(n),xh(3,n),vh(3,n)
+      real(double_precision), dimension(n), intent(in) :: r_2,rr,v_2,norm_v,v_rad
+      real(double_precision),intent(in) :: tintin(n),C2
+      real(double_precision), intent(out) :: F_GR(3,n)
       ! Local
-      real(double_precision) :: tmp,tmp1,FGR_rad,FGR_ort
+      integer :: j
+      real(double_precision) :: tmp,FGR_rad,FGR_ort
       !-------------------------------------------------------------------------
-      call F_GR_rad (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,tintin,C2,j,FGR_rad)
-      call F_GR_ortho (nbod,m,xhx,xhy,xhz,vhx,vhy,vhz,tintin,C2,j,FGR_ort)
-
-      tmp  = sqrt(xhx*xhx+xhy*xhy+xhz*xhz)
-      tmp1 = sqrt(vhx*vhx+vhy*vhy+vhz*vhz)
-
-      F_GR_tot_x = m(j)*(FGR_rad*xhx/tmp+FGR_ort*vhx/tmp1)
-      F_GR_tot_y = m(j)*(FGR_rad*xhy/tmp+FGR_ort*vhy/tmp1)
-      F_GR_tot_z = m(j)*(FGR_rad*xhz/tmp+FGR_ort*vhz/tmp1)
+      do j = 2, n
+          tmp = (m(1)+m(j))/(r_2(j)*C2*C2)
+          ! Radial part
+          FGR_rad = -tmp &
+               *((1.0d0+3.0d0*tintin(j))*v_2(j) &
+               -2.d0*(2.d0+tintin(j))*(m(1)+m(j))/rr(j) &
+               -1.5d0*tintin(j)*v_rad(j)*v_rad(j))
+          ! Orthoradial part
+          FGR_ort = tmp*2.0d0*(2.0d0-tintin(j))*v_rad(j)*norm_v(j)
+
+          F_GR(1,j) = m(j)*(FGR_rad*xh(1,j)/rr(j)+FGR_ort*vh(1,j)/norm_v(j))
+          F_GR(2,j) = m(j)*(FGR_rad*xh(2,j)/rr(j)+FGR_ort*vh(2,j)/norm_v(j))
+          F_GR(3,j) = m(j)*(FGR_rad*xh(3,j)/rr(j)+FGR_ort*vh(3,j)/norm_v(j))
+      end do
       !-------------------------------------------------------------------------
       return
   end subroutine F_GenRel